@@ -2,12 +2,22 @@
 
 import sys
 import os
+import signal
 import logging
+import argparse
+from typing import List, Optional
 from dotenv import load_dotenv
 from services.zwift_service import ZwiftService
 from services.fit_file_service import FitFileService
 from services.garmin_service import GarminService
 from services.activity_processor import ActivityProcessor
+from services.sync_state import SyncStateStore
+from services.rate_limit import SqliteRateLimiter
+from services.fit_cache import FitFileCache
+from services.garmin_index import GarminActivityIndex
+from services.watch import ActivityWatcher, AdaptivePollInterval
+from services.batch import BatchOptions, BatchRunner, format_summary, load_accounts
+from services.zwift import ZwiftResponseCache, ZwiftTokenCache
 
 # Configure logging
 logging.basicConfig(
@@ -15,11 +25,94 @@ logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 
-def main():
-    """Main function to orchestrate the activity transfer process."""
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse the command line arguments.
+
+    Args:
+        argv: Arguments to parse (none by default, so importing callers get a single run)
+
+    Returns:
+        Parsed arguments
+    """
+    parser = argparse.ArgumentParser(description="Transfer Zwift activities to Garmin Connect.")
+    parser.add_argument("--watch", action="store_true",
+                        help="keep running and poll for new activities (requires SYNC_STATE_DB)")
+    parser.add_argument("--min-interval", type=float, default=AdaptivePollInterval.MIN_INTERVAL,
+                        help="seconds between polls right after new activities (default: %(default)s)")
+    parser.add_argument("--max-interval", type=float, default=AdaptivePollInterval.MAX_INTERVAL,
+                        help="longest interval between polls while idle (default: %(default)s)")
+    parser.add_argument("--backfill", action="store_true",
+                        help="transfer every activity of the Zwift history not synced yet (requires SYNC_STATE_DB)")
+    parser.add_argument("--accounts", metavar="CONFIG",
+                        help="sync every account of a JSON config file instead of the .env account")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="activities transferred at the same time with --backfill (default: 4), "
+                             "or accounts synced at the same time with --accounts (default: number of CPUs)")
+    parser.add_argument("--work-dir", default="accounts",
+                        help="directory of the per-account tokens and state with --accounts (default: %(default)s)")
+    return parser.parse_args(argv or [])
+
+
+def run_batch(args: argparse.Namespace) -> None:
+    """Sync every account of a config file and print a summary table.
+
+    Args:
+        args: Parsed command line arguments
+    """
+    runner = BatchRunner(
+        load_accounts(args.accounts),
+        BatchOptions(
+            work_dir=args.work_dir,
+            pipeline=os.getenv("SYNC_PIPELINE", "").lower() in ("1", "true", "yes"),
+            rate_limit_db=os.getenv("RATE_LIMIT_DB"),
+            fit_cache_dir=os.getenv("FIT_CACHE_DIR"),
+        ),
+        max_workers=args.workers,
+    )
+    results = runner.run()
+
+    print(format_summary(results))
+    if not all(result.success for result in results):
+        sys.exit(1)
+
+
+def watch(processor: ActivityProcessor, interval: AdaptivePollInterval, pipeline: bool) -> None:
+    """Poll for new activities until SIGTERM or SIGINT.
+
+    Args:
+        processor: Processor with a state store, keeping its sessions
+        interval: Poll interval policy
+        pipeline: Use the pipelined sync for each poll
+    """
+    watcher = ActivityWatcher(processor, interval, pipeline=pipeline)
+
+    def stop(signum, frame):
+        logging.getLogger(__name__).info(f"Received {signal.Signals(signum).name}, stopping after the current run")
+        watcher.stop()
+
+    previous = {signum: signal.signal(signum, stop) for signum in (signal.SIGTERM, signal.SIGINT)}
+    try:
+        watcher.run()
+    finally:
+        for signum, handler in previous.items():
+            signal.signal(signum, handler)
+
+
+def main(argv: Optional[List[str]] = None):
+    """Main function to orchestrate the activity transfer process.
+
+    Args:
+        argv: Command line arguments
+    """
+    args = parse_args(argv)
+
     # Load environment variables from .env file
     load_dotenv()
 
+    if args.accounts:
+        run_batch(args)
+        return
+
     # Get credentials from environment variables
     zwift_username = os.getenv("ZWIFT_USERNAME")
     zwift_password = os.getenv("ZWIFT_PASSWORD")
@@ -30,16 +123,91 @@ def main():
     if not all([zwift_username, zwift_password, garmin_username, garmin_password]):
         raise ValueError("Missing required environment variables. Please check your .env file.")
 
+    # Optional state database enabling incremental syncs of all new activities
+    sync_state_db = os.getenv("SYNC_STATE_DB")
+    if args.watch and not sync_state_db:
+        raise ValueError("Watch mode requires SYNC_STATE_DB to remember the synced activities.")
+    if args.backfill and not sync_state_db:
+        raise ValueError("Backfill requires SYNC_STATE_DB to checkpoint the transferred activities.")
+
+    # Optional on-disk cache so Zwift tokens survive between runs
+    zwift_options = {}
+    zwift_token_cache = os.getenv("ZWIFT_TOKEN_CACHE")
+    if zwift_token_cache:
+        zwift_options["token_cache"] = ZwiftTokenCache(zwift_token_cache)
+
+    # Optional response cache so polling unchanged activity lists is cheap
+    zwift_response_cache = os.getenv("ZWIFT_RESPONSE_CACHE_DIR")
+    if zwift_response_cache:
+        zwift_options["response_cache"] = ZwiftResponseCache(directory=zwift_response_cache)
+
+    # Optional token store so the Garmin Connect session survives between runs
+    garmin_options = {}
+    garmin_token_store = os.getenv("GARMIN_TOKEN_STORE")
+    if garmin_token_store:
+        garmin_options["token_store"] = garmin_token_store
+
+    # Optional rate limiter shared by every process using the same database
+    rate_limit_db = os.getenv("RATE_LIMIT_DB")
+    if rate_limit_db:
+        rate_limiter = SqliteRateLimiter(rate_limit_db)
+        zwift_options["rate_limiter"] = rate_limiter
+        garmin_options["rate_limiter"] = rate_limiter
+
+    # Optional local cache of downloaded and modified FIT files
+    fit_options = {}
+    fit_cache_dir = os.getenv("FIT_CACHE_DIR")
+    if fit_cache_dir:
+        fit_cache = FitFileCache(fit_cache_dir)
+        zwift_options["fit_cache"] = fit_cache
+        fit_options["cache"] = fit_cache
+
     # Initialize services with dependency injection
-    zwift_service = ZwiftService(zwift_username, zwift_password)
-    fit_file_service = FitFileService()
-    garmin_service = GarminService(garmin_username, garmin_password)
+    zwift_service = ZwiftService(zwift_username, zwift_password, **zwift_options)
+    fit_file_service = FitFileService(**fit_options)
+    garmin_service = GarminService(garmin_username, garmin_password, **garmin_options)
+
+    # Optional index of Garmin Connect activities so duplicates are not uploaded
+    processor_options = {}
+    garmin_index_db = os.getenv("GARMIN_INDEX_DB")
+    if garmin_index_db:
+        processor_options["garmin_index"] = GarminActivityIndex(garmin_index_db)
+
+    # Most recent activities transferred by the first incremental sync
+    sync_initial_activities = os.getenv("SYNC_INITIAL_ACTIVITIES")
+    if sync_initial_activities:
+        processor_options["initial_activities"] = int(sync_initial_activities)
 
-    # Create the main processor
-    processor = ActivityProcessor(zwift_service, fit_file_service, garmin_service)
+    try:
+        if sync_state_db:
+            state_store = SyncStateStore(sync_state_db)
+            # Optionally overlap downloads, FIT modifications and uploads
+            pipeline = os.getenv("SYNC_PIPELINE", "").lower() in ("1", "true", "yes")
+            try:
+                if args.watch:
+                    # Stay logged in between polls; log in to Garmin only once there is an upload
+                    processor = ActivityProcessor(zwift_service, fit_file_service, garmin_service, state_store,
+                                                  keep_sessions=True, lazy_garmin_auth=True, **processor_options)
+                    watch(processor, AdaptivePollInterval(args.min_interval, args.max_interval), pipeline)
+                    return
+                processor = ActivityProcessor(zwift_service, fit_file_service, garmin_service, state_store,
+                                              **processor_options)
+                if args.backfill:
+                    success = processor.backfill(workers=args.workers or 4)
+                    print(f"Backfill: {processor.last_backfill}")
+                else:
+                    success = processor.process_new_activities(pipeline=pipeline)
+            finally:
+                state_store.close()
+        else:
+            # Create the main processor
+            processor = ActivityProcessor(zwift_service, fit_file_service, garmin_service, **processor_options)
 
-    # Process the latest activity
-    success = processor.process_latest_activity()
+            # Process the latest activity, keeping the FIT data in memory
+            success = processor.process_latest_activity(in_memory=True)
+    finally:
+        if "garmin_index" in processor_options:
+            processor_options["garmin_index"].close()
 
     if success:
         print("✅ Activity successfully transferred from Zwift to Garmin!")
@@ -49,4 +217,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main(sys.argv[1:])
\ No newline at end of file
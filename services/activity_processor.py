@@ -1,44 +1,110 @@
 """Activity processor for orchestrating the Zwift to Garmin workflow."""
 
+import os
 import logging
-from typing import Optional
-from services.zwift_service import ZwiftService
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+from services.zwift_service import ActivityDownload, ZwiftService
 from services.fit_file_service import FitFileService
-from services.garmin_service import GarminService
+from services.garmin_service import GarminDuplicateActivityError, GarminService
+from services.sync_state import SyncStateStore
+from services.garmin_index import GarminActivityIndex
+from services.fit import ActivitySummary
+from services.backfill import BackfillStats
+from services.process_pool import create_process_pool
 
 
 class ActivityProcessor:
     """Main orchestrator for processing activities from Zwift to Garmin."""
 
+    # Activities looked at for the watermark before giving up on finding it
+    MAX_SCANNED_ACTIVITIES = 500
+    # Extra time the Garmin listing reaches back past the oldest activity transferred
+    GARMIN_LISTING_MARGIN = timedelta(days=1)
+    _GARMIN_HISTORY_START = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
     def __init__(self,
                  zwift_service: ZwiftService,
                  fit_file_service: FitFileService,
-                 garmin_service: GarminService):
+                 garmin_service: GarminService,
+                 state_store: Optional[SyncStateStore] = None,
+                 garmin_index: Optional[GarminActivityIndex] = None,
+                 fit_executor: Optional[Executor] = None,
+                 pipeline_depth: int = 4,
+                 lazy_garmin_auth: bool = False,
+                 keep_sessions: bool = False,
+                 initial_activities: int = 1,
+                 max_scanned_activities: int = MAX_SCANNED_ACTIVITIES):
         """Initialize ActivityProcessor with injected services.
 
         Args:
             zwift_service: Service for Zwift operations
             fit_file_service: Service for FIT file operations
             garmin_service: Service for Garmin operations
+            state_store: Store of already synced activities, required by
+                process_new_activities
+            garmin_index: Index of the activities on Garmin Connect, refreshed
+                once per run and checked before every in-memory upload
+            fit_executor: Executor running the FIT modifications of the
+                pipelined mode (a process pool is created per run by default)
+            pipeline_depth: Activities downloaded and modified ahead of the
+                upload in the pipelined mode
+            lazy_garmin_auth: Log in to Garmin Connect only right before it is
+                first used, instead of in the background while Zwift is processed
+            keep_sessions: Reuse the Zwift and Garmin Connect sessions of
+                previous runs instead of logging in again on every run
+            initial_activities: Most recent activities transferred by
+                process_new_activities while nothing was uploaded yet; older
+                ones are left to a backfill
+            max_scanned_activities: Most recent activities process_new_activities
+                looks at for the last synced one
         """
         self.zwift_service = zwift_service
         self.fit_file_service = fit_file_service
         self.garmin_service = garmin_service
+        self.state_store = state_store
+        self.garmin_index = garmin_index
+        self._garmin_index_loaded = False
+        self._garmin_index_since: Optional[datetime] = None
+        self.fit_executor = fit_executor
+        self.pipeline_depth = max(1, pipeline_depth)
+        self.lazy_garmin_auth = lazy_garmin_auth
+        self.keep_sessions = keep_sessions
+        self.initial_activities = max(1, initial_activities)
+        self.max_scanned_activities = max(1, max_scanned_activities)
+        # Number of new activities found by the last process_new_activities run
+        self.last_new_activities = 0
+        # Progress of the last (or running) backfill
+        self.last_backfill: Optional[BackfillStats] = None
+        self._garmin_login: Optional[Future] = None
         self.logger = logging.getLogger(__name__)
 
-    def process_latest_activity(self) -> bool:
+    def process_latest_activity(self, in_memory: bool = False) -> bool:
         """Process the latest activity from Zwift to Garmin.
 
+        Unless logging in lazily, the Garmin Connect login runs in the
+        background while the activity is fetched from Zwift and modified.
+
+        Args:
+            in_memory: Keep the FIT data in memory end to end instead of
+                round-tripping through temporary files
+
         Returns:
             True if successful, False otherwise
         """
+        if in_memory:
+            return self._process_latest_activity_in_memory()
+
         original_file_path: Optional[str] = None
         modified_file_path: Optional[str] = None
 
         try:
             # Step 1: Authenticate with Zwift and download activity
             self.logger.info("Starting activity processing...")
-            self.zwift_service.authenticate()
+            self._start_garmin_login()
+            self._authenticate_zwift()
 
             original_file_path = self.zwift_service.download_last_activity()
             if not original_file_path:
@@ -48,8 +114,8 @@ class ActivityProcessor:
             # Step 2: Modify the FIT file
             modified_file_path = self.fit_file_service.modify_device_info(original_file_path)
 
-            # Step 3: Authenticate with Garmin and upload
-            self.garmin_service.authenticate()
+            # Step 3: Wait for the Garmin login and upload
+            self._ensure_garmin_login()
             response = self.garmin_service.upload_activity(modified_file_path)
 
             self.logger.info("Activity processing completed successfully")
@@ -66,3 +132,501 @@ class ActivityProcessor:
                 self.fit_file_service.cleanup_file(original_file_path)
             if modified_file_path:
                 self.fit_file_service.cleanup_file(modified_file_path)
+
+    def _process_latest_activity_in_memory(self) -> bool:
+        """Process the latest activity without touching the filesystem.
+
+        Returns:
+            True if successful, False otherwise
+        """
+        try:
+            # Step 1: Authenticate with Zwift and download activity
+            self.logger.info("Starting activity processing...")
+            self._start_garmin_login()
+            self._authenticate_zwift()
+
+            activity = self.zwift_service.get_last_activity()
+            if not activity:
+                self.logger.info("No activities found to process")
+                return False
+
+            original_data = self.zwift_service.download_activity_bytes(activity)
+
+            # Step 2: Modify the FIT data
+            modified_data = self.fit_file_service.modify_device_info_bytes(original_data)
+
+            # Step 3: Wait for the Garmin login and upload
+            self._ensure_garmin_login()
+            self._refresh_garmin_index()
+            self._load_garmin_index()
+
+            summary, duplicate = self._find_duplicate(modified_data)
+            if duplicate:
+                self.logger.info(f"Activity {activity['id']} is already on Garmin Connect as {duplicate}")
+                return True
+
+            response = self.garmin_service.upload_activity_bytes(
+                modified_data, self.zwift_service.activity_file_name(activity)
+            )
+            self._index_upload(activity, summary, response)
+
+            self.logger.info("Activity processing completed successfully")
+            self.logger.debug(f"Upload response: {response}")
+            return True
+
+        except Exception:
+            self.logger.exception("Activity processing failed")
+            return False
+
+    def process_new_activities(self, max_activities: int = 10, pipeline: bool = False) -> bool:
+        """Process every Zwift activity not synced yet.
+
+        Activities are transferred oldest first and processing stops at the
+        first failure, so an activity is never skipped past by the watermark.
+
+        Args:
+            max_activities: Maximum number of new activities to transfer per run;
+                the oldest go first and the others are left for the next runs
+            pipeline: Download and modify the next activities while the
+                current one uploads, instead of one step after another
+
+        Returns:
+            True if all new activities (possibly none) were transferred, False otherwise
+
+        Raises:
+            RuntimeError: If no state store was configured
+        """
+        if self.state_store is None:
+            raise RuntimeError("A state store is required to process new activities")
+
+        self.last_new_activities = 0
+        # Created before the login and download threads start
+        fit_executor = None
+        if pipeline:
+            fit_executor = self.fit_executor or create_process_pool(min(self.pipeline_depth, os.cpu_count() or 1))
+
+        try:
+            self.logger.info("Looking for new activities...")
+            self._authenticate_zwift()
+
+            max_scanned = self.max_scanned_activities
+            if not self.state_store.has_uploads():
+                # No watermark yet: start from the latest activities rather than
+                # the oldest ones of the whole history
+                max_scanned = self.initial_activities
+                self.logger.info(f"Nothing synced yet, starting from the {max_scanned} most recent activities")
+
+            activities = self.zwift_service.get_new_activities(
+                lambda activity: self.state_store.is_synced(activity["id"]),
+                max_activities=max_activities,
+                max_scanned=max_scanned,
+            )
+            self.last_new_activities = len(activities)
+            if not activities:
+                self.logger.info("No new activities to process")
+                return True
+
+            # Log in to Garmin while the first activity downloads
+            self._start_garmin_login()
+            # A watching processor lists Garmin Connect again on every poll with
+            # new activities, seeing what was uploaded or deleted in between
+            self._refresh_garmin_index(self._garmin_listing_start(activities))
+
+            if pipeline:
+                if not self._sync_activities_pipelined(list(reversed(activities)), fit_executor):
+                    return False
+            else:
+                for activity in reversed(activities):
+                    if not self._sync_activity(activity):
+                        return False
+
+            self.logger.info(f"Transferred {len(activities)} new activities")
+            return True
+
+        except Exception:
+            self.logger.exception("Activity processing failed")
+            return False
+        finally:
+            if fit_executor is not None and self.fit_executor is None:
+                fit_executor.shutdown(wait=False, cancel_futures=True)
+
+    def backfill(self, workers: int = 4) -> bool:
+        """Transfer every activity of the Zwift history not synced yet.
+
+        The whole history is walked page by page, skipping synced
+        activities. Downloads, FIT modifications and uploads each run up to
+        workers at a time, in no particular order, and the outcome of every
+        activity is recorded in the state store as soon as it is known. A
+        failed activity does not stop the others, and a rerun after an
+        interruption or failures picks up the activities that are left.
+        Progress is logged and kept in last_backfill.
+
+        Args:
+            workers: Concurrent downloads, FIT modifications and uploads
+
+        Returns:
+            True if all remaining activities were transferred, False otherwise
+
+        Raises:
+            RuntimeError: If no state store was configured
+        """
+        if self.state_store is None:
+            raise RuntimeError("A state store is required to backfill activities")
+
+        workers = max(1, workers)
+        stats = self.last_backfill = BackfillStats()
+        # Created before the login and download threads start
+        fit_executor = self.fit_executor or create_process_pool(min(workers, os.cpu_count() or 1))
+
+        def is_synced(activity: Dict[str, Any]) -> bool:
+            synced = self.state_store.is_synced(activity["id"])
+            if synced:
+                stats.skipped += 1
+            return synced
+
+        try:
+            self.logger.info("Backfilling the Zwift activity history...")
+            self._authenticate_zwift()
+            self._start_garmin_login()
+            self._ensure_garmin_login()
+            # Any activity of the history may be transferred
+            self._refresh_garmin_index(self._GARMIN_HISTORY_START)
+            self._load_garmin_index()
+
+            downloads = self.zwift_service.download_activities(
+                self.zwift_service.iter_activities(skip=is_synced), max_workers=workers
+            )
+            uploading: Dict[int, Tuple[Dict[str, Any], Optional[ActivitySummary]]] = {}
+            uploads = self._backfill_uploads(downloads, fit_executor, workers, uploading)
+
+            for result in self.garmin_service.upload_many(uploads, max_workers=workers):
+                activity, summary = uploading.pop(result.index)
+                if result.error is not None:
+                    self.state_store.mark_failed(activity, str(result.error))
+                    stats.failed += 1
+                elif result.duplicate:
+                    self.state_store.mark_uploaded(activity)
+                    stats.transferred += 1
+                    stats.duplicates += 1
+                else:
+                    self.state_store.mark_uploaded(activity, self._garmin_activity_id(result.response))
+                    self._index_upload(activity, summary, result.response)
+                    stats.transferred += 1
+                self.logger.info(f"Backfill progress: {stats}")
+
+        except Exception:
+            self.logger.exception("Backfill failed")
+            return False
+        finally:
+            if self.fit_executor is None:
+                fit_executor.shutdown(wait=False, cancel_futures=True)
+
+        self.logger.info(f"Backfill finished: {stats}")
+        return stats.failed == 0
+
+    def _backfill_uploads(self, downloads: Iterable[ActivityDownload], fit_executor: Executor, depth: int,
+                          uploading: Dict[int, Tuple[Dict[str, Any], Optional[ActivitySummary]]]
+                          ) -> Iterator[Tuple[bytes, str]]:
+        """Turn completed downloads into uploads for GarminService.upload_many.
+
+        Up to depth FIT modifications run ahead on the FIT executor. Failed
+        activities and activities already on Garmin Connect are recorded
+        right away; the others are registered in uploading under their
+        upload index.
+
+        Yields:
+            (data, file_name) pairs to upload
+        """
+        stats = self.last_backfill
+        modifications: Deque[Tuple[Dict[str, Any], Future]] = deque()
+
+        def modified() -> Iterator[Tuple[Dict[str, Any], Future]]:
+            for download in downloads:
+                if download.error is not None:
+                    self.state_store.mark_failed(download.activity, str(download.error))
+                    stats.failed += 1
+                    continue
+                stats.bytes_downloaded += len(download.data)
+                modifications.append((
+                    download.activity,
+                    self.fit_file_service.submit_modify_device_info_bytes(fit_executor, download.data),
+                ))
+                if len(modifications) >= depth:
+                    yield modifications.popleft()
+            while modifications:
+                yield modifications.popleft()
+
+        index = 0
+        for activity, modification in modified():
+            try:
+                data = modification.result()
+                summary, duplicate = self._find_duplicate(data)
+            except Exception as e:
+                self.logger.error(f"Failed to process activity {activity['id']}: {e}")
+                self.state_store.mark_failed(activity, str(e))
+                stats.failed += 1
+                continue
+
+            if duplicate:
+                self.logger.info(f"Activity {activity['id']} is already on Garmin Connect as {duplicate}")
+                self.state_store.mark_uploaded(activity, duplicate)
+                stats.transferred += 1
+                stats.duplicates += 1
+                continue
+
+            uploading[index] = (activity, summary)
+            index += 1
+            yield data, self.zwift_service.activity_file_name(activity)
+
+    def _sync_activity(self, activity: Dict[str, Any]) -> bool:
+        """Transfer a single activity in memory and record the outcome.
+
+        Args:
+            activity: Zwift activity dictionary
+
+        Returns:
+            True if successful, False otherwise
+        """
+        self.logger.info(f"Processing activity {activity['id']}...")
+
+        try:
+            original_data = self.zwift_service.download_activity_bytes(activity)
+            modified_data = self.fit_file_service.modify_device_info_bytes(original_data)
+        except Exception as e:
+            self.logger.exception(f"Failed to process activity {activity['id']}")
+            self.state_store.mark_failed(activity, str(e))
+            return False
+
+        return self._upload_activity(activity, modified_data)
+
+    def _sync_activities_pipelined(self, activities: List[Dict[str, Any]], fit_executor: Executor) -> bool:
+        """Transfer activities with the download, modify and upload stages overlapping.
+
+        Downloads run on a thread pool and FIT modifications on the FIT
+        executor, up to pipeline_depth activities ahead of the upload. Uploads
+        stay sequential and in order, so processing still stops at the first
+        failure and the watermark rule holds.
+
+        Args:
+            activities: Zwift activity dictionaries, oldest first
+            fit_executor: Executor running the FIT modifications
+
+        Returns:
+            True if all activities were transferred, False otherwise
+        """
+        depth = self.pipeline_depth
+        download_executor = ThreadPoolExecutor(max_workers=depth, thread_name_prefix="pipeline-download")
+        pending = iter(activities)
+        in_flight: Deque[Tuple[Dict[str, Any], Future]] = deque()
+
+        try:
+            while True:
+                while len(in_flight) < depth:
+                    activity = next(pending, None)
+                    if activity is None:
+                        break
+                    in_flight.append((activity, self._prepare_activity(activity, download_executor, fit_executor)))
+                if not in_flight:
+                    return True
+
+                activity, prepared = in_flight.popleft()
+                self.logger.info(f"Processing activity {activity['id']}...")
+                try:
+                    modified_data = prepared.result()
+                except Exception as e:
+                    self.logger.exception(f"Failed to process activity {activity['id']}")
+                    self.state_store.mark_failed(activity, str(e))
+                    return False
+
+                if not self._upload_activity(activity, modified_data):
+                    return False
+        finally:
+            download_executor.shutdown(wait=False, cancel_futures=True)
+
+    def _prepare_activity(self, activity: Dict[str, Any], download_executor: Executor,
+                          fit_executor: Executor) -> "Future[bytes]":
+        """Start downloading an activity and modifying its FIT data in the background.
+
+        Returns:
+            Future of the modified FIT data
+        """
+        prepared: "Future[bytes]" = Future()
+
+        def finish(modification: Future) -> None:
+            try:
+                prepared.set_result(modification.result())
+            except Exception as e:
+                prepared.set_exception(e)
+
+        def modify(download: Future) -> None:
+            try:
+                modification = self.fit_file_service.submit_modify_device_info_bytes(
+                    fit_executor, download.result()
+                )
+            except Exception as e:
+                # Failed or cancelled download, or executor already shut down
+                prepared.set_exception(e)
+                return
+            modification.add_done_callback(finish)
+
+        download_executor.submit(self.zwift_service.download_activity_bytes, activity).add_done_callback(modify)
+        return prepared
+
+    def _upload_activity(self, activity: Dict[str, Any], modified_data: bytes) -> bool:
+        """Upload an activity's modified FIT data and record the outcome.
+
+        Activities already on Garmin Connect are recorded without uploading.
+
+        Args:
+            activity: Zwift activity dictionary
+            modified_data: FIT data to upload
+
+        Returns:
+            True if successful, False otherwise
+
+        Raises:
+            Exception: If logging in to Garmin Connect failed
+        """
+        self._ensure_garmin_login()
+        self._load_garmin_index()
+
+        try:
+            summary, duplicate = self._find_duplicate(modified_data)
+            if duplicate:
+                self.logger.info(f"Activity {activity['id']} is already on Garmin Connect as {duplicate}")
+                self.state_store.mark_uploaded(activity, duplicate)
+                return True
+
+            response = self.garmin_service.upload_activity_bytes(
+                modified_data, self.zwift_service.activity_file_name(activity)
+            )
+        except GarminDuplicateActivityError:
+            self.logger.info(f"Activity {activity['id']} is already on Garmin Connect")
+            self.state_store.mark_uploaded(activity)
+            return True
+        except Exception as e:
+            self.logger.exception(f"Failed to process activity {activity['id']}")
+            self.state_store.mark_failed(activity, str(e))
+            return False
+
+        self.state_store.mark_uploaded(activity, self._garmin_activity_id(response))
+        self._index_upload(activity, summary, response)
+        self.logger.debug(f"Upload response: {response}")
+        return True
+
+    def _authenticate_zwift(self) -> None:
+        """Log in to Zwift, or reuse the previous session when keeping sessions."""
+        if self.keep_sessions:
+            self.zwift_service.ensure_authenticated()
+        else:
+            self.zwift_service.authenticate()
+
+    def _start_garmin_login(self) -> None:
+        """Start logging in to Garmin Connect in the background, unless logging in lazily."""
+        self._garmin_login = None
+        if self.lazy_garmin_auth:
+            return
+
+        login = self.garmin_service.ensure_authenticated if self.keep_sessions else self.garmin_service.authenticate
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="garmin-login")
+        self._garmin_login = executor.submit(login)
+        executor.shutdown(wait=False)
+
+    def _ensure_garmin_login(self) -> None:
+        """Wait for the background Garmin Connect login, or log in now.
+
+        Raises:
+            Exception: Whatever GarminService.authenticate raised
+        """
+        if self.lazy_garmin_auth:
+            self.garmin_service.ensure_authenticated()
+            return
+
+        if self._garmin_login is None:
+            self._start_garmin_login()
+        self._garmin_login.result()
+
+    def _garmin_listing_start(self, activities: List[Dict[str, Any]]) -> Optional[datetime]:
+        """Get how far back the Garmin listing must go to cover activities about to be transferred.
+
+        Returns:
+            Start time the listing must reach, or None if an activity's start is unknown
+        """
+        starts = [ZwiftService.activity_start_time(activity) for activity in activities]
+        if not starts or None in starts:
+            return None
+        return min(starts) - self.GARMIN_LISTING_MARGIN
+
+    def _refresh_garmin_index(self, since: Optional[datetime] = None) -> None:
+        """Have the Garmin activity index listed again before its next use.
+
+        Args:
+            since: Start time the listing must reach back to (only the most
+                recent activities by default)
+        """
+        self._garmin_index_loaded = False
+        self._garmin_index_since = since
+
+    def _load_garmin_index(self) -> None:
+        """Fill the Garmin activity index from one listing, once per run.
+
+        A failed listing only disables the duplicate check; Garmin Connect
+        still rejects exact duplicates on upload.
+        """
+        if self.garmin_index is None or self._garmin_index_loaded:
+            return
+
+        try:
+            self.garmin_index.load(self.garmin_service.list_activities(since=self._garmin_index_since))
+            self._garmin_index_loaded = True
+        except Exception as e:
+            self.logger.warning(f"Skipping the Garmin Connect duplicate check: {e}")
+
+    def _find_duplicate(self, data: bytes) -> Tuple[Optional[ActivitySummary], Optional[str]]:
+        """Look up FIT data in the Garmin activity index.
+
+        Args:
+            data: FIT data about to be uploaded
+
+        Returns:
+            Tuple of the data's activity summary (None when the index is not
+            in use) and the ID of the matching Garmin activity, if any
+        """
+        if not self._garmin_index_loaded:
+            return None, None
+
+        summary = self.fit_file_service.read_activity_summary(data)
+        if summary is None:
+            return None, None
+        return summary, self.garmin_index.find_duplicate(summary)
+
+    def _index_upload(self, activity: Dict[str, Any], summary: Optional[ActivitySummary],
+                      response: Any) -> None:
+        """Add an uploaded activity to the Garmin activity index.
+
+        Garmin Connect may process an upload asynchronously and not report the
+        new activity ID yet; the entry is then keyed by the Zwift activity
+        until the next listing replaces it.
+        """
+        if summary is None:
+            return
+
+        garmin_activity_id = self._garmin_activity_id(response)
+        if garmin_activity_id is None:
+            garmin_activity_id = f"zwift:{activity['id']}"
+        self.garmin_index.add(garmin_activity_id, summary)
+
+    @staticmethod
+    def _garmin_activity_id(response: Any) -> Optional[Any]:
+        """Extract the created Garmin activity ID from an upload response.
+
+        Args:
+            response: Upload response from Garmin Connect
+
+        Returns:
+            The Garmin activity ID, or None if not present
+        """
+        try:
+            return response["detailedImportResult"]["successes"][0]["internalId"]
+        except (KeyError, IndexError, TypeError):
+            return None
@@ -0,0 +1,55 @@
+"""Progress and throughput accounting for full-history backfills."""
+
+import time
+from typing import Callable
+
+
+class BackfillStats:
+    """Counts and throughput of a backfill run.
+
+    Updated by the thread driving the backfill as activities complete, and
+    readable at any time for progress reports.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        """Start the run's clock.
+
+        Args:
+            clock: Monotonic clock in seconds
+        """
+        self._clock = clock
+        self.started = clock()
+        # Activities uploaded, or found already on Garmin Connect
+        self.transferred = 0
+        self.duplicates = 0
+        self.failed = 0
+        # Activities skipped because a previous run already synced them
+        self.skipped = 0
+        # FIT bytes downloaded from Zwift
+        self.bytes_downloaded = 0
+
+    @property
+    def processed(self) -> int:
+        """Number of activities handled by this run, successfully or not."""
+        return self.transferred + self.failed
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds since the run started."""
+        return max(self._clock() - self.started, 1e-9)
+
+    @property
+    def activities_per_minute(self) -> float:
+        """Activities handled per minute."""
+        return self.processed * 60 / self.elapsed
+
+    @property
+    def megabytes_per_second(self) -> float:
+        """Megabytes of FIT data downloaded per second."""
+        return self.bytes_downloaded / 1e6 / self.elapsed
+
+    def __str__(self) -> str:
+        """One-line progress report."""
+        return (f"{self.transferred} transferred ({self.duplicates} already on Garmin Connect), "
+                f"{self.failed} failed, {self.skipped} already synced in {self.elapsed:.0f}s - "
+                f"{self.activities_per_minute:.1f} activities/min, {self.megabytes_per_second:.2f} MB/s")
@@ -0,0 +1,251 @@
+"""Batch runner syncing several accounts from one process pool."""
+
+import os
+import json
+import time
+import logging
+import tempfile
+from concurrent.futures import Executor
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from services.zwift_service import ZwiftService
+from services.fit_file_service import FitFileService
+from services.garmin_service import GarminService
+from services.activity_processor import ActivityProcessor
+from services.sync_state import SyncStateStore
+from services.rate_limit import SqliteRateLimiter
+from services.fit_cache import FitFileCache
+from services.zwift import ZwiftTokenCache
+from services.process_pool import create_process_pool
+
+
+class AccountConfig(NamedTuple):
+    """Credentials of one Zwift/Garmin Connect account pair."""
+
+    name: str
+    zwift_username: str
+    zwift_password: str
+    garmin_username: str
+    garmin_password: str
+
+
+class AccountResult(NamedTuple):
+    """Outcome of syncing one account."""
+
+    name: str
+    success: bool
+    new_activities: int
+    elapsed: float
+    error: Optional[str]
+
+
+class BatchOptions(NamedTuple):
+    """Settings shared by every account of a batch."""
+
+    # Directory holding one subdirectory of tokens, state and temp files per account
+    work_dir: str
+    max_activities: int = 10
+    pipeline: bool = False
+    # Shared between the worker processes: SQLite rate limiter and FIT cache
+    rate_limit_db: Optional[str] = None
+    fit_cache_dir: Optional[str] = None
+
+
+CREDENTIAL_FIELDS = ("zwift_username", "zwift_password", "garmin_username", "garmin_password")
+
+
+def load_accounts(path: str) -> List[AccountConfig]:
+    """Load the accounts of a batch from a JSON config file.
+
+    The file holds a list of accounts (or an object with an "accounts"
+    list). Each account has a unique "name" and the four credential fields;
+    a field can instead be read from an environment variable named by the
+    same key with an "_env" suffix, e.g. "garmin_password_env".
+
+    Args:
+        path: Path to the JSON config file
+
+    Returns:
+        The configured accounts
+
+    Raises:
+        ValueError: If the file is invalid, a credential is missing or a name is repeated
+    """
+    try:
+        with open(os.path.expanduser(path), "r") as file:
+            config = json.load(file)
+    except (OSError, json.JSONDecodeError) as e:
+        raise ValueError(f"Cannot read accounts config {path}: {e}") from e
+
+    entries = config.get("accounts") if isinstance(config, dict) else config
+    if not isinstance(entries, list) or not entries:
+        raise ValueError(f"Accounts config {path} has no accounts")
+
+    accounts: List[AccountConfig] = []
+    for position, entry in enumerate(entries, start=1):
+        name = str(entry.get("name") or "").strip() if isinstance(entry, dict) else ""
+        if not name:
+            raise ValueError(f"Account #{position} has no name")
+        if any(account.name == name for account in accounts):
+            raise ValueError(f"Account name {name!r} is used more than once")
+        accounts.append(AccountConfig(name, *(_credential(entry, name, field) for field in CREDENTIAL_FIELDS)))
+    return accounts
+
+
+def _credential(entry: Dict[str, Any], name: str, field: str) -> str:
+    """Read a credential from an account entry or the environment variable it names."""
+    value = entry.get(field)
+    if not value and entry.get(f"{field}_env"):
+        value = os.getenv(entry[f"{field}_env"])
+    if not value:
+        raise ValueError(f"Account {name!r} is missing {field}")
+    return value
+
+
+def account_dir(work_dir: str, name: str) -> str:
+    """Get the private directory of an account.
+
+    Args:
+        work_dir: Batch working directory
+        name: Account name
+
+    Returns:
+        Path of the account's directory
+    """
+    safe_name = "".join(c if c.isalnum() or c in "-_." else "_" for c in name)
+    return os.path.join(os.path.expanduser(work_dir), safe_name)
+
+
+def sync_account(account: AccountConfig, options: BatchOptions) -> AccountResult:
+    """Sync the new activities of one account.
+
+    Runs in a worker process. Tokens, sync state and temporary files live in
+    the account's own directory, and any failure is returned in the result
+    instead of being raised.
+
+    Args:
+        account: Account to sync
+        options: Batch settings
+
+    Returns:
+        The account's result
+    """
+    logger = logging.getLogger(__name__)
+    started = time.monotonic()
+    directory = account_dir(options.work_dir, account.name)
+    closeables = []
+    previous_tempdir = tempfile.tempdir
+    try:
+        os.makedirs(os.path.join(directory, "tmp"), mode=0o700, exist_ok=True)
+        # Keep temporary FIT files apart from the other accounts synced by the same worker
+        tempfile.tempdir = os.path.join(directory, "tmp")
+
+        token_cache = ZwiftTokenCache(os.path.join(directory, "zwift_tokens.json"))
+        zwift_options: Dict[str, Any] = {"token_cache": token_cache}
+        garmin_options: Dict[str, Any] = {"token_store": os.path.join(directory, GarminService.TOKEN_FILE_NAME)}
+        fit_options: Dict[str, Any] = {}
+        if options.rate_limit_db:
+            rate_limiter = SqliteRateLimiter(options.rate_limit_db)
+            closeables.append(rate_limiter)
+            zwift_options["rate_limiter"] = rate_limiter
+            garmin_options["rate_limiter"] = rate_limiter
+        if options.fit_cache_dir:
+            fit_cache = FitFileCache(options.fit_cache_dir)
+            closeables.append(fit_cache)
+            zwift_options["fit_cache"] = fit_cache
+            fit_options["cache"] = fit_cache
+
+        state_store = SyncStateStore(os.path.join(directory, "sync_state.db"))
+        closeables.append(state_store)
+
+        processor = ActivityProcessor(
+            ZwiftService(account.zwift_username, account.zwift_password, **zwift_options),
+            FitFileService(**fit_options),
+            GarminService(account.garmin_username, account.garmin_password, **garmin_options),
+            state_store,
+        )
+        logger.info(f"Syncing account {account.name}...")
+        success = processor.process_new_activities(options.max_activities, pipeline=options.pipeline)
+        error = None if success else "Sync failed, see the logs"
+        return AccountResult(account.name, success, processor.last_new_activities,
+                             time.monotonic() - started, error)
+    except Exception as e:
+        logger.exception(f"Failed to sync account {account.name}")
+        return AccountResult(account.name, False, 0, time.monotonic() - started, str(e))
+    finally:
+        tempfile.tempdir = previous_tempdir
+        for closeable in closeables:
+            closeable.close()
+
+
+class BatchRunner:
+    """Syncs several accounts across a bounded pool of worker processes.
+
+    Every account runs in its own task with its own services, so accounts
+    share nothing but the optional rate limiter and FIT cache databases,
+    which are safe to use from several processes.
+    """
+
+    def __init__(self, accounts: List[AccountConfig], options: BatchOptions,
+                 max_workers: Optional[int] = None, executor: Optional[Executor] = None):
+        """Initialize the runner.
+
+        Args:
+            accounts: Accounts to sync
+            options: Settings shared by every account
+            max_workers: Number of accounts synced at the same time
+                (defaults to the number of CPUs)
+            executor: Executor running the accounts (a process pool is created by default)
+        """
+        self.accounts = accounts
+        self.options = options
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.executor = executor
+        self.logger = logging.getLogger(__name__)
+
+    def run(self) -> List[AccountResult]:
+        """Sync every account.
+
+        Returns:
+            One result per account, in the configured order
+        """
+        executor = self.executor or create_process_pool(min(self.max_workers, len(self.accounts)))
+        try:
+            futures = [executor.submit(sync_account, account, self.options) for account in self.accounts]
+            results = []
+            for account, future in zip(self.accounts, futures):
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    # The worker process died, e.g. killed or out of memory
+                    self.logger.error(f"Worker syncing account {account.name} failed: {e}")
+                    results.append(AccountResult(account.name, False, 0, 0.0, str(e) or type(e).__name__))
+            return results
+        finally:
+            if self.executor is None:
+                executor.shutdown()
+
+
+def format_summary(results: List[AccountResult]) -> str:
+    """Format batch results as a plain-text table.
+
+    Args:
+        results: Results of the accounts
+
+    Returns:
+        The table, one line per account under a header line
+    """
+    rows = [("Account", "Status", "New", "Time", "Error")]
+    for result in results:
+        rows.append((result.name, "ok" if result.success else "FAILED", str(result.new_activities),
+                     f"{result.elapsed:.1f}s", result.error or ""))
+
+    widths = [max(len(row[column]) for row in rows) for column in range(len(rows[0]) - 1)]
+    lines = []
+    for row in rows:
+        cells = [cell.ljust(width) for cell, width in zip(row, widths)] + [row[-1]]
+        lines.append("  ".join(cells).rstrip())
+
+    failed = sum(1 for result in results if not result.success)
+    lines.append(f"{len(results) - failed} of {len(results)} accounts synced")
+    return "\n".join(lines)
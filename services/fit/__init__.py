@@ -0,0 +1,35 @@
+"""FIT binary utilities package.
+
+Low-level helpers that work directly on FIT bytes instead of decoding every
+message through fit_tool.
+
+Modules:
+    crc: FIT CRC-16 checksum calculation
+    patcher: In-place device info patching
+    summary: Activity start time, duration and distance
+    stream: Constant-memory FIT record reader, device transform and writer
+"""
+
+from services.fit.crc import crc16, crc16_combine
+from services.fit.patcher import FitDevicePatcher, FitPatchError
+from services.fit.summary import ActivitySummary, read_activity_summary
+from services.fit.stream import (DataMessage, DeviceInfoTransform, FitHeader, FitStreamError, FitStreamWriter,
+                                 MessageDefinition, read_fit_messages, rewrite_device_info, write_fit_messages)
+
+__all__ = [
+    "crc16",
+    "crc16_combine",
+    "FitDevicePatcher",
+    "FitPatchError",
+    "ActivitySummary",
+    "read_activity_summary",
+    "DataMessage",
+    "DeviceInfoTransform",
+    "FitHeader",
+    "FitStreamError",
+    "FitStreamWriter",
+    "MessageDefinition",
+    "read_fit_messages",
+    "rewrite_device_info",
+    "write_fit_messages",
+]
@@ -0,0 +1,224 @@
+"""FIT device info patcher module.
+
+Rewrites the device fields of FileId and DeviceInfo messages directly in the
+FIT byte buffer, without decoding or re-encoding any other message.
+"""
+
+import struct
+import logging
+from typing import Dict, List, NamedTuple, Set, Tuple
+
+from services.fit.crc import crc16
+
+
+class FitPatchError(Exception):
+    """Raised when a FIT file cannot be patched in place."""
+
+    pass
+
+
+class _Definition(NamedTuple):
+    """Layout of the data messages for one local message type."""
+
+    global_message_number: int
+    endian: str
+    size: int
+    targets: List[Tuple[int, str]]
+
+
+class FitDevicePatcher:
+    """Patches manufacturer, product and software version in a FIT buffer.
+
+    Only walks the record headers and definition messages; data messages are
+    skipped by their defined size unless they carry one of the target fields.
+    Fields are overwritten at their existing offsets, so the file layout is
+    unchanged and only the file CRC has to be recalculated.
+    """
+
+    HEADER_MIN_SIZE = 12
+    FILE_ID_MESSAGE = 0
+    DEVICE_INFO_MESSAGE = 23
+    # Global message number -> {field definition number: value name}
+    TARGET_FIELDS: Dict[int, Dict[int, str]] = {
+        FILE_ID_MESSAGE: {1: "manufacturer", 2: "product"},
+        DEVICE_INFO_MESSAGE: {2: "manufacturer", 4: "product", 5: "software_version"},
+    }
+    # All target fields are uint16 in the FIT profile
+    FIELD_SIZE = 2
+    SOFTWARE_VERSION_SCALE = 100
+
+    def __init__(self, manufacturer: int, product: int, software_version: float):
+        """Initialize the patcher with the device values to write.
+
+        Args:
+            manufacturer: Device manufacturer
+            product: Device product
+            software_version: Software version (e.g. 9.75)
+        """
+        self._values = {
+            "manufacturer": manufacturer,
+            "product": product,
+            "software_version": round(software_version * self.SOFTWARE_VERSION_SCALE),
+        }
+        self.logger = logging.getLogger(__name__)
+
+    def patch(self, data: bytearray) -> int:
+        """Patch the device fields of a FIT file in place.
+
+        Chained FIT files are supported; each segment gets its own CRC.
+
+        Args:
+            data: Complete FIT file contents, modified in place
+
+        Returns:
+            Number of fields rewritten
+
+        Raises:
+            FitPatchError: If the file is malformed, or a FileId or
+                DeviceInfo message lacks one of the device fields, which
+                only a rewrite can add
+        """
+        patched: Set[Tuple[int, str]] = set()
+        count = 0
+        offset = 0
+
+        while offset < len(data):
+            offset, segment_count = self._patch_segment(data, offset, patched)
+            count += segment_count
+
+        for name in ("manufacturer", "product"):
+            if (self.FILE_ID_MESSAGE, name) not in patched:
+                raise FitPatchError(f"FileId message has no {name} field to patch")
+
+        self.logger.debug(f"Patched {count} device fields in place")
+        return count
+
+    def _patch_segment(self, data: bytearray, offset: int,
+                       patched: Set[Tuple[int, str]]) -> Tuple[int, int]:
+        """Patch one FIT segment (header, records and CRC).
+
+        Args:
+            data: Complete FIT file contents
+            offset: Offset of the segment header
+            patched: Set updated with the (message, field) pairs rewritten
+
+        Returns:
+            Tuple of offset right after the segment and number of fields rewritten
+        """
+        if len(data) - offset < self.HEADER_MIN_SIZE:
+            raise FitPatchError(f"Truncated FIT header at offset {offset}")
+
+        header_size = data[offset]
+        if header_size < self.HEADER_MIN_SIZE or data[offset + 8:offset + 12] != b".FIT":
+            raise FitPatchError(f"Invalid FIT header at offset {offset}")
+
+        data_size, = struct.unpack_from("<I", data, offset + 4)
+        records_start = offset + header_size
+        records_end = records_start + data_size
+        if records_end + 2 > len(data):
+            raise FitPatchError("FIT data size exceeds file length")
+
+        count = self._patch_records(data, records_start, records_end, patched)
+
+        if count:
+            struct.pack_into("<H", data, records_end, crc16(memoryview(data)[offset:records_end]))
+
+        return records_end + 2, count
+
+    def _patch_records(self, data: bytearray, position: int, end: int,
+                       patched: Set[Tuple[int, str]]) -> int:
+        """Walk the records of a segment and rewrite the target fields.
+
+        Args:
+            data: Complete FIT file contents
+            position: Offset of the first record
+            end: Offset right after the last record
+            patched: Set updated with the (message, field) pairs rewritten
+
+        Returns:
+            Number of fields rewritten
+        """
+        definitions: Dict[int, _Definition] = {}
+        count = 0
+
+        while position < end:
+            header = data[position]
+            position += 1
+
+            if header & 0x80:
+                # Compressed timestamp header, always a data message
+                local_type = (header >> 5) & 0x03
+            elif header & 0x40:
+                local_type = header & 0x0F
+                definitions[local_type], position = self._read_definition(
+                    data, position, has_developer_fields=bool(header & 0x20)
+                )
+                continue
+            else:
+                local_type = header & 0x0F
+
+            definition = definitions.get(local_type)
+            if definition is None:
+                raise FitPatchError(f"Data message without definition at offset {position - 1}")
+
+            for field_offset, name in definition.targets:
+                struct.pack_into(f"{definition.endian}H", data, position + field_offset, self._values[name])
+                patched.add((definition.global_message_number, name))
+                count += 1
+
+            position += definition.size
+
+        if position != end:
+            raise FitPatchError("Last record overruns FIT data size")
+
+        return count
+
+    def _read_definition(self, data: bytearray, position: int,
+                         has_developer_fields: bool) -> Tuple[_Definition, int]:
+        """Parse a definition message.
+
+        Args:
+            data: Complete FIT file contents
+            position: Offset right after the record header
+            has_developer_fields: Whether developer field definitions follow
+
+        Returns:
+            Tuple of the parsed definition and offset right after it
+        """
+        try:
+            endian = ">" if data[position + 1] == 1 else "<"
+            global_message_number, = struct.unpack_from(f"{endian}H", data, position + 2)
+            field_count = data[position + 4]
+            position += 5
+
+            wanted = self.TARGET_FIELDS.get(global_message_number, {})
+            targets: List[Tuple[int, str]] = []
+            size = 0
+            for _ in range(field_count):
+                field_number, field_size = data[position], data[position + 1]
+                name = wanted.get(field_number)
+                if name:
+                    if field_size != self.FIELD_SIZE:
+                        raise FitPatchError(
+                            f"Unexpected size {field_size} for {name} in message {global_message_number}"
+                        )
+                    targets.append((size, name))
+                size += field_size
+                position += 3
+
+            missing = set(wanted.values()) - {name for _, name in targets}
+            if missing:
+                raise FitPatchError(
+                    f"Message {global_message_number} has no {', '.join(sorted(missing))} field to patch"
+                )
+
+            if has_developer_fields:
+                developer_count = data[position]
+                position += 1
+                for _ in range(developer_count):
+                    size += data[position + 1]
+                    position += 3
+        except (IndexError, struct.error) as e:
+            raise FitPatchError(f"Truncated definition message: {e}") from e
+
+        return _Definition(global_message_number, endian, size, targets), position
@@ -0,0 +1,368 @@
+"""FIT streaming module.
+
+Reads FIT files one record at a time from a binary stream, rewrites the
+device messages on the fly and writes the records straight back out, so a
+file can be transformed while holding a single message in memory.
+"""
+
+import struct
+from typing import BinaryIO, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+from services.fit.crc import crc16, crc16_combine
+from services.fit.patcher import FitDevicePatcher
+
+
+class FitStreamError(Exception):
+    """Raised when a FIT stream is malformed or cannot be written."""
+
+    pass
+
+
+class FitHeader(NamedTuple):
+    """File header starting each FIT segment."""
+
+    size: int
+    protocol_version: int
+    profile_version: int
+
+    def encode(self, data_size: int) -> bytes:
+        """Encode the header for a segment of data_size record bytes."""
+        header = struct.pack("<BBHI4s", self.size, self.protocol_version, self.profile_version,
+                             data_size, b".FIT")
+        if self.size >= 14:
+            header += struct.pack("<H", crc16(header))
+        return header.ljust(self.size, b"\x00")
+
+
+class FieldDefinition(NamedTuple):
+    """Field of a definition message."""
+
+    number: int
+    size: int
+    base_type: int
+
+
+class DeveloperFieldDefinition(NamedTuple):
+    """Developer field of a definition message."""
+
+    number: int
+    size: int
+    developer_index: int
+
+
+class MessageDefinition(NamedTuple):
+    """Definition message, giving the layout of a local message type."""
+
+    local_type: int
+    # struct byte order of the message's multi-byte fields
+    endian: str
+    global_message_number: int
+    fields: Tuple[FieldDefinition, ...]
+    developer_fields: Tuple[DeveloperFieldDefinition, ...] = ()
+
+    @property
+    def size(self) -> int:
+        """Size of the data messages of this definition."""
+        return sum(field.size for field in self.fields) + sum(field.size for field in self.developer_fields)
+
+    def encode(self) -> bytes:
+        """Encode the definition record, header byte included."""
+        header = 0x40 | self.local_type | (0x20 if self.developer_fields else 0)
+        record = bytearray(struct.pack(f"{self.endian}BBBHB", header, 0, 1 if self.endian == ">" else 0,
+                                       self.global_message_number, len(self.fields)))
+        for field in self.fields:
+            record += bytes(field)
+        if self.developer_fields:
+            record.append(len(self.developer_fields))
+            for field in self.developer_fields:
+                record += bytes(field)
+        return bytes(record)
+
+
+class DataMessage(NamedTuple):
+    """Data message, with the definition it was read with."""
+
+    # Raw record header, keeping compressed timestamps as they are
+    header: int
+    definition: MessageDefinition
+    payload: bytes
+
+    def encode(self) -> bytes:
+        """Encode the data record, header byte included."""
+        return bytes((self.header,)) + self.payload
+
+
+FitMessage = Union[FitHeader, MessageDefinition, DataMessage]
+
+
+def read_fit_messages(stream: BinaryIO) -> Iterator[FitMessage]:
+    """Read the messages of a FIT file one at a time.
+
+    Chained FIT files yield a FitHeader before the records of each segment.
+    Segment CRCs are skipped rather than verified, since FitStreamWriter
+    recalculates them.
+
+    Args:
+        stream: Binary stream positioned at the start of the FIT file
+
+    Yields:
+        The file headers, definition messages and data messages, in file order
+
+    Raises:
+        FitStreamError: If the stream is not a valid FIT file
+    """
+    while True:
+        first = stream.read(1)
+        if not first:
+            return
+
+        header = first + stream.read(11)
+        header_size = header[0]
+        if header_size < 12 or header[8:12] != b".FIT":
+            raise FitStreamError("Invalid FIT header")
+        # Optional header CRC and any extension, rewritten by FitStreamWriter
+        _read_exact(stream, header_size - 12)
+        protocol_version, profile_version, data_size = struct.unpack_from("<BHI", header, 1)
+        yield FitHeader(header_size, protocol_version, profile_version)
+
+        definitions: Dict[int, MessageDefinition] = {}
+        remaining = data_size
+        while remaining > 0:
+            record_header = _read_exact(stream, 1)[0]
+            if record_header & 0x80:
+                # Compressed timestamp header, always a data message
+                local_type = (record_header >> 5) & 0x03
+            elif record_header & 0x40:
+                definition, size = _read_definition(stream, record_header)
+                definitions[definition.local_type] = definition
+                remaining -= 1 + size
+                yield definition
+                continue
+            else:
+                local_type = record_header & 0x0F
+
+            definition = definitions.get(local_type)
+            if definition is None:
+                raise FitStreamError(f"Data message without definition for local type {local_type}")
+            remaining -= 1 + definition.size
+            yield DataMessage(record_header, definition, _read_exact(stream, definition.size))
+
+        if remaining != 0:
+            raise FitStreamError("Last record overruns FIT data size")
+        _read_exact(stream, 2)
+
+
+def _read_definition(stream: BinaryIO, record_header: int) -> Tuple[MessageDefinition, int]:
+    """Read a definition message after its record header.
+
+    Returns:
+        Tuple of the definition and the number of bytes read
+    """
+    fixed = _read_exact(stream, 5)
+    endian = ">" if fixed[1] == 1 else "<"
+    global_message_number, = struct.unpack_from(f"{endian}H", fixed, 2)
+    raw_fields = _read_exact(stream, 3 * fixed[4])
+    size = 5 + len(raw_fields)
+
+    developer_fields: Tuple[DeveloperFieldDefinition, ...] = ()
+    if record_header & 0x20:
+        count = _read_exact(stream, 1)[0]
+        raw_developer_fields = _read_exact(stream, 3 * count)
+        size += 1 + len(raw_developer_fields)
+        developer_fields = tuple(DeveloperFieldDefinition(*raw_developer_fields[i:i + 3])
+                                 for i in range(0, len(raw_developer_fields), 3))
+
+    fields = tuple(FieldDefinition(*raw_fields[i:i + 3]) for i in range(0, len(raw_fields), 3))
+    return MessageDefinition(record_header & 0x0F, endian, global_message_number, fields, developer_fields), size
+
+
+def _read_exact(stream: BinaryIO, size: int) -> bytes:
+    """Read exactly size bytes from a stream."""
+    data = stream.read(size)
+    if len(data) != size:
+        raise FitStreamError("Truncated FIT file")
+    return data
+
+
+class FitStreamWriter:
+    """Writes FIT messages to a stream as they come.
+
+    Records go straight to the output while the CRC is updated over them.
+    When a segment ends, its header is rewritten in place with the final
+    data size and the CRC is completed with the header's, so the output
+    stream has to be seekable.
+    """
+
+    def __init__(self, output: BinaryIO):
+        """Initialize the writer.
+
+        Args:
+            output: Seekable binary stream to write the FIT file to
+        """
+        self.output = output
+        self._header: Optional[FitHeader] = None
+        self._segment_start = 0
+        self._data_size = 0
+        self._crc = 0
+
+    def write(self, message: FitMessage) -> None:
+        """Write a message, starting a new segment on a FitHeader.
+
+        Args:
+            message: Message to write
+
+        Raises:
+            FitStreamError: If a record comes before any file header
+        """
+        if isinstance(message, FitHeader):
+            self._finish_segment()
+            self._header = message
+            self._segment_start = self.output.tell()
+            self._data_size = 0
+            self._crc = 0
+            # Placeholder until the data size is known
+            self.output.write(message.encode(0))
+            return
+
+        if self._header is None:
+            raise FitStreamError("FIT record written before the file header")
+        record = message.encode()
+        self.output.write(record)
+        self._data_size += len(record)
+        self._crc = crc16(record, self._crc)
+
+    def close(self) -> None:
+        """Finish the last segment. The output stream is left open."""
+        self._finish_segment()
+
+    def _finish_segment(self) -> None:
+        """Rewrite the current segment's header and append its CRC."""
+        if self._header is None:
+            return
+
+        header = self._header.encode(self._data_size)
+        crc = crc16_combine(crc16(header), self._crc, self._data_size)
+        self.output.write(struct.pack("<H", crc))
+        end = self.output.tell()
+        self.output.seek(self._segment_start)
+        self.output.write(header)
+        self.output.seek(end)
+        self._header = None
+
+
+class _RewritePlan(NamedTuple):
+    """How to rewrite the data messages of one definition."""
+
+    definition: MessageDefinition
+    # Payload ranges of the fields that are kept
+    kept: List[Tuple[int, int]]
+    # Offset of the developer fields in the original payload
+    developer_start: int
+    # Encoded target field values appended after the kept fields
+    values: bytes
+
+
+class DeviceInfoTransform:
+    """Rewrites the device fields of FileId and DeviceInfo messages in a message stream.
+
+    Unlike FitDevicePatcher, the layout may change: the target fields are
+    moved to the end of their definition as uint16 fields, so messages that
+    lack them, or define them with another size, get them as well.
+    """
+
+    UINT16 = 0x84
+
+    def __init__(self, manufacturer: int, product: int, software_version: float):
+        """Initialize the transform with the device values to write.
+
+        Args:
+            manufacturer: Device manufacturer
+            product: Device product
+            software_version: Software version (e.g. 9.75)
+        """
+        self._values = {
+            "manufacturer": manufacturer,
+            "product": product,
+            "software_version": round(software_version * FitDevicePatcher.SOFTWARE_VERSION_SCALE),
+        }
+
+    def __call__(self, messages: Iterable[FitMessage]) -> Iterator[FitMessage]:
+        """Rewrite a message stream.
+
+        Args:
+            messages: Messages as read by read_fit_messages
+
+        Yields:
+            The messages, with the device definitions and data rewritten
+        """
+        plans: Dict[int, _RewritePlan] = {}
+        for message in messages:
+            if isinstance(message, FitHeader):
+                plans.clear()
+            elif isinstance(message, MessageDefinition):
+                plans.pop(message.local_type, None)
+                targets = FitDevicePatcher.TARGET_FIELDS.get(message.global_message_number)
+                if targets:
+                    plan = plans[message.local_type] = self._plan(message, targets)
+                    message = plan.definition
+            else:
+                plan = plans.get(message.definition.local_type)
+                if plan is not None:
+                    message = self._rewrite(message, plan)
+            yield message
+
+    def _plan(self, definition: MessageDefinition, targets: Dict[int, str]) -> _RewritePlan:
+        """Build the rewritten definition and payload layout of a device message."""
+        fields = []
+        kept = []
+        offset = 0
+        for field in definition.fields:
+            if field.number not in targets:
+                fields.append(field)
+                kept.append((offset, offset + field.size))
+            offset += field.size
+
+        values = b""
+        for number, name in targets.items():
+            fields.append(FieldDefinition(number, FitDevicePatcher.FIELD_SIZE, self.UINT16))
+            values += struct.pack(f"{definition.endian}H", self._values[name])
+
+        return _RewritePlan(definition._replace(fields=tuple(fields)), kept, offset, values)
+
+    @staticmethod
+    def _rewrite(message: DataMessage, plan: _RewritePlan) -> DataMessage:
+        """Rewrite a device data message according to its plan."""
+        payload = b"".join(message.payload[start:end] for start, end in plan.kept)
+        payload += plan.values + message.payload[plan.developer_start:]
+        return DataMessage(message.header, plan.definition, payload)
+
+
+def write_fit_messages(messages: Iterable[FitMessage], output: BinaryIO) -> None:
+    """Write a message stream as a FIT file.
+
+    Args:
+        messages: Messages to write, each segment starting with a FitHeader
+        output: Seekable binary stream to write to
+    """
+    writer = FitStreamWriter(output)
+    for message in messages:
+        writer.write(message)
+    writer.close()
+
+
+def rewrite_device_info(source: BinaryIO, output: BinaryIO, manufacturer: int, product: int,
+                        software_version: float) -> None:
+    """Stream a FIT file to output with new device fields.
+
+    Args:
+        source: Binary stream of the original FIT file
+        output: Seekable binary stream receiving the modified FIT file
+        manufacturer: Device manufacturer
+        product: Device product
+        software_version: Software version
+
+    Raises:
+        FitStreamError: If the source is not a valid FIT file
+    """
+    transform = DeviceInfoTransform(manufacturer, product, software_version)
+    write_fit_messages(transform(read_fit_messages(source)), output)
@@ -0,0 +1,55 @@
+"""FIT activity summary module.
+
+Reads the start time, duration and distance of an activity, which identify
+it well enough to recognise the same activity on Garmin Connect.
+"""
+
+import io
+from datetime import datetime, timezone
+from typing import NamedTuple, Optional
+
+import fitparse
+
+
+class ActivitySummary(NamedTuple):
+    """Identifying figures of an activity."""
+
+    start_time: datetime
+    # Elapsed time in seconds
+    duration: Optional[float]
+    # Distance in meters
+    distance: Optional[float]
+
+
+def read_activity_summary(data: bytes) -> Optional[ActivitySummary]:
+    """Read the summary of a FIT activity file.
+
+    Uses the first session message, falling back to the FileId creation time
+    when the file has no session.
+
+    Args:
+        data: Complete FIT file contents
+
+    Returns:
+        The activity summary, or None if the file has no start time or cannot be parsed
+    """
+    created: Optional[datetime] = None
+    try:
+        for message in fitparse.FitFile(io.BytesIO(data)).get_messages(("file_id", "session")):
+            if message.name == "session" and message.get_value("start_time"):
+                return ActivitySummary(
+                    _as_utc(message.get_value("start_time")),
+                    message.get_value("total_elapsed_time"),
+                    message.get_value("total_distance"),
+                )
+            if message.name == "file_id" and created is None:
+                created = message.get_value("time_created")
+    except fitparse.FitParseError:
+        return None
+
+    return ActivitySummary(_as_utc(created), None, None) if created else None
+
+
+def _as_utc(value: datetime) -> datetime:
+    """Mark a FIT timestamp, which is always UTC, as such."""
+    return value.replace(tzinfo=timezone.utc)
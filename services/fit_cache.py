@@ -0,0 +1,270 @@
+"""Local cache of FIT files.
+
+Keeps downloaded and spoofed FIT files on disk so reruns and reprocessing
+skip both the S3 download and the FIT re-encoding.
+"""
+
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+import tempfile
+import threading
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+
+class FitFileCache:
+    """Content-addressed, size-bounded LRU cache of FIT files.
+
+    File contents are stored once per SHA-256 digest under ``objects/``, and
+    a SQLite index maps cache keys (an activity's fitFileKey, or a spoofing
+    input and its parameters) to digests. Contents are verified against
+    their digest when read. Once the stored contents exceed max_bytes, the
+    least recently used ones are evicted along with the keys pointing to them.
+    """
+
+    DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+    INDEX_NAME = "index.db"
+    # Bytes read at a time when hashing or copying a file
+    CHUNK_SIZE = 1024 * 1024
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS objects (
+            digest TEXT PRIMARY KEY,
+            size INTEGER NOT NULL,
+            accessed_at REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS entries (
+            key TEXT PRIMARY KEY,
+            digest TEXT NOT NULL REFERENCES objects(digest) ON DELETE CASCADE
+        );
+    """
+
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        """Open (and create if needed) the cache directory.
+
+        Args:
+            directory: Directory holding the index and the cached files
+            max_bytes: Maximum total size of the cached files
+        """
+        self.directory = os.path.expanduser(directory)
+        self.max_bytes = max_bytes
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.join(self.directory, "objects"), exist_ok=True)
+        self._connection = sqlite3.connect(os.path.join(self.directory, self.INDEX_NAME),
+                                           check_same_thread=False)
+        with self._connection:
+            self._connection.execute("PRAGMA foreign_keys = ON")
+            self._connection.executescript(self._SCHEMA)
+
+    @staticmethod
+    def content_hash(data: bytes) -> str:
+        """Get the digest FIT contents are addressed by.
+
+        Args:
+            data: FIT file contents
+
+        Returns:
+            SHA-256 hex digest
+        """
+        return hashlib.sha256(data).hexdigest()
+
+    @staticmethod
+    def download_key(activity: Dict[str, Any]) -> str:
+        """Get the cache key of an activity's downloaded FIT file.
+
+        Args:
+            activity: Activity dictionary with fitFileKey
+
+        Returns:
+            Cache key
+        """
+        return f"download:{activity['fitFileKey']}"
+
+    @staticmethod
+    def spoof_key(input_hash: str, manufacturer: int, product: int, software_version: float) -> str:
+        """Get the cache key of a spoofed FIT file.
+
+        Args:
+            input_hash: Digest of the original FIT contents
+            manufacturer: Spoofed device manufacturer
+            product: Spoofed device product
+            software_version: Spoofed software version
+
+        Returns:
+            Cache key
+        """
+        return f"spoof:{input_hash}:{manufacturer}:{product}:{software_version}"
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Get cached contents by key.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            The cached contents, or None if missing or corrupt
+        """
+        with self._lock:
+            row = self._connection.execute("SELECT digest FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            digest = row[0]
+
+            try:
+                with open(self._path(digest), "rb") as file:
+                    data = file.read()
+            except OSError as e:
+                self.logger.warning(f"Dropping unreadable cached FIT file {digest}: {e}")
+                self._delete_object(digest)
+                return None
+
+            if self.content_hash(data) != digest:
+                self.logger.warning(f"Dropping corrupt cached FIT file {digest}")
+                self._delete_object(digest)
+                return None
+
+            with self._connection:
+                self._connection.execute(
+                    "UPDATE objects SET accessed_at = ? WHERE digest = ?", (time.time(), digest)
+                )
+            self.logger.debug(f"FIT cache hit for {key}")
+            return data
+
+    def put(self, key: str, data: bytes) -> str:
+        """Store contents under a key and evict old files beyond the size cap.
+
+        Args:
+            key: Cache key
+            data: FIT file contents
+
+        Returns:
+            Digest of the contents
+        """
+        digest = self.content_hash(data)
+        if len(data) > self.max_bytes:
+            return digest
+
+        with self._lock:
+            path = self._path(digest)
+            if not os.path.exists(path):
+                try:
+                    self._write(path, (data,))
+                except OSError as e:
+                    self.logger.warning(f"Failed to cache FIT file for {key}: {e}")
+                    return digest
+            self._add_entry(key, digest, len(data))
+        return digest
+
+    def put_file(self, key: str, file_path: str) -> str:
+        """Store a file's contents under a key, reading it in chunks.
+
+        Unlike put, memory use does not depend on the file size.
+
+        Args:
+            key: Cache key
+            file_path: Path of the FIT file
+
+        Returns:
+            Digest of the contents
+        """
+        size = os.path.getsize(file_path)
+        hasher = hashlib.sha256()
+        for chunk in self._read_chunks(file_path):
+            hasher.update(chunk)
+        digest = hasher.hexdigest()
+        if size > self.max_bytes:
+            return digest
+
+        with self._lock:
+            path = self._path(digest)
+            if not os.path.exists(path):
+                try:
+                    self._write(path, self._read_chunks(file_path))
+                except OSError as e:
+                    self.logger.warning(f"Failed to cache FIT file for {key}: {e}")
+                    return digest
+            self._add_entry(key, digest, size)
+        return digest
+
+    @property
+    def size(self) -> int:
+        """Total size of the cached files."""
+        with self._lock:
+            return self._connection.execute("SELECT COALESCE(SUM(size), 0) FROM objects").fetchone()[0]
+
+    def close(self) -> None:
+        """Close the index database."""
+        with self._lock:
+            self._connection.close()
+
+    def _path(self, digest: str) -> str:
+        """Get the on-disk path of a digest's contents."""
+        return os.path.join(self.directory, "objects", digest[:2], digest + ".fit")
+
+    def _add_entry(self, key: str, digest: str, size: int) -> None:
+        """Index a stored file under a key and evict old files beyond the size cap."""
+        with self._connection:
+            self._connection.execute(
+                "INSERT INTO objects (digest, size, accessed_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(digest) DO UPDATE SET accessed_at = excluded.accessed_at",
+                (digest, size, time.time()),
+            )
+            self._connection.execute(
+                "INSERT INTO entries (key, digest) VALUES (?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET digest = excluded.digest",
+                (key, digest),
+            )
+        self._evict()
+
+    def _read_chunks(self, file_path: str) -> Iterator[bytes]:
+        """Read a file CHUNK_SIZE bytes at a time."""
+        with open(file_path, "rb") as file:
+            while True:
+                chunk = file.read(self.CHUNK_SIZE)
+                if not chunk:
+                    return
+                yield chunk
+
+    def _write(self, path: str, chunks: Iterable[bytes]) -> None:
+        """Atomically write contents to their path."""
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".fit_")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                for chunk in chunks:
+                    file.write(chunk)
+            os.replace(temp_path, path)
+        except OSError:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def _evict(self) -> None:
+        """Evict the least recently used files until the cache fits max_bytes."""
+        total = self._connection.execute("SELECT COALESCE(SUM(size), 0) FROM objects").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        rows = self._connection.execute("SELECT digest, size FROM objects ORDER BY accessed_at").fetchall()
+        for digest, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._delete_object(digest)
+            total -= size
+            self.logger.debug(f"Evicted cached FIT file {digest}")
+
+    def _delete_object(self, digest: str) -> None:
+        """Remove a file and every key pointing to it."""
+        with self._connection:
+            self._connection.execute("DELETE FROM objects WHERE digest = ?", (digest,))
+        try:
+            os.remove(self._path(digest))
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            self.logger.warning(f"Failed to remove cached FIT file {digest}: {e}")
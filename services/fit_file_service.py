@@ -1,27 +1,48 @@
 """FIT file service for handling file modifications."""
 
+import io
 import os
 import tempfile
 import logging
-from typing import Optional
-from fit_tool.fit_file import FitFile
-from fit_tool.profile.messages.device_info_message import DeviceInfoMessage
-from fit_tool.profile.messages.file_id_message import FileIdMessage
+from collections import deque
+from concurrent.futures import Executor, Future
+from typing import Any, Deque, Iterable, Iterator, NamedTuple, Optional, Tuple, Union
 from fit_tool.profile.profile_type import Manufacturer, GarminProduct
-from fit_tool.fit_file_builder import FitFileBuilder
+from services.fit import ActivitySummary, FitDevicePatcher, FitPatchError, read_activity_summary, rewrite_device_info
+from services.fit_cache import FitFileCache
+from services.process_pool import create_process_pool
+
+
+class ModifyResult(NamedTuple):
+    """Outcome of one item of FitFileService.modify_many."""
+
+    index: int
+    # Path of the modified file for path inputs, modified contents for in-memory inputs
+    output: Optional[Union[str, bytes]]
+    error: Optional[Exception]
 
 
 class FitFileService:
     """Service for modifying FIT files."""
 
-    def __init__(self):
-        """Initialize FitFileService."""
+    def __init__(self, binary_patch: bool = True, cache: Optional[FitFileCache] = None):
+        """Initialize FitFileService.
+
+        Args:
+            binary_patch: Try patching the device fields in place before
+                falling back to rewriting the file as a stream of records
+            cache: Local FIT file cache keeping modified outputs, keyed by the
+                input contents and the spoofed device
+        """
+        self.binary_patch = binary_patch
+        self.cache = cache
         self.logger = logging.getLogger(__name__)
 
     def modify_device_info(self, fit_file_path: str,
                           manufacturer: Optional[int] = None,
                           product: Optional[int] = None,
-                          software_version: Optional[float] = None) -> str:
+                          software_version: Optional[float] = None,
+                          output_path: Optional[str] = None) -> str:
         """Modifies the device manufacturer and type in a .fit file.
 
         Args:
@@ -29,6 +50,8 @@ class FitFileService:
             manufacturer: Device manufacturer (defaults to Garmin)
             product: Device product (defaults to Edge 530)
             software_version: Software version (defaults to 9.75)
+            output_path: Path of the modified file (defaults to
+                modified_<name> in the temporary directory)
 
         Returns:
             Path to the modified FIT file
@@ -40,37 +63,33 @@ class FitFileService:
         if not os.path.exists(fit_file_path):
             raise FileNotFoundError(f"FIT file not found: {fit_file_path}")
 
-        # Set defaults
-        manufacturer = manufacturer or Manufacturer.GARMIN.value
-        product = product or GarminProduct.EDGE_530.value
-        software_version = software_version or 9.75
+        manufacturer, product, software_version = self._with_defaults(manufacturer, product, software_version)
 
         self.logger.info(f"Modifying FIT file: {fit_file_path}")
 
+        modified_fit_file_path = output_path or self.modified_file_path(fit_file_path)
+
         try:
-            content = FitFile.from_file(fit_file_path)
-
-            # Set auto_define to true, so that the builder creates the required Definition Messages
-            builder = FitFileBuilder(auto_define=True, min_string_size=50)
-
-            for record in content.records:
-                message = record.message
-                if isinstance(message, FileIdMessage):
-                    message.manufacturer = manufacturer
-                    message.product = product
-                elif isinstance(message, DeviceInfoMessage):
-                    message.manufacturer = manufacturer
-                    message.product = product
-                    message.software_version = software_version
-                builder.add(message)
-
-            # Build the FIT file object
-            fit_file = builder.build()
-
-            # Save the modified FIT file
-            temp_dir = tempfile.gettempdir()
-            modified_fit_file_path = os.path.join(temp_dir, "modified_" + os.path.basename(fit_file_path))
-            fit_file.to_file(modified_fit_file_path)
+            if self.cache:
+                # Go through the in-memory path so the output is cached
+                with open(fit_file_path, "rb") as file:
+                    data = file.read()
+                with open(modified_fit_file_path, "wb") as file:
+                    file.write(self._modify_cached(data, manufacturer, product, software_version))
+                self.logger.info(f"Modified FIT file saved to {modified_fit_file_path}")
+                return modified_fit_file_path
+
+            patched = None
+            if self.binary_patch:
+                with open(fit_file_path, "rb") as file:
+                    patched = self._patch_device_info(file.read(), manufacturer, product, software_version)
+
+            if patched is not None:
+                with open(modified_fit_file_path, "wb") as file:
+                    file.write(patched)
+            else:
+                with open(fit_file_path, "rb") as source, open(modified_fit_file_path, "wb") as output:
+                    rewrite_device_info(source, output, manufacturer, product, software_version)
 
             self.logger.info(f"Modified FIT file saved to {modified_fit_file_path}")
             return modified_fit_file_path
@@ -78,6 +97,249 @@ class FitFileService:
         except Exception as e:
             raise RuntimeError(f"Failed to modify FIT file: {e}") from e
 
+    def modify_device_info_bytes(self, data: bytes,
+                                 manufacturer: Optional[int] = None,
+                                 product: Optional[int] = None,
+                                 software_version: Optional[float] = None) -> bytes:
+        """Modifies the device manufacturer and type of in-memory FIT data.
+
+        Args:
+            data: Raw contents of the original FIT file
+            manufacturer: Device manufacturer (defaults to Garmin)
+            product: Device product (defaults to Edge 530)
+            software_version: Software version (defaults to 9.75)
+
+        Returns:
+            Raw contents of the modified FIT file
+
+        Raises:
+            RuntimeError: If modification fails
+        """
+        manufacturer, product, software_version = self._with_defaults(manufacturer, product, software_version)
+
+        self.logger.info(f"Modifying FIT data ({len(data)} bytes)")
+
+        try:
+            if self.cache:
+                return self._modify_cached(data, manufacturer, product, software_version)
+            return self._modify(data, manufacturer, product, software_version)
+
+        except Exception as e:
+            raise RuntimeError(f"Failed to modify FIT file: {e}") from e
+
+    def submit_modify_device_info_bytes(self, executor: Executor, data: bytes,
+                                        manufacturer: Optional[int] = None,
+                                        product: Optional[int] = None,
+                                        software_version: Optional[float] = None) -> "Future[bytes]":
+        """Modify in-memory FIT data on an executor.
+
+        The work is picklable, so a ProcessPoolExecutor can take the CPU-bound
+        rewriting off the calling process. The cache, if configured, is
+        checked and filled in the calling process.
+
+        Args:
+            executor: Executor running the modification
+            data: Raw contents of the original FIT file
+            manufacturer: Device manufacturer (defaults to Garmin)
+            product: Device product (defaults to Edge 530)
+            software_version: Software version (defaults to 9.75)
+
+        Returns:
+            Future of the modified FIT contents, failing with RuntimeError if
+            modification fails
+        """
+        manufacturer, product, software_version = self._with_defaults(manufacturer, product, software_version)
+
+        key = None
+        if self.cache:
+            key = FitFileCache.spoof_key(FitFileCache.content_hash(data), manufacturer, product, software_version)
+            cached = self.cache.get(key)
+            if cached is not None:
+                self.logger.info("Using cached modified FIT data")
+                future: "Future[bytes]" = Future()
+                future.set_result(cached)
+                return future
+
+        self.logger.info(f"Modifying FIT data ({len(data)} bytes)")
+        future = executor.submit(_modify_device_info, self.binary_patch, data,
+                                 manufacturer, product, software_version)
+        if key is not None:
+            future.add_done_callback(
+                lambda done: self.cache.put(key, done.result()) if done.exception() is None else None
+            )
+        return future
+
+    def modify_many(self, items: Iterable[Union[str, "os.PathLike[str]", bytes]],
+                    workers: Optional[int] = None, executor: Optional[Executor] = None,
+                    manufacturer: Optional[int] = None,
+                    product: Optional[int] = None,
+                    software_version: Optional[float] = None,
+                    output_dir: Optional[str] = None) -> Iterator[ModifyResult]:
+        """Modify many FIT files in parallel worker processes.
+
+        Paths are handed to the workers as they are: each worker reads its
+        file and writes it to a new modified_*_<name> file of output_dir, so
+        no FIT data is pickled either way and inputs sharing a name do not
+        overwrite each other. In-memory data is sent to the workers and
+        goes through the cache, if configured, in this process. At most twice
+        workers items are in flight, and a failed item is reported in its
+        result's error instead of stopping the others.
+
+        Args:
+            items: FIT file paths or raw FIT contents; consumed lazily
+            workers: Number of worker processes (defaults to the number of CPUs)
+            executor: Executor to run the modifications on instead of a new process pool
+            manufacturer: Device manufacturer (defaults to Garmin)
+            product: Device product (defaults to Edge 530)
+            software_version: Software version (defaults to 9.75)
+            output_dir: Directory of the modified files of path items
+                (defaults to the temporary directory)
+
+        Yields:
+            A ModifyResult per item, in input order
+        """
+        device = self._with_defaults(manufacturer, product, software_version)
+        workers = workers or os.cpu_count() or 1
+        pool = executor or create_process_pool(workers)
+        pending = enumerate(items)
+        in_flight: Deque[Tuple[int, Future]] = deque()
+
+        try:
+            while True:
+                while len(in_flight) < 2 * workers:
+                    item = next(pending, None)
+                    if item is None:
+                        break
+                    in_flight.append((item[0], self._submit_modify(pool, item[1], output_dir, *device)))
+                if not in_flight:
+                    return
+
+                index, future = in_flight.popleft()
+                try:
+                    result = ModifyResult(index, future.result(), None)
+                except Exception as e:
+                    self.logger.error(f"Failed to modify FIT item {index}: {e}")
+                    result = ModifyResult(index, None, e)
+                yield result
+        finally:
+            if executor is None:
+                pool.shutdown(wait=False, cancel_futures=True)
+
+    def _submit_modify(self, executor: Executor, item: Any, output_dir: Optional[str], manufacturer: int,
+                       product: int, software_version: float) -> Future:
+        """Start modifying a path or in-memory FIT item for modify_many.
+
+        Returns:
+            Future of the modified path or contents, failed if the item could not be submitted
+        """
+        try:
+            if isinstance(item, (bytes, bytearray, memoryview)):
+                return self.submit_modify_device_info_bytes(executor, bytes(item), manufacturer, product,
+                                                            software_version)
+            path = os.fspath(item)
+            # Reserve a unique output file, removed again if the item fails
+            fd, output_path = tempfile.mkstemp(prefix="modified_", suffix="_" + os.path.basename(path),
+                                               dir=output_dir)
+            os.close(fd)
+            try:
+                future = executor.submit(_modify_device_info_file, self.binary_patch, path, output_path,
+                                         manufacturer, product, software_version)
+            except Exception:
+                self.cleanup_file(output_path)
+                raise
+            future.add_done_callback(
+                lambda done: self.cleanup_file(output_path) if done.cancelled() or done.exception() else None
+            )
+            return future
+        except Exception as e:
+            failed: Future = Future()
+            failed.set_exception(e)
+            return failed
+
+    @staticmethod
+    def modified_file_path(fit_file_path: str) -> str:
+        """Build the default path of a modified FIT file.
+
+        Args:
+            fit_file_path: Path to the original FIT file
+
+        Returns:
+            Path of modified_<name> in the temporary directory
+        """
+        return os.path.join(tempfile.gettempdir(), "modified_" + os.path.basename(fit_file_path))
+
+    def read_activity_summary(self, data: bytes) -> Optional[ActivitySummary]:
+        """Read the start time, duration and distance of in-memory FIT data.
+
+        Args:
+            data: Raw contents of the FIT file
+
+        Returns:
+            The activity summary, or None if it cannot be read
+        """
+        summary = read_activity_summary(data)
+        if summary is None:
+            self.logger.warning("Could not read the activity summary of the FIT data")
+        return summary
+
+    def _modify(self, data: bytes, manufacturer: int, product: int, software_version: float) -> bytes:
+        """Modify in-memory FIT data, patching in place when possible."""
+        if self.binary_patch:
+            patched = self._patch_device_info(data, manufacturer, product, software_version)
+            if patched is not None:
+                return patched
+
+        output = io.BytesIO()
+        rewrite_device_info(io.BytesIO(data), output, manufacturer, product, software_version)
+        return output.getvalue()
+
+    def _modify_cached(self, data: bytes, manufacturer: int, product: int, software_version: float) -> bytes:
+        """Modify in-memory FIT data, reusing the cached output for the same input and device."""
+        key = FitFileCache.spoof_key(FitFileCache.content_hash(data), manufacturer, product, software_version)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.logger.info("Using cached modified FIT data")
+            return cached
+
+        modified = self._modify(data, manufacturer, product, software_version)
+        self.cache.put(key, modified)
+        return modified
+
+    @staticmethod
+    def _with_defaults(manufacturer: Optional[int], product: Optional[int],
+                       software_version: Optional[float]) -> Tuple[int, int, float]:
+        """Fill in the default spoofed device for any missing value.
+
+        Returns:
+            Tuple of manufacturer, product and software version
+        """
+        return (
+            manufacturer or Manufacturer.GARMIN.value,
+            product or GarminProduct.EDGE_530.value,
+            software_version or 9.75,
+        )
+
+    def _patch_device_info(self, data: bytes, manufacturer: int, product: int,
+                           software_version: float) -> Optional[bytes]:
+        """Rewrite the device fields directly in the FIT bytes.
+
+        Args:
+            data: Raw contents of the original FIT file
+            manufacturer: Device manufacturer
+            product: Device product
+            software_version: Software version
+
+        Returns:
+            Patched FIT contents, or None if the file cannot be patched in place
+        """
+        buffer = bytearray(data)
+        try:
+            FitDevicePatcher(manufacturer, product, software_version).patch(buffer)
+        except FitPatchError as e:
+            self.logger.info(f"In-place patch not possible, rewriting FIT file: {e}")
+            return None
+        return bytes(buffer)
+
     def cleanup_file(self, file_path: str) -> None:
         """Clean up a temporary file.
 
@@ -90,3 +352,19 @@ class FitFileService:
                 self.logger.info(f"Cleaned up file: {file_path}")
         except OSError as e:
             self.logger.warning(f"Failed to cleanup file {file_path}: {e}")
+
+
+def _modify_device_info(binary_patch: bool, data: bytes, manufacturer: int, product: int,
+                        software_version: float) -> bytes:
+    """Modify FIT data in an executor worker, possibly in another process."""
+    try:
+        return FitFileService(binary_patch)._modify(data, manufacturer, product, software_version)
+    except Exception as e:
+        raise RuntimeError(f"Failed to modify FIT file: {e}") from e
+
+
+def _modify_device_info_file(binary_patch: bool, fit_file_path: str, output_path: str, manufacturer: int,
+                             product: int, software_version: float) -> str:
+    """Modify a FIT file in an executor worker, possibly in another process."""
+    return FitFileService(binary_patch).modify_device_info(fit_file_path, manufacturer, product, software_version,
+                                                           output_path)
@@ -0,0 +1,151 @@
+"""Local index of Garmin Connect activities for duplicate detection."""
+
+import sqlite3
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Optional
+
+from services.fit import ActivitySummary
+
+
+class GarminActivityIndex:
+    """SQLite-backed index of the activities already on Garmin Connect.
+
+    Filled from one bulk activity listing and updated after every upload, so
+    an activity can be checked for an existing copy on Garmin Connect without
+    a request per upload. Activities are matched by start time, and by
+    duration and distance when both sides know them.
+    """
+
+    # Garmin Connect reports start times to the second; devices may round differently
+    START_TOLERANCE = 60
+    # Relative difference allowed between durations and between distances
+    MATCH_TOLERANCE = 0.1
+    GARMIN_TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS garmin_activities (
+            activity_id TEXT PRIMARY KEY,
+            start_time REAL NOT NULL,
+            duration REAL,
+            distance REAL
+        );
+        CREATE INDEX IF NOT EXISTS garmin_activities_start_time ON garmin_activities (start_time);
+    """
+
+    _UPSERT = (
+        "INSERT INTO garmin_activities (activity_id, start_time, duration, distance) VALUES (?, ?, ?, ?) "
+        "ON CONFLICT(activity_id) DO UPDATE SET "
+        "start_time = excluded.start_time, duration = excluded.duration, distance = excluded.distance"
+    )
+
+    def __init__(self, db_path: str = ":memory:", start_tolerance: float = START_TOLERANCE,
+                 match_tolerance: float = MATCH_TOLERANCE):
+        """Open (and create if needed) the index database.
+
+        Args:
+            db_path: Path to the SQLite database file, or ":memory:"
+            start_tolerance: Seconds two start times may differ by and still match
+            match_tolerance: Relative difference allowed between durations and
+                between distances
+        """
+        self.db_path = db_path
+        self.start_tolerance = start_tolerance
+        self.match_tolerance = match_tolerance
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(db_path, check_same_thread=False)
+        with self._connection:
+            self._connection.executescript(self._SCHEMA)
+
+    def load(self, activities: Iterable[Dict[str, Any]]) -> int:
+        """Replace the indexed activities with a Garmin Connect listing.
+
+        The listing is taken as complete from its oldest activity on, so
+        indexed activities in that period that are missing from it (deleted
+        on Garmin Connect) are dropped. Older entries are kept.
+
+        Args:
+            activities: Activity dictionaries as returned by Garmin.get_activities
+
+        Returns:
+            Number of activities indexed from the listing
+        """
+        rows = []
+        for activity in activities:
+            try:
+                start = datetime.strptime(activity["startTimeGMT"], self.GARMIN_TIME_FORMAT)
+            except (KeyError, TypeError, ValueError):
+                self.logger.debug(f"Skipping Garmin activity without start time: {activity.get('activityId')}")
+                continue
+            rows.append((
+                str(activity["activityId"]),
+                start.replace(tzinfo=timezone.utc).timestamp(),
+                activity.get("duration"),
+                activity.get("distance"),
+            ))
+
+        with self._lock, self._connection:
+            if rows:
+                oldest = min(row[1] for row in rows)
+                self._connection.execute(
+                    "DELETE FROM garmin_activities WHERE start_time >= ? "
+                    f"AND activity_id NOT IN ({', '.join('?' * len(rows))})",
+                    (oldest, *(row[0] for row in rows)),
+                )
+            self._connection.executemany(self._UPSERT, rows)
+
+        self.logger.info(f"Indexed {len(rows)} Garmin Connect activities")
+        return len(rows)
+
+    def add(self, activity_id: Any, summary: ActivitySummary) -> None:
+        """Index an activity, typically right after uploading it.
+
+        Args:
+            activity_id: Garmin Connect activity ID
+            summary: Summary of the uploaded activity
+        """
+        with self._lock, self._connection:
+            self._connection.execute(
+                self._UPSERT,
+                (str(activity_id), summary.start_time.timestamp(), summary.duration, summary.distance),
+            )
+
+    def find_duplicate(self, summary: ActivitySummary) -> Optional[str]:
+        """Find an indexed activity matching a summary.
+
+        Args:
+            summary: Summary of the activity about to be uploaded
+
+        Returns:
+            ID of the matching Garmin Connect activity, or None if there is none
+        """
+        start = summary.start_time.timestamp()
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT activity_id, duration, distance FROM garmin_activities "
+                "WHERE start_time BETWEEN ? AND ? ORDER BY ABS(start_time - ?)",
+                (start - self.start_tolerance, start + self.start_tolerance, start),
+            ).fetchall()
+
+        for activity_id, duration, distance in rows:
+            if self._close(duration, summary.duration) and self._close(distance, summary.distance):
+                return activity_id
+        return None
+
+    def _close(self, indexed: Optional[float], value: Optional[float]) -> bool:
+        """Check whether two figures match, treating an unknown one as matching."""
+        if indexed is None or value is None:
+            return True
+        return abs(indexed - value) <= self.match_tolerance * max(abs(indexed), abs(value))
+
+    def __len__(self) -> int:
+        """Number of indexed activities."""
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM garmin_activities").fetchone()[0]
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._connection.close()
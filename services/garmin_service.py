@@ -1,7 +1,17 @@
 """Garmin service for handling authentication and activity uploads."""
 
+import io
+import os
+import re
+import time
 import logging
-from typing import Dict, Any
+import tempfile
+import threading
+from datetime import datetime, timezone
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Dict, Any, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+import requests
 from garminconnect import (
     Garmin,
     GarminConnectAuthenticationError,
@@ -9,26 +19,81 @@ from garminconnect import (
     GarminConnectConnectionError
 )
 
+from services.garmin_index import GarminActivityIndex
+from services.rate_limit import RateLimiter
+from services.zwift.retry import RetryPolicy
+
+
+class GarminDuplicateActivityError(RuntimeError):
+    """Raised when Garmin Connect rejects an upload because the activity is already there."""
+
+    pass
+
+
+class UploadResult(NamedTuple):
+    """Outcome of one upload from GarminService.upload_many."""
+
+    # Position of the upload in the input
+    index: int
+    file_name: str
+    response: Optional[Dict[str, Any]]
+    error: Optional[Exception]
+    attempts: int
+    # Garmin Connect rejected the upload because it already has the activity
+    duplicate: bool = False
+
 
 class GarminService:
     """Service for interacting with Garmin Connect."""
 
-    def __init__(self, username: str, password: str):
+    # Rate limiter bucket shared by all uploads and API calls
+    UPLOAD_HOST = "connectapi.garmin.com"
+    # File name garminconnect uses when the token store is a directory
+    TOKEN_FILE_NAME = "garmin_tokens.json"
+    TOKEN_FILE_MODE = 0o600
+    TOKEN_DIR_MODE = 0o700
+    # Shared pause after Garmin Connect answers 429, doubled while it keeps doing so
+    THROTTLE_DELAY = 30.0
+    MAX_THROTTLE_DELAY = 900.0
+    # Rate limited attempts allowed per upload; they do not count as failed attempts
+    MAX_THROTTLED_ATTEMPTS = 8
+    _API_ERROR_STATUS = re.compile(r"API Error (\d{3})")
+
+    def __init__(self, username: str, password: str, rate_limiter: Optional[RateLimiter] = None,
+                 token_store: Optional[str] = None, retry: Optional[RetryPolicy] = None,
+                 lazy_auth: bool = False):
         """Initialize GarminService with credentials.
 
         Args:
             username: Garmin Connect username
             password: Garmin Connect password
+            rate_limiter: Rate limiter acquired before every upload and API call
+            token_store: Path of the file (or directory) where the Garmin
+                session tokens are saved and resumed from
+            retry: Retry policy of upload_many (a default one is created)
+            lazy_auth: Authenticate on first use instead of requiring an
+                explicit authenticate() call
         """
         self.username = username
         self.password = password
+        self.rate_limiter = rate_limiter
+        self.token_store = os.path.expanduser(token_store) if token_store else None
+        self.retry = retry or RetryPolicy(backoff_factor=2.0, max_backoff=60.0, failure_threshold=None)
         self.client: Garmin = Garmin(username, password)
         self.logger = logging.getLogger(__name__)
+        self.lazy_auth = lazy_auth
         self._authenticated = False
+        self._auth_lock = threading.Lock()
+        self._throttle_lock = threading.Lock()
+        self._throttle_delay = 0.0
+        self._throttled_until = 0.0
 
     def authenticate(self) -> None:
         """Authenticate with Garmin Connect.
 
+        With a token store, the saved session is resumed and a full login with
+        the credentials only happens when there is none or it is rejected.
+
         Raises:
             GarminConnectAuthenticationError: Invalid credentials
             GarminConnectTooManyRequestsError: Rate limit exceeded
@@ -38,7 +103,10 @@ class GarminService:
         self.logger.info("Logging in to Garmin Connect...")
 
         try:
-            self.client.login()
+            if self.token_store:
+                self._login_with_token_store()
+            else:
+                self.client.login()
             self._authenticated = True
             self.logger.info("Successfully authenticated with Garmin Connect")
         except GarminConnectAuthenticationError:
@@ -54,6 +122,75 @@ class GarminService:
             self.logger.exception(f"Failed to login to Garmin Connect: {e}")
             raise RuntimeError(f"Authentication failed: {e}") from e
 
+    def ensure_authenticated(self) -> None:
+        """Authenticate unless already authenticated.
+
+        Safe to call from several threads at once; only one of them logs in.
+
+        Raises:
+            Same exceptions as authenticate
+        """
+        with self._auth_lock:
+            if not self._authenticated:
+                self.authenticate()
+
+    def _require_authentication(self, action: str) -> None:
+        """Authenticate now in lazy mode, otherwise fail if not authenticated.
+
+        Args:
+            action: What needs authentication, used in the error message
+
+        Raises:
+            RuntimeError: If not authenticated and not in lazy mode
+        """
+        if self.lazy_auth:
+            self.ensure_authenticated()
+        elif not self._authenticated:
+            raise RuntimeError(f"Must authenticate before {action}")
+
+    def _token_file(self) -> str:
+        """Get the path of the token file inside the token store."""
+        if self.token_store.endswith(".json"):
+            return self.token_store
+        return os.path.join(self.token_store, self.TOKEN_FILE_NAME)
+
+    def _login_with_token_store(self) -> None:
+        """Resume the saved session, falling back to a full login, and save the session."""
+        token_file = self._token_file()
+        if os.path.exists(token_file):
+            self.logger.info("Resuming saved Garmin Connect session...")
+            try:
+                self.client.login(tokenstore=token_file)
+            except (GarminConnectAuthenticationError, GarminConnectConnectionError) as e:
+                self.logger.warning(f"Saved Garmin Connect session was rejected, logging in again: {e}")
+                self.client.login()
+        else:
+            self.client.login()
+
+        self._save_session(token_file)
+
+    def _save_session(self, token_file: str) -> None:
+        """Write the session tokens to the token store, readable by the owner only.
+
+        The tokens go to a new owner-only file that then replaces the token
+        file, so they are never readable by others, even briefly.
+        """
+        temp_path = None
+        try:
+            directory = os.path.dirname(os.path.abspath(token_file))
+            os.makedirs(directory, mode=self.TOKEN_DIR_MODE, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".garmin_tokens_", suffix=".tmp")
+            os.chmod(temp_path, self.TOKEN_FILE_MODE)
+            with os.fdopen(fd, "w") as file:
+                file.write(self.client.client.dumps())
+            os.replace(temp_path, token_file)
+            temp_path = None
+        except Exception as e:
+            self.logger.warning(f"Failed to save Garmin Connect session: {e}")
+        finally:
+            if temp_path is not None and os.path.exists(temp_path):
+                os.remove(temp_path)
+
     def upload_activity(self, fit_file_path: str) -> Dict[str, Any]:
         """Upload a .fit file to Garmin Connect.
 
@@ -64,12 +201,13 @@ class GarminService:
             Upload response from Garmin Connect
 
         Raises:
+            GarminDuplicateActivityError: If the activity is already on Garmin Connect
             RuntimeError: If not authenticated or upload fails
         """
-        if not self._authenticated:
-            raise RuntimeError("Must authenticate before uploading activities")
+        self._require_authentication("uploading activities")
 
         self.logger.info(f"Uploading {fit_file_path} to Garmin Connect...")
+        self._acquire_api_slot()
 
         try:
             response = self.client.upload_activity(fit_file_path)
@@ -77,9 +215,245 @@ class GarminService:
             self.logger.debug(f"Upload response: {response}")
             return response
         except Exception as e:
+            if self.is_duplicate_error(e):
+                self.logger.info(f"Activity is already on Garmin Connect: {e}")
+                raise GarminDuplicateActivityError(f"Upload failed: {e}") from e
             self.logger.exception(f"Failed to upload activity: {e}")
             raise RuntimeError(f"Upload failed: {e}") from e
 
+    def upload_activity_bytes(self, data: bytes, file_name: str) -> Dict[str, Any]:
+        """Upload in-memory .fit data to Garmin Connect.
+
+        Posts the payload the same way ``Garmin.upload_activity`` does, without
+        requiring the data to be written to disk first.
+
+        Args:
+            data: Raw FIT file contents
+            file_name: File name reported to Garmin Connect (must end in .fit)
+
+        Returns:
+            Upload response from Garmin Connect
+
+        Raises:
+            GarminDuplicateActivityError: If the activity is already on Garmin Connect
+            RuntimeError: If not authenticated or upload fails
+        """
+        self._require_authentication("uploading activities")
+
+        self.logger.info(f"Uploading {file_name} ({len(data)} bytes) to Garmin Connect...")
+
+        try:
+            response = self._post_activity(data, file_name)
+            self.logger.info("Upload successful")
+            self.logger.debug(f"Upload response: {response}")
+            return response
+        except Exception as e:
+            if self.is_duplicate_error(e):
+                self.logger.info(f"Activity is already on Garmin Connect: {e}")
+                raise GarminDuplicateActivityError(f"Upload failed: {e}") from e
+            self.logger.exception(f"Failed to upload activity: {e}")
+            raise RuntimeError(f"Upload failed: {e}") from e
+
+    def upload_many(self, uploads: Iterable[Tuple[bytes, str]],
+                    max_workers: int = 4) -> Iterator[UploadResult]:
+        """Upload several in-memory .fit files concurrently.
+
+        At most max_workers uploads run at a time, each one still going
+        through the rate limiter. Connection errors and 5xx responses are
+        retried with backoff up to the retry policy's max_attempts. When
+        Garmin Connect rate limits an upload, every worker pauses for a
+        shared, growing delay and the upload is retried without using up its
+        attempts. An upload rejected because Garmin Connect already has the
+        activity is reported as a duplicate, and other errors fail the upload
+        right away. A failed upload is reported in its result's error instead
+        of stopping the others.
+
+        Args:
+            uploads: (data, file_name) pairs; consumed lazily
+            max_workers: Maximum number of concurrent uploads
+
+        Yields:
+            An UploadResult per upload, in completion order
+
+        Raises:
+            RuntimeError: If not authenticated
+        """
+        self._require_authentication("uploading activities")
+
+        pending = enumerate(uploads)
+        futures: Dict[Future, Tuple[int, str]] = {}
+
+        def fill() -> None:
+            while len(futures) < max_workers:
+                item = next(pending, None)
+                if item is None:
+                    return
+                index, (data, file_name) = item
+                futures[executor.submit(self._upload_with_retries, index, data, file_name)] = (index, file_name)
+
+        executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="garmin-upload")
+        try:
+            fill()
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    futures.pop(future)
+                    yield future.result()
+                fill()
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _upload_with_retries(self, index: int, data: bytes, file_name: str) -> UploadResult:
+        """Upload one file for upload_many, retrying transient failures."""
+        attempts = 0
+        failures = 0
+        throttled = 0
+        while True:
+            self._wait_for_throttle()
+            attempts += 1
+            try:
+                response = self._post_activity(data, file_name)
+            except Exception as e:
+                kind = self._classify_error(e)
+                if kind == "duplicate":
+                    self.logger.info(f"{file_name} is already on Garmin Connect: {e}")
+                    return UploadResult(index, file_name, None, None, attempts, duplicate=True)
+                if kind == "throttled" and throttled < self.MAX_THROTTLED_ATTEMPTS:
+                    throttled += 1
+                    delay = self._throttle()
+                    self.logger.warning(f"Garmin Connect rate limited {file_name}, pausing uploads for {delay:.0f}s")
+                    continue
+                failures += 1
+                if kind == "transient" and failures < self.retry.max_attempts:
+                    delay = self.retry.backoff(failures)
+                    self.logger.warning(f"Upload of {file_name} failed ({e}), retrying in {delay:.1f}s")
+                    self.retry.wait(delay)
+                    continue
+
+                self.logger.error(f"Failed to upload {file_name}: {e}")
+                return UploadResult(index, file_name, None, e, attempts)
+
+            with self._throttle_lock:
+                self._throttle_delay = 0.0
+            self.logger.info(f"Uploaded {file_name}")
+            self.logger.debug(f"Upload response: {response}")
+            return UploadResult(index, file_name, response, None, attempts)
+
+    @classmethod
+    def is_duplicate_error(cls, error: Exception) -> bool:
+        """Tell whether an upload error is Garmin Connect rejecting an existing activity.
+
+        Args:
+            error: Error raised by an upload, possibly wrapping the garminconnect error
+
+        Returns:
+            True if Garmin Connect answered 409 Conflict
+        """
+        while error is not None:
+            if isinstance(error, GarminDuplicateActivityError) or cls._api_error_status(error) == 409:
+                return True
+            error = error.__cause__
+        return False
+
+    @classmethod
+    def _api_error_status(cls, error: Exception) -> Optional[int]:
+        """Get the HTTP status of a garminconnect API error, if it is one."""
+        if not isinstance(error, GarminConnectConnectionError):
+            return None
+        # garminconnect reports HTTP errors as "API Error <status> - <message>"
+        match = cls._API_ERROR_STATUS.search(str(error))
+        return int(match.group(1)) if match else None
+
+    def _classify_error(self, error: Exception) -> str:
+        """Classify an upload error as "duplicate", "throttled", "transient" or "fatal"."""
+        if isinstance(error, GarminConnectTooManyRequestsError):
+            return "throttled"
+        if isinstance(error, GarminConnectConnectionError):
+            status = self._api_error_status(error)
+            if status is None:
+                return "transient"
+            if status == 409:
+                return "duplicate"
+            if status == 429:
+                return "throttled"
+            return "transient" if status in self.retry.retry_statuses else "fatal"
+        if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+            return "transient"
+        return "fatal"
+
+    def _throttle(self) -> float:
+        """Pause all uploads after a 429, growing the pause while they keep coming.
+
+        Returns:
+            The pause in seconds
+        """
+        with self._throttle_lock:
+            self._throttle_delay = min(self.MAX_THROTTLE_DELAY, (self._throttle_delay * 2) or self.THROTTLE_DELAY)
+            self._throttled_until = max(self._throttled_until, time.monotonic() + self._throttle_delay)
+            return self._throttle_delay
+
+    def _wait_for_throttle(self) -> None:
+        """Wait out the shared pause, if any, before an upload attempt."""
+        with self._throttle_lock:
+            remaining = self._throttled_until - time.monotonic()
+        self.retry.wait(remaining)
+
+    def _post_activity(self, data: bytes, file_name: str) -> Dict[str, Any]:
+        """Post in-memory .fit data once, the same way Garmin.upload_activity does."""
+        self._acquire_api_slot()
+        files = {"file": (file_name, io.BytesIO(data))}
+        return self.client.client.post("connectapi", self.client.garmin_connect_upload, files=files, api=True)
+
+    def list_activities(self, limit: int = 100, since: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """List the most recent activities on Garmin Connect.
+
+        Without since this is one request. With since, further pages are
+        requested until the listing reaches an activity started before it.
+
+        Args:
+            limit: Maximum number of activities per request (at most 1000)
+            since: Start time the listing must reach back to
+
+        Returns:
+            Activity dictionaries, most recent first
+
+        Raises:
+            RuntimeError: If not authenticated or a request fails
+        """
+        self._require_authentication("listing activities")
+
+        listed: List[Dict[str, Any]] = []
+        while True:
+            self._acquire_api_slot()
+            try:
+                page = self.client.get_activities(len(listed), limit)
+            except Exception as e:
+                self.logger.exception(f"Failed to list activities: {e}")
+                raise RuntimeError(f"Listing activities failed: {e}") from e
+            if not isinstance(page, list):
+                page = []
+            listed.extend(page)
+
+            if since is None or len(page) < limit:
+                return listed
+            oldest = self._start_time(page[-1])
+            if oldest is None or oldest < since:
+                return listed
+
+    @staticmethod
+    def _start_time(activity: Dict[str, Any]) -> Optional[datetime]:
+        """Get the timezone-aware start time of a Garmin Connect activity, if it has one."""
+        try:
+            start = datetime.strptime(activity["startTimeGMT"], GarminActivityIndex.GARMIN_TIME_FORMAT)
+        except (KeyError, TypeError, ValueError):
+            return None
+        return start.replace(tzinfo=timezone.utc)
+
+    def _acquire_api_slot(self) -> None:
+        """Wait for the rate limiter, if configured, before a Garmin Connect API call."""
+        if self.rate_limiter:
+            self.rate_limiter.acquire(self.UPLOAD_HOST)
+
     def is_authenticated(self) -> bool:
         """Check if the service is authenticated.
 
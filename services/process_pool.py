@@ -0,0 +1,27 @@
+"""Process pools safe to start from a multi-threaded process.
+
+The default fork start method copies the parent with whatever locks its
+other threads (HTTP connection pools, logging, the Garmin login) held at
+that moment, which can deadlock the workers. The pools created here start
+their workers from a clean interpreter instead.
+"""
+
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+
+def create_process_pool(max_workers: int) -> ProcessPoolExecutor:
+    """Create a process pool that does not fork the calling process.
+
+    Workers come from a forkserver where the platform has one, and are
+    spawned otherwise, so the pool may be created and used while other
+    threads run. Work submitted to it must be importable by module path.
+
+    Args:
+        max_workers: Number of worker processes
+
+    Returns:
+        The process pool
+    """
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context(method))
@@ -0,0 +1,185 @@
+"""Rate limiting for outgoing HTTP calls.
+
+Token buckets keyed by host smooth request bursts so several syncs sharing
+one egress IP stay under the Zwift, S3 and Garmin Connect rate limits.
+"""
+
+import os
+import time
+import sqlite3
+import logging
+import threading
+from typing import Callable, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+
+class RateLimiter:
+    """In-process token bucket rate limiter, one bucket per host.
+
+    Each bucket holds up to burst tokens and refills at rate tokens per
+    second; a call takes one token and waits for the refill when the bucket
+    is empty. Safe to share between threads.
+    """
+
+    DEFAULT_RATE = 1.0
+    DEFAULT_BURST = 5
+
+    def __init__(self, rate: float = DEFAULT_RATE, burst: float = DEFAULT_BURST,
+                 limits: Optional[Dict[str, Tuple[float, float]]] = None,
+                 sleep: Callable[[float], None] = time.sleep,
+                 clock: Callable[[], float] = time.time):
+        """Initialize the limiter.
+
+        Args:
+            rate: Default refill rate, in calls per second
+            burst: Default bucket capacity, i.e. calls allowed back to back
+            limits: Per-host (rate, burst) overriding the defaults
+            sleep: Function used to wait for tokens
+            clock: Wall-clock time source
+        """
+        self.rate = rate
+        self.burst = burst
+        self.limits = dict(limits or {})
+        self.logger = logging.getLogger(__name__)
+        self._sleep = sleep
+        self._clock = clock
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def host(url: str) -> str:
+        """Get the bucket key of a URL.
+
+        Args:
+            url: Request URL
+
+        Returns:
+            The URL's host
+        """
+        return urlsplit(url).netloc
+
+    def limit_for(self, key: str) -> Tuple[float, float]:
+        """Get the (rate, burst) applying to a bucket.
+
+        Args:
+            key: Bucket key, usually a host
+
+        Returns:
+            Refill rate per second and bucket capacity
+        """
+        return self.limits.get(key, (self.rate, self.burst))
+
+    def acquire(self, key: str, tokens: float = 1.0) -> float:
+        """Take tokens from a bucket, waiting until they are available.
+
+        Args:
+            key: Bucket key, usually a host
+            tokens: Number of tokens to take
+
+        Returns:
+            Seconds spent waiting
+        """
+        rate, burst = self.limit_for(key)
+        waited = 0.0
+        while True:
+            wait = self._take(key, min(tokens, burst), rate, burst)
+            if wait <= 0:
+                if waited:
+                    self.logger.debug(f"Rate limited {key} for {waited:.2f}s")
+                return waited
+            self._sleep(wait)
+            waited += wait
+
+    @staticmethod
+    def _refill(level: float, updated_at: float, now: float, rate: float, burst: float) -> float:
+        """Compute a bucket's level after refilling since updated_at."""
+        return min(burst, level + max(now - updated_at, 0.0) * rate)
+
+    def _take(self, key: str, tokens: float, rate: float, burst: float) -> float:
+        """Try to take tokens from a bucket.
+
+        Returns:
+            0 if the tokens were taken, otherwise seconds until they are available
+        """
+        with self._lock:
+            now = self._clock()
+            level, updated_at = self._buckets.get(key, (burst, now))
+            level = self._refill(level, updated_at, now, rate, burst)
+            if level >= tokens:
+                self._buckets[key] = (level - tokens, now)
+                return 0.0
+            self._buckets[key] = (level, now)
+            return (tokens - level) / rate
+
+
+class SqliteRateLimiter(RateLimiter):
+    """Token bucket rate limiter whose buckets live in a SQLite database.
+
+    Every process pointing at the same database file shares the buckets, so
+    the limits hold for the whole host rather than per process.
+    """
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS rate_limit_buckets (
+            key TEXT PRIMARY KEY,
+            level REAL NOT NULL,
+            updated_at REAL NOT NULL
+        )
+    """
+
+    def __init__(self, db_path: str, rate: float = RateLimiter.DEFAULT_RATE,
+                 burst: float = RateLimiter.DEFAULT_BURST,
+                 limits: Optional[Dict[str, Tuple[float, float]]] = None,
+                 sleep: Callable[[float], None] = time.sleep,
+                 clock: Callable[[], float] = time.time):
+        """Open (and create if needed) the bucket database.
+
+        Args:
+            db_path: Path to the SQLite database file shared by the processes
+            rate: Default refill rate, in calls per second
+            burst: Default bucket capacity, i.e. calls allowed back to back
+            limits: Per-host (rate, burst) overriding the defaults
+            sleep: Function used to wait for tokens
+            clock: Wall-clock time source (must agree across processes)
+        """
+        super().__init__(rate, burst, limits, sleep, clock)
+        self.db_path = os.path.expanduser(db_path)
+        # Transactions are managed explicitly so each take is one IMMEDIATE transaction
+        self._connection = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False,
+                                           isolation_level=None)
+        self._connection.execute(self._SCHEMA)
+
+    def _take(self, key: str, tokens: float, rate: float, burst: float) -> float:
+        """Try to take tokens from a bucket, atomically across processes."""
+        with self._lock:
+            # IMMEDIATE takes the write lock up front, serializing concurrent takes
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                now = self._clock()
+                row = self._connection.execute(
+                    "SELECT level, updated_at FROM rate_limit_buckets WHERE key = ?", (key,)
+                ).fetchone()
+                level, updated_at = row if row else (burst, now)
+                level = self._refill(level, updated_at, now, rate, burst)
+
+                wait = 0.0
+                if level >= tokens:
+                    level -= tokens
+                else:
+                    wait = (tokens - level) / rate
+
+                self._connection.execute(
+                    "INSERT INTO rate_limit_buckets (key, level, updated_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET level = excluded.level, updated_at = excluded.updated_at",
+                    (key, level, now),
+                )
+                self._connection.execute("COMMIT")
+            except sqlite3.Error:
+                self._connection.execute("ROLLBACK")
+                raise
+            return wait
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,142 @@
+"""Sync state store for tracking which activities were transferred."""
+
+import time
+import sqlite3
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+
+class SyncStateStore:
+    """SQLite-backed record of Zwift activities synced to Garmin Connect.
+
+    Acts as the watermark for incremental syncs: an activity is considered
+    synced once it has been uploaded successfully.
+    """
+
+    STATUS_UPLOADED = "uploaded"
+    STATUS_FAILED = "failed"
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS synced_activities (
+            activity_id TEXT PRIMARY KEY,
+            fit_file_key TEXT,
+            status TEXT NOT NULL,
+            garmin_activity_id TEXT,
+            error TEXT,
+            created_at REAL NOT NULL,
+            updated_at REAL NOT NULL
+        )
+    """
+
+    def __init__(self, db_path: str):
+        """Open (and create if needed) the state database.
+
+        Args:
+            db_path: Path to the SQLite database file, or ":memory:"
+        """
+        self.db_path = db_path
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(db_path, check_same_thread=False)
+        self._connection.row_factory = sqlite3.Row
+        with self._connection:
+            self._connection.execute(self._SCHEMA)
+
+    def get(self, activity_id: Any) -> Optional[Dict[str, Any]]:
+        """Get the stored state of an activity.
+
+        Args:
+            activity_id: Zwift activity ID
+
+        Returns:
+            Row as a dictionary, or None if the activity is unknown
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT * FROM synced_activities WHERE activity_id = ?", (str(activity_id),)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def is_synced(self, activity_id: Any) -> bool:
+        """Check whether an activity has already been uploaded.
+
+        Args:
+            activity_id: Zwift activity ID
+
+        Returns:
+            True if the activity was uploaded successfully
+        """
+        state = self.get(activity_id)
+        return bool(state and state["status"] == self.STATUS_UPLOADED)
+
+    def has_uploads(self) -> bool:
+        """Check whether any activity has been uploaded yet.
+
+        Returns:
+            True once the store holds a watermark to sync from
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT 1 FROM synced_activities WHERE status = ? LIMIT 1", (self.STATUS_UPLOADED,)
+            ).fetchone()
+        return row is not None
+
+    def mark_uploaded(self, activity: Dict[str, Any], garmin_activity_id: Optional[Any] = None) -> None:
+        """Record a successful upload.
+
+        Args:
+            activity: Zwift activity dictionary
+            garmin_activity_id: ID of the created Garmin Connect activity, if known
+        """
+        self._save(activity, self.STATUS_UPLOADED, garmin_activity_id=garmin_activity_id)
+
+    def mark_failed(self, activity: Dict[str, Any], error: str) -> None:
+        """Record a failed transfer attempt.
+
+        Args:
+            activity: Zwift activity dictionary
+            error: Description of the failure
+        """
+        self._save(activity, self.STATUS_FAILED, error=error)
+
+    def _save(self, activity: Dict[str, Any], status: str,
+              garmin_activity_id: Optional[Any] = None, error: Optional[str] = None) -> None:
+        """Insert or update the state of an activity.
+
+        Args:
+            activity: Zwift activity dictionary
+            status: New status
+            garmin_activity_id: ID of the created Garmin Connect activity
+            error: Description of the failure
+        """
+        now = time.time()
+        with self._lock, self._connection:
+            self._connection.execute(
+                """
+                INSERT INTO synced_activities
+                    (activity_id, fit_file_key, status, garmin_activity_id, error, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(activity_id) DO UPDATE SET
+                    fit_file_key = excluded.fit_file_key,
+                    status = excluded.status,
+                    garmin_activity_id = excluded.garmin_activity_id,
+                    error = excluded.error,
+                    updated_at = excluded.updated_at
+                """,
+                (
+                    str(activity["id"]),
+                    activity.get("fitFileKey"),
+                    status,
+                    None if garmin_activity_id is None else str(garmin_activity_id),
+                    error,
+                    now,
+                    now,
+                ),
+            )
+        self.logger.debug(f"Activity {activity['id']} marked as {status}")
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,102 @@
+"""Watch mode for syncing new activities from a long-running process."""
+
+import logging
+import threading
+from typing import Optional
+
+from services.activity_processor import ActivityProcessor
+
+
+class AdaptivePollInterval:
+    """Poll interval that is short after activity and backs off while idle.
+
+    Right after new activities were found (a ride just ended, and another
+    may follow) the minimum interval is used. Every idle or failed poll
+    multiplies the interval by backoff_factor, up to the maximum.
+    """
+
+    MIN_INTERVAL = 60.0
+    MAX_INTERVAL = 30 * 60.0
+    BACKOFF_FACTOR = 2.0
+
+    def __init__(self, min_interval: float = MIN_INTERVAL, max_interval: float = MAX_INTERVAL,
+                 backoff_factor: float = BACKOFF_FACTOR):
+        """Initialize the interval at its minimum.
+
+        Args:
+            min_interval: Seconds between polls right after new activities
+            max_interval: Upper bound of the interval while idle
+            backoff_factor: Factor applied to the interval after an idle poll
+        """
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.backoff_factor = backoff_factor
+        self._current: Optional[float] = None
+
+    def next(self, found_new: bool) -> float:
+        """Get the delay before the next poll.
+
+        Args:
+            found_new: Whether the last poll found new activities
+
+        Returns:
+            Delay in seconds
+        """
+        if found_new or self._current is None:
+            self._current = self.min_interval
+        else:
+            self._current = min(self.max_interval, self._current * self.backoff_factor)
+        return self._current
+
+
+class ActivityWatcher:
+    """Runs ActivityProcessor.process_new_activities on an adaptive schedule.
+
+    Meant to be run in a long-lived process with a processor keeping its
+    sessions, so polls reuse the Zwift and Garmin Connect logins and
+    connections. stop() can be called from a signal handler: the current
+    run finishes and no new one starts.
+    """
+
+    def __init__(self, processor: ActivityProcessor, interval: Optional[AdaptivePollInterval] = None,
+                 max_activities: int = 10, pipeline: bool = False):
+        """Initialize the watcher.
+
+        Args:
+            processor: Processor with a state store, ideally keeping its sessions
+            interval: Poll interval policy (the defaults are used if not given)
+            max_activities: Maximum number of new activities to transfer per poll
+            pipeline: Use the pipelined sync for each poll
+        """
+        self.processor = processor
+        self.interval = interval or AdaptivePollInterval()
+        self.max_activities = max_activities
+        self.pipeline = pipeline
+        self.logger = logging.getLogger(__name__)
+        self._stopped = threading.Event()
+
+    def run(self) -> None:
+        """Poll until stopped."""
+        self.logger.info("Watching for new Zwift activities...")
+
+        while not self._stopped.is_set():
+            success = self.processor.process_new_activities(self.max_activities, pipeline=self.pipeline)
+            found_new = success and self.processor.last_new_activities > 0
+
+            delay = self.interval.next(found_new)
+            if not success:
+                self.logger.warning(f"Sync failed, retrying in {delay:.0f}s")
+            else:
+                self.logger.info(f"Next poll in {delay:.0f}s")
+            self._stopped.wait(delay)
+
+        self.logger.info("Stopped watching for new activities")
+
+    def stop(self) -> None:
+        """Ask the watcher to stop once the current run is over."""
+        self._stopped.set()
+
+    @property
+    def stopped(self) -> bool:
+        """Whether stop() was called."""
+        return self._stopped.is_set()
@@ -9,15 +9,35 @@ Modules:
     profile: Player profile information
     activities: Player activity data
     client: Main client orchestration
+    session: Pooled HTTP session factory
+    token_cache: On-disk token persistence
+    response_cache: Conditional-request response cache
+    retry: Retry policy and per-host circuit breakers
+    download: Streaming, resumable activity file downloads
 """
 
 from services.zwift.client import ZwiftClient
-from services.zwift.auth import ZwiftAuth, ZwiftAuthError
+from services.zwift.auth import ZwiftAuth, ZwiftAuthError, ZwiftTokenRejectedError
 from services.zwift.request import ZwiftApiError
+from services.zwift.session import create_session
+from services.zwift.token_cache import ZwiftTokenCache
+from services.zwift.response_cache import ZwiftResponseCache
+from services.zwift.retry import CircuitBreaker, CircuitOpenError, RetryPolicy
+from services.zwift.download import DownloadProgress, StreamingDownloader, ZwiftDownloadError
 
 __all__ = [
     "ZwiftClient",
     "ZwiftAuth",
     "ZwiftAuthError",
+    "ZwiftTokenRejectedError",
     "ZwiftApiError",
+    "create_session",
+    "ZwiftTokenCache",
+    "ZwiftResponseCache",
+    "RetryPolicy",
+    "CircuitBreaker",
+    "CircuitOpenError",
+    "StreamingDownloader",
+    "DownloadProgress",
+    "ZwiftDownloadError",
 ]
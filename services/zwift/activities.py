@@ -3,22 +3,38 @@
 Provides access to player activity data.
 """
 
-from typing import Any, Callable, Dict, List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import requests
 
 from services.zwift.player_resource import ZwiftPlayerResource
+from services.zwift.response_cache import ZwiftResponseCache
+from services.rate_limit import RateLimiter
+from services.zwift.retry import RetryPolicy
 
 
 class ZwiftActivities(ZwiftPlayerResource):
     """Provides access to Zwift activity data."""
 
-    def __init__(self, player_id: str, get_access_token: Callable[[], str]):
+    def __init__(self, player_id: str, get_access_token: Callable[[], str],
+                 session: Optional[requests.Session] = None,
+                 cache: Optional[ZwiftResponseCache] = None,
+                 resolve_me: Optional[Callable[[], str]] = None,
+                 retry: Optional[RetryPolicy] = None,
+                 rate_limiter: Optional[RateLimiter] = None):
         """Initialize activities access.
 
         Args:
             player_id: Player ID or "me" for authenticated user
             get_access_token: Callable that returns a valid access token
+            session: HTTP session to reuse connections from
+            cache: Response cache enabling conditional requests
+            resolve_me: Callable resolving "me" to the numeric player ID
+            retry: Retry policy for transient failures
+            rate_limiter: Rate limiter acquired before every request
         """
-        super().__init__(player_id, get_access_token)
+        super().__init__(player_id, get_access_token, session, cache, resolve_me, retry, rate_limiter)
 
     def get_activities(self, start: int = 0, limit: int = 10) -> List[Dict[str, Any]]:
         """Get the player's activities.
@@ -32,3 +48,54 @@ class ZwiftActivities(ZwiftPlayerResource):
         """
         endpoint = f"/api/profiles/{self._get_player_id()}/activities?start={start}&limit={limit}"
         return self._request.get_json(endpoint)
+
+    def iter_activities(self, start: int = 0, page_size: int = 10, max_page_size: int = 100,
+                        stop: Optional[Callable[[Dict[str, Any]], bool]] = None,
+                        prefetch: bool = True) -> Iterator[Dict[str, Any]]:
+        """Iterate over the player's activities across pages.
+
+        The page size doubles after every full page, up to max_page_size, so
+        the common case of a few recent activities stays cheap while long
+        history scans need fewer round trips. With prefetch enabled the next
+        page is requested in the background while the current one is consumed.
+
+        Args:
+            start: Starting index for pagination
+            page_size: Size of the first page
+            max_page_size: Upper bound for the adaptive page size
+            stop: Predicate ending the iteration at the first matching activity
+                (which is not yielded), e.g. an already synced activity
+            prefetch: Fetch the next page in a background thread
+
+        Yields:
+            Activity dictionaries, most recent first
+        """
+        # Resolve the player ID up front so the prefetch thread never races on it
+        self._get_player_id()
+
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="zwift-activities") if prefetch else None
+        limit = page_size
+
+        try:
+            pending = executor.submit(self.get_activities, start, limit) if executor else None
+            while True:
+                page = pending.result() if pending else self.get_activities(start, limit)
+                is_last_page = len(page) < limit
+                start += len(page)
+                limit = min(limit * 2, max_page_size)
+
+                # Request the next page before handing out the current one
+                pending = None
+                if executor and not is_last_page:
+                    pending = executor.submit(self.get_activities, start, limit)
+
+                for activity in page:
+                    if stop and stop(activity):
+                        return
+                    yield activity
+
+                if is_last_page:
+                    return
+        finally:
+            if executor:
+                executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,30 @@
+"""Asyncio Zwift API Client package.
+
+aiohttp-based counterpart of services.zwift. It is kept out of the parent
+package's imports so aiohttp is only needed by callers that use it.
+
+Modules:
+    auth: Async OAuth authentication and token management
+    request: Async authenticated HTTP requests
+    player_resource: Base class for async player-specific resources
+    profile: Player profile information
+    activities: Player activity data and async pagination
+    client: Main async client orchestration and S3 downloads
+    session: Pooled aiohttp session factory
+"""
+
+from services.zwift.aio.client import AsyncZwiftClient
+from services.zwift.aio.auth import AsyncZwiftAuth
+from services.zwift.aio.request import AsyncZwiftApiRequest
+from services.zwift.aio.activities import AsyncZwiftActivities
+from services.zwift.aio.profile import AsyncZwiftProfile
+from services.zwift.aio.session import create_async_session
+
+__all__ = [
+    "AsyncZwiftClient",
+    "AsyncZwiftAuth",
+    "AsyncZwiftApiRequest",
+    "AsyncZwiftActivities",
+    "AsyncZwiftProfile",
+    "create_async_session",
+]
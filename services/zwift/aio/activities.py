@@ -0,0 +1,85 @@
+"""Async Zwift activities module.
+
+Provides access to player activity data.
+"""
+
+import asyncio
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+from services.zwift.aio.player_resource import AsyncZwiftPlayerResource
+
+
+class AsyncZwiftActivities(AsyncZwiftPlayerResource):
+    """Provides access to Zwift activity data, asynchronously."""
+
+    async def get_activities(self, start: int = 0, limit: int = 10) -> List[Dict[str, Any]]:
+        """Get the player's activities.
+
+        Args:
+            start: Starting index for pagination
+            limit: Maximum number of activities to return
+
+        Returns:
+            List of activity dictionaries
+        """
+        endpoint = f"/api/profiles/{await self._get_player_id()}/activities?start={start}&limit={limit}"
+        return await self._request.get_json(endpoint)
+
+    async def iter_activities(self, start: int = 0, page_size: int = 10, max_page_size: int = 100,
+                              stop: Optional[Callable[[Dict[str, Any]], bool]] = None,
+                              prefetch: bool = True) -> AsyncIterator[Dict[str, Any]]:
+        """Iterate over the player's activities across pages.
+
+        Same paging as ZwiftActivities.iter_activities: the page size doubles
+        after every full page, up to max_page_size, and with prefetch enabled
+        the next page is requested in a task while the current one is consumed.
+
+        Args:
+            start: Starting index for pagination
+            page_size: Size of the first page
+            max_page_size: Upper bound for the adaptive page size
+            stop: Predicate ending the iteration at the first matching activity
+                (which is not yielded), e.g. an already synced activity
+            prefetch: Fetch the next page in a background task
+
+        Yields:
+            Activity dictionaries, most recent first
+        """
+        # Resolve the player ID up front so the prefetch task never races on it
+        await self._get_player_id()
+
+        limit = page_size
+        pending: Optional[asyncio.Task] = None
+
+        try:
+            if prefetch:
+                pending = asyncio.create_task(self.get_activities(start, limit))
+            while True:
+                page = await pending if pending else await self.get_activities(start, limit)
+                is_last_page = len(page) < limit
+                start += len(page)
+                limit = min(limit * 2, max_page_size)
+
+                # Request the next page before handing out the current one
+                pending = None
+                if prefetch and not is_last_page:
+                    pending = asyncio.create_task(self.get_activities(start, limit))
+
+                for activity in page:
+                    if stop and stop(activity):
+                        return
+                    yield activity
+
+                if is_last_page:
+                    return
+        finally:
+            if pending:
+                self._discard(pending)
+
+    @staticmethod
+    def _discard(task: asyncio.Task) -> None:
+        """Cancel a prefetch task that is no longer needed, retrieving its outcome if done."""
+        if not task.done():
+            task.cancel()
+        elif not task.cancelled():
+            task.exception()
@@ -0,0 +1,124 @@
+"""Async Zwift OAuth authentication module.
+
+Handles token management with Zwift's OAuth server over aiohttp.
+"""
+
+import asyncio
+from typing import Any, Dict, Optional
+
+import aiohttp
+
+from services.zwift.aio.session import CLIENT_TIMEOUT
+from services.zwift.auth import ZwiftAuthBase, ZwiftAuthError, ZwiftTokenRejectedError
+from services.zwift.token_cache import ZwiftTokenCache
+
+
+class AsyncZwiftAuth(ZwiftAuthBase):
+    """Manages OAuth authentication and token lifecycle with Zwift, asynchronously.
+
+    Mirrors ZwiftAuth: concurrent tasks at expiry wait for a single token
+    fetch instead of each fetching their own token. Token cache file I/O
+    runs in a worker thread so it does not block the event loop.
+    """
+
+    REQUEST_TIMEOUT = CLIENT_TIMEOUT
+
+    def __init__(self, username: str, password: str, session: aiohttp.ClientSession,
+                 token_cache: Optional[ZwiftTokenCache] = None):
+        """Initialize authentication with Zwift credentials.
+
+        Args:
+            username: Zwift account username/email
+            password: Zwift account password
+            session: aiohttp session to reuse connections from
+            token_cache: On-disk cache to load tokens from and save them to
+        """
+        super().__init__(username, password, token_cache)
+        self._session = session
+
+        # Serializes token fetches so only one request hits the auth server at a time
+        self._token_lock = asyncio.Lock()
+
+    async def _fetch_token(self, use_refresh: bool = False) -> Dict[str, Any]:
+        """Fetch a new token from Zwift's auth server.
+
+        Args:
+            use_refresh: If True, use refresh token grant; otherwise use password grant
+
+        Returns:
+            Token response data from the API
+
+        Raises:
+            ZwiftAuthError: If authentication fails
+        """
+        data = self._token_request_data(use_refresh)
+
+        try:
+            async with self._session.post(self.AUTH_URL, data=data, timeout=self.REQUEST_TIMEOUT) as response:
+                if response.status >= 400:
+                    error_msg = f"Authentication failed: {response.status} {response.reason}"
+                    text = await response.text()
+                    if text:
+                        error_msg += f" - {text}"
+                    if response.status in self.REJECTED_STATUSES:
+                        raise ZwiftTokenRejectedError(error_msg)
+                    raise ZwiftAuthError(error_msg)
+                return await response.json(content_type=None)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            raise ZwiftAuthError(f"Failed to connect to Zwift auth server: {e}") from e
+
+    async def get_access_token(self) -> str:
+        """Get a valid access token, refreshing if necessary.
+
+        Prefers a still-valid (possibly cached) access token, then the refresh
+        grant, then the password grant.
+
+        Returns:
+            A valid access token string
+
+        Raises:
+            ZwiftAuthError: If unable to obtain a valid token
+        """
+        token = self._access_token
+        if token and self._has_valid_access_token():
+            return token
+
+        async with self._token_lock:
+            await asyncio.to_thread(self._load_cached_tokens)
+
+            if self._has_valid_access_token() and self._access_token:
+                return self._access_token
+
+            # Try to refresh, or do full auth if refresh token is expired
+            use_refresh = self._has_valid_refresh_token()
+            self.logger.debug(
+                "Fetching new token via %s",
+                "refresh" if use_refresh else "password grant"
+            )
+
+            try:
+                token_data = await self._fetch_token(use_refresh=use_refresh)
+            except ZwiftTokenRejectedError:
+                if not use_refresh:
+                    raise
+                self.logger.info("Refresh token rejected, falling back to password grant")
+                token_data = await self._fetch_token(use_refresh=False)
+
+            self._apply_tokens(token_data)
+            await asyncio.to_thread(self._save_cached_tokens)
+
+            if not self._access_token:
+                raise ZwiftAuthError("Failed to obtain access token from response")
+
+            return self._access_token
+
+    async def get_token_subject(self) -> Optional[str]:
+        """Get the subject (sub claim) of the current access token.
+
+        Returns:
+            The token subject, or None if the token is not a decodable JWT
+
+        Raises:
+            ZwiftAuthError: If unable to obtain a valid token
+        """
+        return self._decode_token_subject(await self.get_access_token())
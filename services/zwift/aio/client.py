@@ -0,0 +1,135 @@
+"""Async Zwift API Client.
+
+Asyncio counterpart of ZwiftClient, letting one event loop drive many
+accounts concurrently without a thread per account.
+"""
+
+import asyncio
+from typing import Any, Dict, Optional
+
+import aiohttp
+
+from services.zwift.aio.auth import AsyncZwiftAuth
+from services.zwift.aio.request import AsyncZwiftApiRequest
+from services.zwift.aio.activities import AsyncZwiftActivities
+from services.zwift.aio.session import CLIENT_TIMEOUT, create_async_session
+from services.zwift.client import ZwiftClientBase
+from services.zwift.request import ZwiftApiError
+from services.zwift.response_cache import ZwiftResponseCache
+from services.zwift.token_cache import ZwiftTokenCache
+
+
+class AsyncZwiftClient(ZwiftClientBase):
+    """Main asyncio client for interacting with Zwift's API.
+
+    Must be created inside a running event loop unless a session is given.
+    A session created by the client is closed by close() or on leaving the
+    async context manager; a session passed in is left to the caller.
+
+    Example:
+        async with AsyncZwiftClient("user@example.com", "password") as client:
+            profile = client.get_profile()
+            async for activity in profile.iter_activities():
+                data = await client.download_activity_bytes(activity)
+    """
+
+    S3_URL = "https://{bucket}.s3.amazonaws.com/{key}"
+    DOWNLOAD_TIMEOUT = CLIENT_TIMEOUT
+
+    def __init__(self, username: str, password: str, session: Optional[aiohttp.ClientSession] = None,
+                 token_cache: Optional[ZwiftTokenCache] = None,
+                 response_cache: Optional[ZwiftResponseCache] = None):
+        """Initialize the Zwift client with credentials.
+
+        Args:
+            username: Zwift account username/email
+            password: Zwift account password
+            session: aiohttp session shared by all API calls and downloads
+                (a pooled one is created by default)
+            token_cache: On-disk cache to persist tokens across runs
+            response_cache: Response cache enabling conditional API requests
+        """
+        super().__init__(username, token_cache, response_cache)
+        self._owns_session = session is None
+        self._session = session or create_async_session()
+        self._auth = AsyncZwiftAuth(username, password, self._session, token_cache)
+        self._player_id_lock = asyncio.Lock()
+
+    async def __aenter__(self) -> "AsyncZwiftClient":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        """Close the HTTP session if it was created by this client."""
+        if self._owns_session and not self._session.closed:
+            await self._session.close()
+
+    def get_profile(self, player_id: str = "me") -> AsyncZwiftActivities:
+        """Get an activities accessor for the specified player.
+
+        Args:
+            player_id: Player ID or "me" for authenticated user (default)
+
+        Returns:
+            AsyncZwiftActivities instance for accessing activity data
+        """
+        return AsyncZwiftActivities(player_id, self._auth.get_access_token, self._session,
+                                    self._response_cache, resolve_me=self.get_player_id)
+
+    async def get_player_id(self) -> str:
+        """Resolve the authenticated player's numeric ID.
+
+        Cached and persisted like ZwiftClient.get_player_id.
+
+        Returns:
+            The numeric player ID as a string
+        """
+        subject = await self._auth.get_token_subject()
+
+        async with self._player_id_lock:
+            if self._player_id and self._player_id_subject == subject:
+                return self._player_id
+
+            player_id = await asyncio.to_thread(self._load_cached_player_id, subject)
+            if not player_id:
+                profile_data = await AsyncZwiftApiRequest(
+                    self._auth.get_access_token, self._session, self._response_cache
+                ).get_json("/api/profiles/me")
+                player_id = str(profile_data["id"])
+                await asyncio.to_thread(self._save_cached_player_id, player_id, subject)
+
+            self._player_id = player_id
+            self._player_id_subject = subject
+            return player_id
+
+    async def invalidate_player_id(self) -> None:
+        """Forget the resolved player ID, in memory and in the token cache."""
+        async with self._player_id_lock:
+            self._player_id = None
+            self._player_id_subject = None
+            await asyncio.to_thread(self._save_cached_player_id, None, None)
+
+    async def download_activity_bytes(self, activity: Dict[str, Any]) -> bytes:
+        """Download an activity's .fit file from S3 into memory.
+
+        Args:
+            activity: Activity dictionary with fitFileBucket and fitFileKey
+
+        Returns:
+            Raw contents of the .fit file
+
+        Raises:
+            ZwiftApiError: If the download fails
+        """
+        link = self.S3_URL.format(bucket=activity["fitFileBucket"], key=activity["fitFileKey"])
+        self.logger.info(f"Downloading activity {activity['id']} from {link}")
+
+        try:
+            async with self._session.get(link, timeout=self.DOWNLOAD_TIMEOUT) as response:
+                if response.status >= 400:
+                    raise ZwiftApiError(f"Failed to download activity: {response.status} - {response.reason}")
+                return await response.read()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            raise ZwiftApiError(f"Failed to download activity: {e}") from e
@@ -0,0 +1,60 @@
+"""Async base class for Zwift player resources.
+
+Provides shared player ID resolution logic for accessing player-specific endpoints.
+"""
+
+from typing import Awaitable, Callable, Optional
+
+import aiohttp
+
+from services.zwift.aio.request import AsyncZwiftApiRequest
+from services.zwift.response_cache import ZwiftResponseCache
+
+
+class AsyncZwiftPlayerResource:
+    """Base class for async Zwift resources that require player ID resolution.
+
+    Mirrors ZwiftPlayerResource; "me" resolution can be delegated to a shared
+    resolver (such as AsyncZwiftClient.get_player_id).
+    """
+
+    def __init__(self, player_id: str, get_access_token: Callable[[], Awaitable[str]],
+                 session: aiohttp.ClientSession,
+                 cache: Optional[ZwiftResponseCache] = None,
+                 resolve_me: Optional[Callable[[], Awaitable[str]]] = None):
+        """Initialize player resource.
+
+        Args:
+            player_id: Player ID or "me" for authenticated user
+            get_access_token: Coroutine function that returns a valid access token
+            session: aiohttp session to reuse connections from
+            cache: Response cache enabling conditional requests
+            resolve_me: Coroutine function resolving "me" to the numeric player ID,
+                used instead of this resource's own lookup
+        """
+        self._player_id = player_id
+        self._request = AsyncZwiftApiRequest(get_access_token, session, cache)
+        self._resolve_me = resolve_me
+        self._resolved_player_id: Optional[str] = None
+
+    async def _get_player_id(self) -> str:
+        """Get the resolved player ID, fetching from API if needed.
+
+        Returns:
+            The numeric player ID as a string
+        """
+        if self._resolved_player_id:
+            return self._resolved_player_id
+
+        if self._player_id != "me":
+            self._resolved_player_id = self._player_id
+            return self._player_id
+
+        # The shared resolver keeps its own cache and handles invalidation
+        if self._resolve_me:
+            return await self._resolve_me()
+
+        # Resolve "me" to actual player ID via API
+        profile_data = await self._request.get_json("/api/profiles/me")
+        self._resolved_player_id = str(profile_data["id"])
+        return self._resolved_player_id
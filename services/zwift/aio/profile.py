@@ -0,0 +1,20 @@
+"""Async Zwift profile module.
+
+Provides access to player profile information.
+"""
+
+from typing import Any, Dict
+
+from services.zwift.aio.player_resource import AsyncZwiftPlayerResource
+
+
+class AsyncZwiftProfile(AsyncZwiftPlayerResource):
+    """Provides access to Zwift player profile data, asynchronously."""
+
+    async def get_profile(self) -> Dict[str, Any]:
+        """Get the player's profile data.
+
+        Returns:
+            Profile data dictionary
+        """
+        return await self._request.get_json(f"/api/profiles/{await self._get_player_id()}")
@@ -0,0 +1,98 @@
+"""Async Zwift API request module.
+
+Handles authenticated HTTP requests to Zwift's API endpoints over aiohttp.
+"""
+
+import json
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import aiohttp
+
+from services.zwift.aio.session import CLIENT_TIMEOUT
+from services.zwift.request import ZwiftApiError, ZwiftApiRequest
+from services.zwift.response_cache import ZwiftResponseCache
+
+
+class AsyncZwiftApiRequest:
+    """Handles authenticated API requests to Zwift, asynchronously."""
+
+    BASE_URL = ZwiftApiRequest.BASE_URL
+    DEFAULT_HEADERS = ZwiftApiRequest.DEFAULT_HEADERS
+    REQUEST_TIMEOUT = CLIENT_TIMEOUT
+
+    def __init__(self, get_access_token: Callable[[], Awaitable[str]], session: aiohttp.ClientSession,
+                 cache: Optional[ZwiftResponseCache] = None):
+        """Initialize with a token provider coroutine function.
+
+        Args:
+            get_access_token: Coroutine function that returns a valid access token
+            session: aiohttp session to reuse connections from
+            cache: Response cache enabling conditional requests
+        """
+        self._get_access_token = get_access_token
+        self._session = session
+        self._cache = cache
+        self.logger = logging.getLogger(__name__)
+
+    async def _get_headers(self, accept_type: str = "application/json") -> Dict[str, str]:
+        """Build request headers with authorization.
+
+        Args:
+            accept_type: MIME type for Accept header
+
+        Returns:
+            Headers dictionary
+        """
+        headers = {
+            "Accept": accept_type,
+            "Authorization": f"Bearer {await self._get_access_token()}",
+        }
+        headers.update(self.DEFAULT_HEADERS)
+        return headers
+
+    async def get_json(self, endpoint: str) -> Any:
+        """Make a GET request and return JSON response.
+
+        With a response cache, previously seen responses are revalidated with
+        If-None-Match/If-Modified-Since and a 304 is served from the cache.
+
+        Args:
+            endpoint: API endpoint path (e.g., "/api/profiles/me")
+
+        Returns:
+            Parsed JSON response
+
+        Raises:
+            ZwiftApiError: If the request fails
+        """
+        url = f"{self.BASE_URL}{endpoint}"
+        headers = await self._get_headers("application/json")
+
+        # The response cache may read and write files, so it is used from a worker thread
+        cached = await asyncio.to_thread(self._cache.get, url) if self._cache else None
+        if cached:
+            headers.update(cached.validator_headers())
+
+        try:
+            async with self._session.get(url, headers=headers, timeout=self.REQUEST_TIMEOUT) as response:
+                if response.status >= 400:
+                    raise ZwiftApiError(f"API request failed: {response.status} - {response.reason}")
+                if cached and response.status == 304:
+                    self.logger.debug(f"Serving {endpoint} from cache (not modified)")
+                    return json.loads(cached.body)
+                text = await response.text()
+                etag = response.headers.get("ETag")
+                last_modified = response.headers.get("Last-Modified")
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            raise ZwiftApiError(f"Failed to connect to Zwift API: {e}") from e
+
+        try:
+            data = json.loads(text)
+        except ValueError as decode_err:
+            snippet = text[:200].strip()  # Limit body preview
+            raise ZwiftApiError(f"API response not JSON-decodable (status={response.status}): {snippet}") from decode_err
+        if self._cache:
+            await asyncio.to_thread(self._cache.put, url, etag, last_modified, text)
+        return data
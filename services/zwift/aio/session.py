@@ -0,0 +1,30 @@
+"""Async Zwift HTTP session module.
+
+Builds the pooled aiohttp session shared by the asyncio Zwift client.
+"""
+
+import aiohttp
+
+from services.zwift.session import CONNECT_TIMEOUT, READ_TIMEOUT
+
+# Same connect and read timeouts as the synchronous downloads. Nothing caps
+# the whole transfer, so a large file on a slow but live connection completes.
+CLIENT_TIMEOUT = aiohttp.ClientTimeout(sock_connect=CONNECT_TIMEOUT, sock_read=READ_TIMEOUT)
+
+
+def create_async_session(limit: int = 100, limit_per_host: int = 10,
+                         dns_cache_ttl: int = 300) -> aiohttp.ClientSession:
+    """Create an aiohttp session with a bounded connection pool.
+
+    Must be called from a running event loop.
+
+    Args:
+        limit: Maximum number of open connections across all hosts
+        limit_per_host: Maximum number of open connections per host
+        dns_cache_ttl: Seconds resolved host addresses are reused for
+
+    Returns:
+        Configured aiohttp session
+    """
+    connector = aiohttp.TCPConnector(limit=limit, limit_per_host=limit_per_host, ttl_dns_cache=dns_cache_ttl)
+    return aiohttp.ClientSession(connector=connector)
@@ -3,12 +3,19 @@
 Handles token management and authentication with Zwift's OAuth server.
 """
 
+import json
 import time
+import base64
 import logging
+import threading
 from typing import Optional, Dict, Any
 
 import requests
 
+from services.rate_limit import RateLimiter
+from services.zwift.retry import NO_RETRY, CircuitOpenError, RetryPolicy
+from services.zwift.token_cache import ZwiftTokenCache
+
 
 class ZwiftAuthError(Exception):
     """Raised when authentication with Zwift fails."""
@@ -16,26 +23,38 @@ class ZwiftAuthError(Exception):
     pass
 
 
-class ZwiftAuth:
-    """Manages OAuth authentication and token lifecycle with Zwift.
+class ZwiftTokenRejectedError(ZwiftAuthError):
+    """Raised when the auth server rejects the credentials or refresh token of a grant."""
+
+    pass
 
-    Automatically handles token refresh when tokens expire.
+
+class ZwiftAuthBase:
+    """Token state shared by the blocking and asyncio Zwift auth clients.
+
+    Holds the tokens and their expirations, the token cache integration and
+    the grant payloads; subclasses only add the HTTP transport.
     """
 
     AUTH_URL = "https://secure.zwift.com/auth/realms/zwift/tokens/access/codes"
     CLIENT_ID = "Zwift_Mobile_Link"
     # Buffer time (seconds) before token expiration to trigger refresh
     TOKEN_EXPIRY_BUFFER = 30
+    # Statuses the auth server answers a revoked or expired grant with (invalid_grant)
+    REJECTED_STATUSES = (400, 401)
 
-    def __init__(self, username: str, password: str):
-        """Initialize authentication with Zwift credentials.
+    def __init__(self, username: str, password: str, token_cache: Optional[ZwiftTokenCache] = None):
+        """Initialize authentication state with Zwift credentials.
 
         Args:
             username: Zwift account username/email
             password: Zwift account password
+            token_cache: On-disk cache to load tokens from and save them to
         """
         self.username = username
         self.password = password
+        self._token_cache = token_cache
+        self._token_cache_loaded = False
         self.logger = logging.getLogger(__name__)
 
         # Token data
@@ -44,46 +63,39 @@ class ZwiftAuth:
         self._access_token_expiration: float = 0
         self._refresh_token_expiration: float = 0
 
-    def _fetch_token(self, use_refresh: bool = False) -> Dict[str, Any]:
-        """Fetch a new token from Zwift's auth server.
+    def _token_request_data(self, use_refresh: bool = False) -> Dict[str, str]:
+        """Build the form data of a token request.
 
         Args:
             use_refresh: If True, use refresh token grant; otherwise use password grant
 
         Returns:
-            Token response data from the API
-
-        Raises:
-            ZwiftAuthError: If authentication fails
+            Form data for the auth server
         """
         if use_refresh and self._refresh_token:
-            data = {
+            return {
                 "grant_type": "refresh_token",
                 "refresh_token": self._refresh_token,
                 "client_id": self.CLIENT_ID,
             }
-        else:
-            data = {
-                "grant_type": "password",
-                "username": self.username,
-                "password": self.password,
-                "client_id": self.CLIENT_ID,
-            }
-
-        try:
-            response = requests.post(self.AUTH_URL, data=data, timeout=30)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.HTTPError as e:
-            error_msg = f"Authentication failed: {e}"
-            if e.response is not None and e.response.text:
-                error_msg += f" - {e.response.text}"
-            raise ZwiftAuthError(error_msg) from e
-        except requests.exceptions.RequestException as e:
-            raise ZwiftAuthError(f"Failed to connect to Zwift auth server: {e}") from e
+        return {
+            "grant_type": "password",
+            "username": self.username,
+            "password": self.password,
+            "client_id": self.CLIENT_ID,
+        }
 
     def _update_tokens(self, token_data: Dict[str, Any]) -> None:
-        """Update stored tokens from API response.
+        """Update stored tokens from API response and persist them.
+
+        Args:
+            token_data: Token response from the auth API
+        """
+        self._apply_tokens(token_data)
+        self._save_cached_tokens()
+
+    def _apply_tokens(self, token_data: Dict[str, Any]) -> None:
+        """Update the in-memory tokens from API response.
 
         Args:
             token_data: Token response from the auth API
@@ -98,37 +110,255 @@ class ZwiftAuth:
         self._access_token_expiration = now + expires_in - self.TOKEN_EXPIRY_BUFFER
         self._refresh_token_expiration = now + refresh_expires_in - self.TOKEN_EXPIRY_BUFFER
 
-    def _has_valid_access_token(self) -> bool:
-        """Check if the current access token is still valid."""
-        return bool(self._access_token and time.time() < self._access_token_expiration)
+    def _load_cached_tokens(self) -> None:
+        """Load tokens from the token cache, once per instance."""
+        if self._token_cache is None or self._token_cache_loaded:
+            return
+        self._token_cache_loaded = True
+
+        entry = self._token_cache.load(self.username)
+        if not entry or not entry.get("access_token"):
+            return
+
+        self._access_token = entry.get("access_token")
+        self._refresh_token = entry.get("refresh_token")
+        self._access_token_expiration = entry.get("access_token_expiration", 0)
+        self._refresh_token_expiration = entry.get("refresh_token_expiration", 0)
+        self.logger.debug("Loaded Zwift tokens from cache")
+
+    def _save_cached_tokens(self) -> None:
+        """Persist the current tokens to the token cache, if configured."""
+        if self._token_cache is None:
+            return
+
+        try:
+            self._token_cache.save(
+                self.username,
+                access_token=self._access_token,
+                refresh_token=self._refresh_token,
+                access_token_expiration=self._access_token_expiration,
+                refresh_token_expiration=self._refresh_token_expiration,
+            )
+        except OSError as e:
+            self.logger.warning(f"Failed to save Zwift tokens to cache: {e}")
+
+    def _has_valid_access_token(self, min_validity: float = 0) -> bool:
+        """Check if the current access token is still valid.
+
+        Args:
+            min_validity: Seconds the token must remain valid for
+        """
+        return bool(self._access_token and time.time() + min_validity < self._access_token_expiration)
 
     def _has_valid_refresh_token(self) -> bool:
         """Check if the current refresh token is still valid."""
         return bool(self._refresh_token and time.time() < self._refresh_token_expiration)
 
+    @staticmethod
+    def _decode_token_subject(token: str) -> Optional[str]:
+        """Decode the subject (sub claim) of a JWT access token.
+
+        The token is decoded without signature verification; it is only used
+        to detect that the tokens now belong to a different account.
+
+        Args:
+            token: Access token
+
+        Returns:
+            The token subject, or None if the token is not a decodable JWT
+        """
+        try:
+            payload = token.split(".")[1]
+            payload += "=" * (-len(payload) % 4)
+            return json.loads(base64.urlsafe_b64decode(payload)).get("sub")
+        except (IndexError, ValueError, AttributeError):
+            return None
+
+
+class ZwiftAuth(ZwiftAuthBase):
+    """Manages OAuth authentication and token lifecycle with Zwift.
+
+    Automatically handles token refresh when tokens expire. Safe to share
+    between threads: concurrent callers at expiry wait for a single refresh
+    instead of each fetching their own token.
+    """
+
+    # Time (seconds) before token expiration at which the background refresher renews it
+    BACKGROUND_REFRESH_LEAD = 60
+    # Minimum delay (seconds) between two background refresh attempts
+    BACKGROUND_MIN_INTERVAL = 30
+
+    def __init__(self, username: str, password: str, session: Optional[requests.Session] = None,
+                 token_cache: Optional[ZwiftTokenCache] = None, retry: Optional[RetryPolicy] = None,
+                 rate_limiter: Optional[RateLimiter] = None):
+        """Initialize authentication with Zwift credentials.
+
+        Args:
+            username: Zwift account username/email
+            password: Zwift account password
+            session: HTTP session to reuse connections from
+            token_cache: On-disk cache to load tokens from and save them to
+            retry: Retry policy for transient failures (single attempt if None)
+            rate_limiter: Rate limiter acquired before every attempt
+        """
+        super().__init__(username, password, token_cache)
+        self._session = session or requests.Session()
+        self._retry = retry or NO_RETRY
+        self._rate_limiter = rate_limiter
+
+        # Serializes token fetches so only one request hits the auth server at a time
+        self._token_lock = threading.Lock()
+        self._refresh_thread: Optional[threading.Thread] = None
+        self._stop_refresh = threading.Event()
+
+    def _fetch_token(self, use_refresh: bool = False) -> Dict[str, Any]:
+        """Fetch a new token from Zwift's auth server.
+
+        Args:
+            use_refresh: If True, use refresh token grant; otherwise use password grant
+
+        Returns:
+            Token response data from the API
+
+        Raises:
+            ZwiftAuthError: If authentication fails
+        """
+        data = self._token_request_data(use_refresh)
+
+        try:
+            # Token grants have no side effects, so they are safe to send again
+            response = self._retry.call(lambda: self._send(data), "POST", self.AUTH_URL, idempotent=True)
+            response.raise_for_status()
+            return response.json()
+        except requests.exceptions.HTTPError as e:
+            error_msg = f"Authentication failed: {e}"
+            if e.response is not None and e.response.text:
+                error_msg += f" - {e.response.text}"
+            if e.response is not None and e.response.status_code in self.REJECTED_STATUSES:
+                raise ZwiftTokenRejectedError(error_msg) from e
+            raise ZwiftAuthError(error_msg) from e
+        except requests.exceptions.RequestException as e:
+            raise ZwiftAuthError(f"Failed to connect to Zwift auth server: {e}") from e
+        except CircuitOpenError as e:
+            raise ZwiftAuthError(f"Zwift auth server unavailable: {e}") from e
+
+    def _send(self, data: Dict[str, str]) -> requests.Response:
+        """Send one token request, waiting for the rate limiter first."""
+        if self._rate_limiter:
+            self._rate_limiter.acquire(RateLimiter.host(self.AUTH_URL))
+        return self._session.post(self.AUTH_URL, data=data, timeout=30)
+
     def get_access_token(self) -> str:
         """Get a valid access token, refreshing if necessary.
 
+        Prefers a still-valid (possibly cached) access token, then the refresh
+        grant, then the password grant.
+
         Returns:
             A valid access token string
 
         Raises:
             ZwiftAuthError: If unable to obtain a valid token
         """
-        if self._has_valid_access_token() and self._access_token:
+        token = self._access_token
+        if token and self._has_valid_access_token():
+            return token
+
+        return self._obtain_token()
+
+    def _obtain_token(self, min_validity: float = 0) -> str:
+        """Return an access token valid for at least min_validity seconds.
+
+        Only one thread fetches at a time; threads that were waiting on the
+        lock reuse the token fetched by the first one.
+
+        Args:
+            min_validity: Seconds the returned token must remain valid for
+
+        Returns:
+            A valid access token string
+
+        Raises:
+            ZwiftAuthError: If unable to obtain a valid token
+        """
+        with self._token_lock:
+            self._load_cached_tokens()
+
+            if self._has_valid_access_token(min_validity) and self._access_token:
+                return self._access_token
+
+            # Try to refresh, or do full auth if refresh token is expired
+            use_refresh = self._has_valid_refresh_token()
+            self.logger.debug(
+                "Fetching new token via %s",
+                "refresh" if use_refresh else "password grant"
+            )
+
+            try:
+                token_data = self._fetch_token(use_refresh=use_refresh)
+            except ZwiftTokenRejectedError:
+                # Only a refused refresh token warrants a password grant; an
+                # unreachable auth server would refuse that one just the same
+                if not use_refresh:
+                    raise
+                self.logger.info("Refresh token rejected, falling back to password grant")
+                token_data = self._fetch_token(use_refresh=False)
+
+            self._update_tokens(token_data)
+
+            if not self._access_token:
+                raise ZwiftAuthError("Failed to obtain access token from response")
+
             return self._access_token
 
-        # Try to refresh, or do full auth if refresh token is expired
-        use_refresh = self._has_valid_refresh_token()
-        self.logger.debug(
-            "Fetching new token via %s",
-            "refresh" if use_refresh else "password grant"
+    def get_token_subject(self) -> Optional[str]:
+        """Get the subject (sub claim) of the current access token.
+
+        Returns:
+            The token subject, or None if the token is not a decodable JWT
+
+        Raises:
+            ZwiftAuthError: If unable to obtain a valid token
+        """
+        return self._decode_token_subject(self.get_access_token())
+
+    def start_background_refresh(self) -> None:
+        """Start a daemon thread renewing the access token before it expires.
+
+        Callers of get_access_token then never wait on the auth server.
+        Does nothing if the refresher is already running.
+        """
+        if self._refresh_thread and self._refresh_thread.is_alive():
+            return
+
+        self._stop_refresh.clear()
+        self._refresh_thread = threading.Thread(
+            target=self._background_refresh_loop, name="zwift-token-refresh", daemon=True
         )
+        self._refresh_thread.start()
 
-        token_data = self._fetch_token(use_refresh=use_refresh)
-        self._update_tokens(token_data)
+    def stop_background_refresh(self, timeout: Optional[float] = None) -> None:
+        """Stop the background refresher.
+
+        Args:
+            timeout: Maximum seconds to wait for the thread to finish
+        """
+        self._stop_refresh.set()
+        if self._refresh_thread:
+            self._refresh_thread.join(timeout)
+            self._refresh_thread = None
 
-        if not self._access_token:
-            raise ZwiftAuthError("Failed to obtain access token from response")
+    def _background_refresh_loop(self) -> None:
+        """Renew the token shortly before expiry until stopped."""
+        minimum_delay = 0.0
+        while not self._stop_refresh.is_set():
+            delay = self._access_token_expiration - self.BACKGROUND_REFRESH_LEAD - time.time()
+            if self._stop_refresh.wait(max(delay, minimum_delay)):
+                break
 
-        return self._access_token
+            # Never hammer the auth server, even with short-lived tokens or repeated failures
+            minimum_delay = self.BACKGROUND_MIN_INTERVAL
+            try:
+                self._obtain_token(min_validity=self.BACKGROUND_REFRESH_LEAD)
+            except ZwiftAuthError as e:
+                self.logger.warning(f"Background token refresh failed: {e}")
@@ -4,11 +4,66 @@ Main client module that orchestrates authentication and API access.
 This is a modern, drop-in replacement for the legacy zwift-client library.
 """
 
+import logging
+import threading
+from typing import Optional
+
+import requests
+
+from services.rate_limit import RateLimiter
 from services.zwift.auth import ZwiftAuth
+from services.zwift.request import ZwiftApiRequest
 from services.zwift.activities import ZwiftActivities
+from services.zwift.response_cache import ZwiftResponseCache
+from services.zwift.retry import RetryPolicy
+from services.zwift.session import create_session
+from services.zwift.token_cache import ZwiftTokenCache
+
+
+class ZwiftClientBase:
+    """Player ID persistence shared by the blocking and asyncio Zwift clients."""
+
+    def __init__(self, username: str, token_cache: Optional[ZwiftTokenCache] = None,
+                 response_cache: Optional[ZwiftResponseCache] = None):
+        """Initialize the shared client state.
+
+        Args:
+            username: Zwift account username/email
+            token_cache: On-disk cache to persist tokens across runs
+            response_cache: Response cache enabling conditional API requests
+        """
+        self.username = username
+        self.logger = logging.getLogger(__name__)
+        self._response_cache = response_cache
+        self._token_cache = token_cache
+
+        # Resolved numeric ID of "me" and the token subject it was resolved for
+        self._player_id: Optional[str] = None
+        self._player_id_subject: Optional[str] = None
+
+    def _load_cached_player_id(self, subject: Optional[str]) -> Optional[str]:
+        """Load the persisted player ID if it belongs to the given token subject."""
+        if self._token_cache is None:
+            return None
+
+        entry = self._token_cache.load(self.username) or {}
+        if entry.get("player_id") and entry.get("player_id_subject") == subject:
+            self.logger.debug("Loaded Zwift player ID from cache")
+            return entry["player_id"]
+        return None
 
+    def _save_cached_player_id(self, player_id: Optional[str], subject: Optional[str]) -> None:
+        """Persist the player ID and its token subject, if a token cache is configured."""
+        if self._token_cache is None:
+            return
 
-class ZwiftClient:
+        try:
+            self._token_cache.save(self.username, player_id=player_id, player_id_subject=subject)
+        except OSError as e:
+            self.logger.warning(f"Failed to save Zwift player ID to cache: {e}")
+
+
+class ZwiftClient(ZwiftClientBase):
     """Main client for interacting with Zwift's API.
 
     This is a drop-in replacement for the zwift-client library's Client class,
@@ -20,14 +75,28 @@ class ZwiftClient:
         activities = profile.get_activities()
     """
 
-    def __init__(self, username: str, password: str):
+    def __init__(self, username: str, password: str, session: Optional[requests.Session] = None,
+                 token_cache: Optional[ZwiftTokenCache] = None,
+                 response_cache: Optional[ZwiftResponseCache] = None,
+                 retry: Optional[RetryPolicy] = None,
+                 rate_limiter: Optional[RateLimiter] = None):
         """Initialize the Zwift client with credentials.
 
         Args:
             username: Zwift account username/email
             password: Zwift account password
+            session: HTTP session shared by all API calls (a pooled one is created by default)
+            token_cache: On-disk cache to persist tokens across runs
+            response_cache: Response cache enabling conditional API requests
+            retry: Retry policy shared by auth and API calls (a default one is created)
+            rate_limiter: Rate limiter shared by auth and API calls
         """
-        self._auth = ZwiftAuth(username, password)
+        super().__init__(username, token_cache, response_cache)
+        self._session = session or create_session()
+        self._retry = retry or RetryPolicy()
+        self._rate_limiter = rate_limiter
+        self._auth = ZwiftAuth(username, password, self._session, token_cache, self._retry, rate_limiter)
+        self._player_id_lock = threading.Lock()
 
     def get_profile(self, player_id: str = "me") -> ZwiftActivities:
         """Get an activities accessor for the specified player.
@@ -38,4 +107,41 @@ class ZwiftClient:
         Returns:
             ZwiftActivities instance for accessing activity data
         """
-        return ZwiftActivities(player_id, self._auth.get_access_token)
+        return ZwiftActivities(player_id, self._auth.get_access_token, self._session,
+                               self._response_cache, resolve_me=self.get_player_id, retry=self._retry,
+                               rate_limiter=self._rate_limiter)
+
+    def get_player_id(self) -> str:
+        """Resolve the authenticated player's numeric ID.
+
+        The result is kept on the client and, with a token cache, persisted
+        next to the tokens so later runs skip the /api/profiles/me call. It
+        is discarded whenever the access token's subject changes.
+
+        Returns:
+            The numeric player ID as a string
+        """
+        subject = self._auth.get_token_subject()
+
+        with self._player_id_lock:
+            if self._player_id and self._player_id_subject == subject:
+                return self._player_id
+
+            player_id = self._load_cached_player_id(subject)
+            if not player_id:
+                profile_data = ZwiftApiRequest(
+                    self._auth.get_access_token, self._session, self._response_cache, self._retry, self._rate_limiter
+                ).get_json("/api/profiles/me")
+                player_id = str(profile_data["id"])
+                self._save_cached_player_id(player_id, subject)
+
+            self._player_id = player_id
+            self._player_id_subject = subject
+            return player_id
+
+    def invalidate_player_id(self) -> None:
+        """Forget the resolved player ID, in memory and in the token cache."""
+        with self._player_id_lock:
+            self._player_id = None
+            self._player_id_subject = None
+            self._save_cached_player_id(None, None)
@@ -0,0 +1,235 @@
+"""Zwift activity file download module.
+
+Streams FIT files from S3 in fixed-size chunks, resumes interrupted
+transfers with HTTP Range requests and verifies the received content.
+"""
+
+import io
+import os
+import time
+import base64
+import hashlib
+import logging
+from typing import BinaryIO, Callable, NamedTuple, Optional
+
+import requests
+
+from services.rate_limit import RateLimiter
+from services.zwift.request import ZwiftApiError
+from services.zwift.retry import NO_RETRY, CircuitOpenError, RetryPolicy
+from services.zwift.session import CONNECT_TIMEOUT, READ_TIMEOUT
+
+
+class ZwiftDownloadError(ZwiftApiError):
+    """Raised when an activity file cannot be downloaded or fails verification."""
+
+    pass
+
+
+class DownloadProgress(NamedTuple):
+    """Progress of a download, reported after every chunk."""
+
+    url: str
+    # Bytes of the file held so far, including a resumed partial file
+    received: int
+    total: Optional[int]
+    elapsed: float
+    # Bytes transferred by this call
+    transferred: int
+
+    @property
+    def bytes_per_second(self) -> float:
+        """Average throughput of this call."""
+        return self.transferred / self.elapsed if self.elapsed > 0 else 0.0
+
+
+class StreamingDownloader:
+    """Downloads files in chunks with Range resume and integrity checks.
+
+    Only one chunk is held in memory at a time when writing to a file. A
+    connection dropped mid-transfer is resumed from the last received byte,
+    and an interrupted file download leaves a ``.part`` file that the next
+    call continues. The content is checked against the response length and,
+    when S3 provides one, the MD5 digest from its ETag or Content-MD5 header.
+    """
+
+    CHUNK_SIZE = 64 * 1024
+    # (connect, read) timeouts in seconds
+    TIMEOUT = (CONNECT_TIMEOUT, READ_TIMEOUT)
+    MAX_RESUMES = 3
+    PART_SUFFIX = ".part"
+
+    def __init__(self, session: Optional[requests.Session] = None, retry: Optional[RetryPolicy] = None,
+                 rate_limiter: Optional[RateLimiter] = None, chunk_size: int = CHUNK_SIZE,
+                 max_resumes: int = MAX_RESUMES):
+        """Initialize the downloader.
+
+        Args:
+            session: HTTP session to reuse connections from
+            retry: Retry policy for failures before the body is received
+            rate_limiter: Rate limiter acquired before every request
+            chunk_size: Size of the chunks read from the response
+            max_resumes: Number of times a dropped transfer is resumed
+        """
+        self._session = session or requests.Session()
+        self._retry = retry or NO_RETRY
+        self._rate_limiter = rate_limiter
+        self.chunk_size = chunk_size
+        self.max_resumes = max_resumes
+        self.logger = logging.getLogger(__name__)
+
+    def download_to_file(self, url: str, path: str,
+                         progress: Optional[Callable[[DownloadProgress], None]] = None,
+                         verify: bool = True) -> str:
+        """Download a URL to a file, resuming a previous partial download.
+
+        Args:
+            url: URL of the file
+            path: Destination path
+            progress: Callback receiving the progress after every chunk
+            verify: Check the content against the MD5 digest provided by S3
+
+        Returns:
+            The destination path
+
+        Raises:
+            ZwiftDownloadError: If the download fails or the content does not verify
+        """
+        part_path = path + self.PART_SUFFIX
+        with open(part_path, "a+b") as sink:
+            self._download(url, sink, progress, verify)
+        os.replace(part_path, path)
+        return path
+
+    def download_bytes(self, url: str, progress: Optional[Callable[[DownloadProgress], None]] = None,
+                       verify: bool = True) -> bytes:
+        """Download a URL into memory.
+
+        Args:
+            url: URL of the file
+            progress: Callback receiving the progress after every chunk
+            verify: Check the content against the MD5 digest provided by S3
+
+        Returns:
+            The file contents
+
+        Raises:
+            ZwiftDownloadError: If the download fails or the content does not verify
+        """
+        sink = io.BytesIO()
+        self._download(url, sink, progress, verify)
+        return sink.getvalue()
+
+    def _send(self, url: str, offset: int) -> requests.Response:
+        """Send one streaming GET request starting at offset."""
+        if self._rate_limiter:
+            self._rate_limiter.acquire(RateLimiter.host(url))
+        headers = {"Range": f"bytes={offset}-"} if offset else {}
+        return self._session.get(url, headers=headers, stream=True, timeout=self.TIMEOUT)
+
+    def _download(self, url: str, sink: BinaryIO, progress: Optional[Callable[[DownloadProgress], None]],
+                  verify: bool) -> None:
+        """Stream a URL into sink, appending after the bytes sink already holds."""
+        digest = hashlib.md5()
+        sink.seek(0)
+        for chunk in iter(lambda: sink.read(self.chunk_size), b""):
+            digest.update(chunk)
+        offset = sink.tell()
+        if offset:
+            self.logger.info(f"Resuming download of {url} at byte {offset}")
+
+        started = time.monotonic()
+        received = 0
+        resumes = 0
+        while True:
+            try:
+                response = self._retry.call(lambda: self._send(url, offset), "GET", url)
+            except (requests.RequestException, CircuitOpenError) as e:
+                raise ZwiftDownloadError(f"Failed to download {url}: {e}") from e
+
+            with response:
+                if offset and response.status_code == 416:
+                    # The partial content does not match the object any more
+                    self.logger.warning(f"Cannot resume {url}, restarting from the beginning")
+                    sink.seek(0)
+                    sink.truncate(0)
+                    digest, offset = hashlib.md5(), 0
+                    continue
+                if response.status_code >= 400:
+                    raise ZwiftDownloadError(
+                        f"Failed to download {url}: {response.status_code} - {response.reason}"
+                    )
+                if offset and response.status_code != 206:
+                    # Range ignored, the whole object is sent again
+                    sink.seek(0)
+                    sink.truncate(0)
+                    digest, offset = hashlib.md5(), 0
+
+                total = self._total_size(response, offset)
+                try:
+                    for chunk in response.iter_content(chunk_size=self.chunk_size):
+                        sink.write(chunk)
+                        digest.update(chunk)
+                        offset += len(chunk)
+                        received += len(chunk)
+                        if progress:
+                            progress(DownloadProgress(url, offset, total, time.monotonic() - started, received))
+                except (requests.ConnectionError, requests.Timeout,
+                        requests.exceptions.ChunkedEncodingError) as e:
+                    if resumes >= self.max_resumes:
+                        raise ZwiftDownloadError(f"Download of {url} interrupted: {e}") from e
+                    resumes += 1
+                    self.logger.warning(f"Download of {url} interrupted at byte {offset}, resuming: {e}")
+                    continue
+
+                if total is not None and offset != total:
+                    raise ZwiftDownloadError(f"Incomplete download of {url}: {offset} of {total} bytes")
+                expected = self._expected_md5(response) if verify else None
+                if expected and digest.hexdigest() != expected:
+                    # Drop the corrupt content so the next attempt starts over
+                    sink.seek(0)
+                    sink.truncate(0)
+                    raise ZwiftDownloadError(
+                        f"Checksum mismatch for {url}: expected {expected}, got {digest.hexdigest()}"
+                    )
+
+            elapsed = time.monotonic() - started
+            self.logger.debug(f"Downloaded {received} bytes from {url} in {elapsed:.2f}s")
+            return
+
+    @staticmethod
+    def _total_size(response: requests.Response, offset: int) -> Optional[int]:
+        """Get the full object size from Content-Range or Content-Length."""
+        content_range = response.headers.get("Content-Range", "")
+        if "/" in content_range and not content_range.endswith("/*"):
+            return int(content_range.rsplit("/", 1)[1])
+
+        content_length = response.headers.get("Content-Length")
+        if content_length is None or response.headers.get("Content-Encoding"):
+            return None
+        return offset + int(content_length) if response.status_code == 206 else int(content_length)
+
+    @staticmethod
+    def _expected_md5(response: requests.Response) -> Optional[str]:
+        """Get the MD5 hex digest S3 reports for the object, if any.
+
+        S3 ETags are the MD5 of the content except for multipart uploads,
+        whose ETags contain a dash, and objects encrypted with SSE-KMS or
+        SSE-C keys, whose ETags are not derived from the content; both are
+        skipped.
+        """
+        content_md5 = response.headers.get("Content-MD5")
+        if content_md5 and response.status_code == 200:
+            try:
+                return base64.b64decode(content_md5).hex()
+            except ValueError:
+                return None
+
+        if (response.headers.get("x-amz-server-side-encryption", "").startswith("aws:kms")
+                or "x-amz-server-side-encryption-customer-algorithm" in response.headers):
+            return None
+
+        etag = response.headers.get("ETag", "").strip('"')
+        if len(etag) == 32 and "-" not in etag:
+            return etag.lower()
+        return None
@@ -5,25 +5,44 @@ Provides shared player ID resolution logic for accessing player-specific endpoin
 
 from typing import Callable, Optional
 
+import requests
+
 from services.zwift.request import ZwiftApiRequest
+from services.zwift.response_cache import ZwiftResponseCache
+from services.rate_limit import RateLimiter
+from services.zwift.retry import RetryPolicy
 
 
 class ZwiftPlayerResource:
     """Base class for Zwift resources that require player ID resolution.
 
     Handles the logic of resolving "me" to an actual numeric player ID,
-    with caching to avoid repeated API calls.
+    with caching to avoid repeated API calls. Resolution can be delegated
+    to a shared resolver (such as ZwiftClient.get_player_id) so the result is
+    reused across resources.
     """
 
-    def __init__(self, player_id: str, get_access_token: Callable[[], str]):
+    def __init__(self, player_id: str, get_access_token: Callable[[], str],
+                 session: Optional[requests.Session] = None,
+                 cache: Optional[ZwiftResponseCache] = None,
+                 resolve_me: Optional[Callable[[], str]] = None,
+                 retry: Optional[RetryPolicy] = None,
+                 rate_limiter: Optional[RateLimiter] = None):
         """Initialize player resource.
 
         Args:
             player_id: Player ID or "me" for authenticated user
             get_access_token: Callable that returns a valid access token
+            session: HTTP session to reuse connections from
+            cache: Response cache enabling conditional requests
+            resolve_me: Callable resolving "me" to the numeric player ID,
+                used instead of this resource's own lookup
+            retry: Retry policy for transient failures
+            rate_limiter: Rate limiter acquired before every request
         """
         self._player_id = player_id
-        self._request = ZwiftApiRequest(get_access_token)
+        self._request = ZwiftApiRequest(get_access_token, session, cache, retry, rate_limiter)
+        self._resolve_me = resolve_me
         self._resolved_player_id: Optional[str] = None
 
     def _get_player_id(self) -> str:
@@ -43,6 +62,10 @@ class ZwiftPlayerResource:
             self._resolved_player_id = self._player_id
             return self._player_id
 
+        # The shared resolver keeps its own cache and handles invalidation
+        if self._resolve_me:
+            return self._resolve_me()
+
         # Resolve "me" to actual player ID via API
         profile_data = self._request.get_json("/api/profiles/me")
         self._resolved_player_id = str(profile_data["id"])
@@ -3,22 +3,37 @@
 Provides access to player profile information.
 """
 
-from typing import Any, Callable, Dict
+from typing import Any, Callable, Dict, Optional
+
+import requests
 
 from services.zwift.player_resource import ZwiftPlayerResource
+from services.zwift.response_cache import ZwiftResponseCache
+from services.rate_limit import RateLimiter
+from services.zwift.retry import RetryPolicy
 
 
 class ZwiftProfile(ZwiftPlayerResource):
     """Provides access to Zwift player profile data."""
 
-    def __init__(self, player_id: str, get_access_token: Callable[[], str]):
+    def __init__(self, player_id: str, get_access_token: Callable[[], str],
+                 session: Optional[requests.Session] = None,
+                 cache: Optional[ZwiftResponseCache] = None,
+                 resolve_me: Optional[Callable[[], str]] = None,
+                 retry: Optional[RetryPolicy] = None,
+                 rate_limiter: Optional[RateLimiter] = None):
         """Initialize profile access.
 
         Args:
             player_id: Player ID or "me" for authenticated user
             get_access_token: Callable that returns a valid access token
+            session: HTTP session to reuse connections from
+            cache: Response cache enabling conditional requests
+            resolve_me: Callable resolving "me" to the numeric player ID
+            retry: Retry policy for transient failures
+            rate_limiter: Rate limiter acquired before every request
         """
-        super().__init__(player_id, get_access_token)
+        super().__init__(player_id, get_access_token, session, cache, resolve_me, retry, rate_limiter)
 
     @property
     def profile(self) -> Dict[str, Any]:
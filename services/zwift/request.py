@@ -3,11 +3,16 @@
 Handles authenticated HTTP requests to Zwift's API endpoints.
 """
 
+import json
 import logging
-from typing import Any, Callable, Dict
+from typing import Any, Callable, Dict, Optional
 
 import requests
 
+from services.rate_limit import RateLimiter
+from services.zwift.response_cache import ZwiftResponseCache
+from services.zwift.retry import NO_RETRY, CircuitOpenError, RetryPolicy
+
 
 class ZwiftApiError(Exception):
     """Raised when a Zwift API request fails."""
@@ -24,13 +29,23 @@ class ZwiftApiRequest:
     }
     REQUEST_TIMEOUT = 30
 
-    def __init__(self, get_access_token: Callable[[], str]):
+    def __init__(self, get_access_token: Callable[[], str], session: Optional[requests.Session] = None,
+                 cache: Optional[ZwiftResponseCache] = None, retry: Optional[RetryPolicy] = None,
+                 rate_limiter: Optional[RateLimiter] = None):
         """Initialize with a token provider function.
 
         Args:
             get_access_token: Callable that returns a valid access token
+            session: HTTP session to reuse connections from
+            cache: Response cache enabling conditional requests
+            retry: Retry policy for transient failures (single attempt if None)
+            rate_limiter: Rate limiter acquired before every attempt
         """
         self._get_access_token = get_access_token
+        self._session = session or requests.Session()
+        self._cache = cache
+        self._retry = retry or NO_RETRY
+        self._rate_limiter = rate_limiter
         self.logger = logging.getLogger(__name__)
 
     def _get_headers(self, accept_type: str = "application/json") -> Dict[str, str]:
@@ -49,9 +64,18 @@ class ZwiftApiRequest:
         headers.update(self.DEFAULT_HEADERS)
         return headers
 
+    def _send(self, url: str, headers: Dict[str, str]) -> requests.Response:
+        """Send one GET request, waiting for the rate limiter first."""
+        if self._rate_limiter:
+            self._rate_limiter.acquire(RateLimiter.host(url))
+        return self._session.get(url, headers=headers, timeout=self.REQUEST_TIMEOUT)
+
     def get_json(self, endpoint: str) -> Any:
         """Make a GET request and return JSON response.
 
+        With a response cache, previously seen responses are revalidated with
+        If-None-Match/If-Modified-Since and a 304 is served from the cache.
+
         Args:
             endpoint: API endpoint path (e.g., "/api/profiles/me")
 
@@ -64,15 +88,28 @@ class ZwiftApiRequest:
         url = f"{self.BASE_URL}{endpoint}"
         headers = self._get_headers("application/json")
 
+        cached = self._cache.get(url) if self._cache else None
+        if cached:
+            headers.update(cached.validator_headers())
+
         try:
-            response = requests.get(url, headers=headers, timeout=self.REQUEST_TIMEOUT)
+            response = self._retry.call(lambda: self._send(url, headers), "GET", url)
             response.raise_for_status()
+            if cached and response.status_code == 304:
+                self.logger.debug(f"Serving {endpoint} from cache (not modified)")
+                return json.loads(cached.body)
             try:
-                return response.json()
+                data = response.json()
             except ValueError as decode_err:
                 snippet = response.text[:200].strip()  # Limit body preview
                 raise ZwiftApiError(f"API response not JSON-decodable (status={response.status_code}): {snippet}") from decode_err
+            if self._cache:
+                self._cache.put(url, response.headers.get("ETag"), response.headers.get("Last-Modified"),
+                                response.text)
+            return data
         except requests.exceptions.HTTPError as e:
             raise ZwiftApiError(f"API request failed: {e.response.status_code} - {e.response.reason}") from e
         except requests.exceptions.RequestException as e:
             raise ZwiftApiError(f"Failed to connect to Zwift API: {e}") from e
+        except CircuitOpenError as e:
+            raise ZwiftApiError(f"Zwift API unavailable: {e}") from e
@@ -0,0 +1,191 @@
+"""Zwift response cache module.
+
+Keeps API response bodies with their HTTP validators so unchanged resources
+can be revalidated with conditional requests instead of downloaded again.
+"""
+
+import os
+import json
+import hashlib
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional
+
+
+class CachedResponse(NamedTuple):
+    """A cached response body and the validators it was served with."""
+
+    etag: Optional[str]
+    last_modified: Optional[str]
+    body: str
+
+    def validator_headers(self) -> Dict[str, str]:
+        """Build the conditional request headers for this response.
+
+        Returns:
+            Headers dictionary with If-None-Match and/or If-Modified-Since
+        """
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class ZwiftResponseCache:
+    """Size-bounded LRU cache of API responses, optionally backed by disk.
+
+    Entries are kept in memory in least-recently-used order and evicted once
+    their total body size exceeds max_bytes. When a directory is given, every
+    entry is also written there so later processes can revalidate it; the
+    same bound and eviction apply to the files on disk.
+    """
+
+    DEFAULT_MAX_BYTES = 4 * 1024 * 1024
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES, directory: Optional[str] = None):
+        """Initialize the cache.
+
+        Args:
+            max_bytes: Maximum total size of the cached bodies
+            directory: Directory for the on-disk store (memory only if None)
+        """
+        self.max_bytes = max_bytes
+        self.directory = os.path.expanduser(directory) if directory else None
+        self.logger = logging.getLogger(__name__)
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+            self._load_directory()
+
+    def get(self, url: str) -> Optional[CachedResponse]:
+        """Get the cached response of a URL.
+
+        Args:
+            url: Request URL
+
+        Returns:
+            The cached response, or None if not cached
+        """
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is not None:
+                self._entries.move_to_end(url)
+                return entry
+
+        entry = self._read(url)
+        if entry is not None:
+            with self._lock:
+                self._insert(url, entry)
+        return entry
+
+    def put(self, url: str, etag: Optional[str], last_modified: Optional[str], body: str) -> None:
+        """Cache a response that carries validators.
+
+        Args:
+            url: Request URL
+            etag: ETag response header
+            last_modified: Last-Modified response header
+            body: Response body text
+        """
+        if not etag and not last_modified:
+            return
+
+        entry = CachedResponse(etag, last_modified, body)
+        with self._lock:
+            inserted = self._insert(url, entry)
+        if inserted:
+            self._write(url, entry)
+
+    def _insert(self, url: str, entry: CachedResponse) -> bool:
+        """Insert an entry in memory and evict the least recently used ones.
+
+        Returns:
+            False if the entry is larger than the whole cache and was dropped
+        """
+        previous = self._entries.pop(url, None)
+        if previous is not None:
+            self._size -= len(previous.body)
+
+        if len(entry.body) > self.max_bytes:
+            self._remove(url)
+            return False
+
+        self._entries[url] = entry
+        self._size += len(entry.body)
+
+        while self._size > self.max_bytes:
+            evicted_url, evicted = self._entries.popitem(last=False)
+            self._size -= len(evicted.body)
+            self._remove(evicted_url)
+            self.logger.debug(f"Evicted cached response for {evicted_url}")
+
+        return True
+
+    def _load_directory(self) -> None:
+        """Index the on-disk entries, oldest first, applying the size bound."""
+        paths = [
+            os.path.join(self.directory, name)
+            for name in os.listdir(self.directory)
+            if name.endswith(".json")
+        ]
+        paths.sort(key=os.path.getmtime)
+
+        for path in paths:
+            try:
+                with open(path, "r", encoding="utf-8") as file:
+                    data = json.load(file)
+                entry = CachedResponse(data.get("etag"), data.get("last_modified"), data["body"])
+                self._insert(data["url"], entry)
+            except (OSError, ValueError, KeyError) as e:
+                self.logger.warning(f"Ignoring unreadable cached response {path}: {e}")
+
+    def _path(self, url: str) -> str:
+        """Get the on-disk path of a URL's entry."""
+        return os.path.join(self.directory, hashlib.sha256(url.encode()).hexdigest() + ".json")
+
+    def _read(self, url: str) -> Optional[CachedResponse]:
+        """Read an entry from the on-disk store."""
+        if not self.directory:
+            return None
+
+        try:
+            with open(self._path(url), "r", encoding="utf-8") as file:
+                data = json.load(file)
+            return CachedResponse(data.get("etag"), data.get("last_modified"), data["body"])
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError) as e:
+            self.logger.warning(f"Ignoring unreadable cached response for {url}: {e}")
+            return None
+
+    def _write(self, url: str, entry: CachedResponse) -> None:
+        """Atomically write an entry to the on-disk store."""
+        if not self.directory:
+            return
+
+        try:
+            fd, temp_path = tempfile.mkstemp(dir=self.directory, prefix=".response_")
+            with os.fdopen(fd, "w", encoding="utf-8") as file:
+                json.dump({"url": url, **entry._asdict()}, file)
+            os.replace(temp_path, self._path(url))
+        except OSError as e:
+            self.logger.warning(f"Failed to store cached response for {url}: {e}")
+
+    def _remove(self, url: str) -> None:
+        """Remove an entry from the on-disk store."""
+        if not self.directory:
+            return
+
+        try:
+            os.remove(self._path(url))
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            self.logger.warning(f"Failed to remove cached response for {url}: {e}")
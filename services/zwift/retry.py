@@ -0,0 +1,283 @@
+"""Zwift retry policy module.
+
+Retries transient HTTP failures with exponential backoff and jitter, honours
+Retry-After, and trips a per-host circuit breaker while a host is down.
+"""
+
+import time
+import random
+import logging
+import threading
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, Iterable, Optional
+from urllib.parse import urlsplit
+
+import requests
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is refused because the host's circuit breaker is open."""
+
+    pass
+
+
+class CircuitBreaker:
+    """Fails fast while a host keeps failing.
+
+    The breaker opens after failure_threshold consecutive failures. Once
+    reset_timeout has elapsed a single trial call is let through: success
+    closes the breaker, failure opens it again.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic):
+        """Initialize a closed breaker.
+
+        Args:
+            name: Name used in errors and logs (usually the host)
+            failure_threshold: Consecutive failures that open the breaker
+            reset_timeout: Seconds to wait before letting a trial call through
+            clock: Monotonic time source
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.logger = logging.getLogger(__name__)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_progress = False
+
+    @property
+    def is_open(self) -> bool:
+        """Whether calls are currently being refused."""
+        with self._lock:
+            return self._opened_at is not None
+
+    def before_call(self) -> None:
+        """Check that a call may be made.
+
+        Raises:
+            CircuitOpenError: If the breaker is open and no trial call is due
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return
+            remaining = self._opened_at + self.reset_timeout - self._clock()
+            if remaining > 0 or self._trial_in_progress:
+                raise CircuitOpenError(f"{self.name} is unavailable, retrying in {max(remaining, 0):.0f}s")
+            self._trial_in_progress = True
+
+    def record_success(self) -> None:
+        """Record a call that reached a healthy host and close the breaker."""
+        with self._lock:
+            if self._opened_at is not None:
+                self.logger.info(f"{self.name} is available again")
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_progress = False
+
+    def release_trial(self) -> None:
+        """End a trial call that failed for reasons unrelated to the host, without counting it."""
+        with self._lock:
+            self._trial_in_progress = False
+
+    def record_failure(self) -> None:
+        """Record a failed call, opening the breaker at the threshold or after a failed trial."""
+        with self._lock:
+            self._failures += 1
+            if self._trial_in_progress or self._failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    self.logger.warning(f"{self.name} keeps failing, pausing calls for {self.reset_timeout}s")
+                self._opened_at = self._clock()
+            self._trial_in_progress = False
+
+
+class RetryPolicy:
+    """Shared retry policy for HTTP calls to Zwift, its auth server and S3.
+
+    Connection errors, timeouts and the statuses in retry_statuses are retried
+    with full-jitter exponential backoff, or after the delay given by a
+    Retry-After header. Only idempotent calls are retried: by default the
+    methods in IDEMPOTENT_METHODS, overridable per endpoint by the caller.
+    Every host gets its own circuit breaker; 5xx responses and connection
+    failures count as failures, any other response as a success.
+    """
+
+    IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+    DEFAULT_RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+    def __init__(self, max_attempts: int = 4, backoff_factor: float = 0.5, max_backoff: float = 30.0,
+                 max_retry_after: float = 120.0,
+                 retry_statuses: Iterable[int] = DEFAULT_RETRY_STATUSES,
+                 failure_threshold: Optional[int] = 5, reset_timeout: float = 30.0,
+                 sleep: Callable[[float], None] = time.sleep):
+        """Initialize the policy.
+
+        Args:
+            max_attempts: Total attempts per call, including the first one
+            backoff_factor: Base delay in seconds, doubled after every attempt
+            max_backoff: Upper bound of the backoff delay
+            max_retry_after: Upper bound of a delay requested by Retry-After
+            retry_statuses: Response statuses that are retried
+            failure_threshold: Consecutive failures opening a host's circuit
+                breaker (None disables the breakers)
+            reset_timeout: Seconds an open breaker waits before a trial call
+            sleep: Function used to wait between attempts
+        """
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.max_retry_after = max_retry_after
+        self.retry_statuses = frozenset(retry_statuses)
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.logger = logging.getLogger(__name__)
+        self._sleep = sleep
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._breakers_lock = threading.Lock()
+
+    def breaker(self, url: str) -> Optional[CircuitBreaker]:
+        """Get the circuit breaker of a URL's host.
+
+        Args:
+            url: Request URL
+
+        Returns:
+            The host's breaker, or None if breakers are disabled
+        """
+        if not self.failure_threshold:
+            return None
+
+        host = urlsplit(url).netloc
+        with self._breakers_lock:
+            if host not in self._breakers:
+                self._breakers[host] = CircuitBreaker(host, self.failure_threshold, self.reset_timeout)
+            return self._breakers[host]
+
+    def is_idempotent(self, method: str, idempotent: Optional[bool] = None) -> bool:
+        """Tell whether a call may safely be sent more than once.
+
+        Args:
+            method: HTTP method
+            idempotent: Explicit answer for the endpoint, overriding the method default
+
+        Returns:
+            True if the call may be retried
+        """
+        if idempotent is not None:
+            return idempotent
+        return method.upper() in self.IDEMPOTENT_METHODS
+
+    def backoff(self, attempt: int) -> float:
+        """Compute the full-jitter backoff delay after a failed attempt.
+
+        Args:
+            attempt: Number of the failed attempt, starting at 1
+
+        Returns:
+            Delay in seconds
+        """
+        return random.uniform(0, min(self.max_backoff, self.backoff_factor * 2 ** (attempt - 1)))
+
+    def wait(self, delay: float) -> None:
+        """Wait between attempts with the policy's sleep function.
+
+        Args:
+            delay: Delay in seconds
+        """
+        if delay > 0:
+            self._sleep(delay)
+
+    def retry_after(self, response: requests.Response) -> Optional[float]:
+        """Parse a response's Retry-After header.
+
+        Args:
+            response: HTTP response
+
+        Returns:
+            Delay in seconds (capped to max_retry_after), or None if absent or invalid
+        """
+        value = response.headers.get("Retry-After")
+        if not value:
+            return None
+
+        try:
+            delay = float(value)
+        except ValueError:
+            try:
+                delay = parsedate_to_datetime(value).timestamp() - time.time()
+            except (TypeError, ValueError):
+                return None
+
+        return min(max(delay, 0.0), self.max_retry_after)
+
+    def call(self, send: Callable[[], requests.Response], method: str, url: str,
+             idempotent: Optional[bool] = None) -> requests.Response:
+        """Send a request, retrying transient failures.
+
+        The last response is returned even if its status is retryable, so
+        callers keep handling errors with raise_for_status.
+
+        Args:
+            send: Function sending the request once
+            method: HTTP method of the request
+            url: Request URL, used to select the host's circuit breaker
+            idempotent: Whether the endpoint may be retried (defaults to the method)
+
+        Returns:
+            The HTTP response
+
+        Raises:
+            CircuitOpenError: If the host's circuit breaker is open
+            requests.RequestException: If the last attempt failed to get a response
+            Exception: Whatever send raised besides request errors, not retried
+        """
+        breaker = self.breaker(url)
+        attempts = self.max_attempts if self.is_idempotent(method, idempotent) else 1
+
+        attempt = 0
+        while True:
+            attempt += 1
+            if breaker:
+                breaker.before_call()
+
+            try:
+                response = send()
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if breaker:
+                    breaker.record_failure()
+                if attempt == attempts:
+                    raise
+                delay = self.backoff(attempt)
+                self.logger.warning(f"{method} {url} failed ({e}), retrying in {delay:.1f}s")
+            except requests.RequestException:
+                # Other request errors, such as a broken chunked body, are the host's too
+                if breaker:
+                    breaker.record_failure()
+                raise
+            except BaseException:
+                # Failures on this side, e.g. in the rate limiter, leave the host's state alone
+                if breaker:
+                    breaker.release_trial()
+                raise
+            else:
+                if breaker:
+                    if response.status_code >= 500:
+                        breaker.record_failure()
+                    else:
+                        breaker.record_success()
+                if response.status_code not in self.retry_statuses or attempt == attempts:
+                    return response
+
+                retry_after = self.retry_after(response)
+                delay = retry_after if retry_after is not None else self.backoff(attempt)
+                response.close()
+                self.logger.warning(f"{method} {url} returned {response.status_code}, retrying in {delay:.1f}s")
+
+            self.wait(delay)
+
+
+# Policy sending every request exactly once, used when no policy is configured
+NO_RETRY = RetryPolicy(max_attempts=1, failure_threshold=None)
@@ -0,0 +1,47 @@
+"""Zwift HTTP session module.
+
+Builds pooled, keep-alive HTTP sessions shared by the Zwift API client.
+"""
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Number of per-host connection pools kept by a session
+DEFAULT_POOL_CONNECTIONS = 10
+# Number of keep-alive connections kept in each host pool
+DEFAULT_POOL_MAXSIZE = 10
+# Number of retries for connections that could not be established
+DEFAULT_MAX_RETRIES = 2
+# Seconds to wait for a connection to be established
+CONNECT_TIMEOUT = 10
+# Seconds to wait for the next bytes of a response
+READ_TIMEOUT = 30
+
+
+def create_session(pool_connections: int = DEFAULT_POOL_CONNECTIONS,
+                   pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+                   max_retries: int = DEFAULT_MAX_RETRIES) -> requests.Session:
+    """Create a requests session with pooled keep-alive connections.
+
+    Connections are kept open and reused per host, so consecutive calls to
+    the same host skip the TCP and TLS handshakes. Only failures to connect
+    are retried, which is safe for any HTTP method since no request was sent.
+
+    Args:
+        pool_connections: Number of host pools to keep
+        pool_maxsize: Maximum number of connections kept per host
+        max_retries: Number of connection retries
+
+    Returns:
+        Configured requests session
+    """
+    retry = Retry(total=max_retries, connect=max_retries, read=0, status=0, other=0,
+                  backoff_factor=0.5)
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize,
+                          max_retries=retry)
+
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
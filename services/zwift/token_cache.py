@@ -0,0 +1,98 @@
+"""Zwift token cache module.
+
+Persists OAuth tokens on disk so new processes can skip the password grant.
+"""
+
+import os
+import json
+import logging
+import tempfile
+import threading
+from typing import Any, Dict, Optional
+
+
+class ZwiftTokenCache:
+    """JSON file holding per-user Zwift authentication state.
+
+    Entries are keyed by username. The file is only readable by its owner
+    and is always replaced atomically, so a crash mid-write never leaves a
+    truncated cache behind.
+    """
+
+    FILE_MODE = 0o600
+
+    def __init__(self, path: str):
+        """Initialize the cache.
+
+        Args:
+            path: Path of the cache file (created on first save)
+        """
+        self.path = os.path.expanduser(path)
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+
+    def load(self, username: str) -> Optional[Dict[str, Any]]:
+        """Load the cached entry of a user.
+
+        Args:
+            username: Zwift account username/email
+
+        Returns:
+            The cached entry, or None if there is none or the file is unreadable
+        """
+        with self._lock:
+            return self._read().get(username)
+
+    def save(self, username: str, **fields: Any) -> None:
+        """Merge fields into the cached entry of a user.
+
+        Args:
+            username: Zwift account username/email
+            **fields: Values to store
+        """
+        with self._lock:
+            entries = self._read()
+            entries.setdefault(username, {}).update(fields)
+            self._write(entries)
+
+    def clear(self, username: str) -> None:
+        """Remove the cached entry of a user.
+
+        Args:
+            username: Zwift account username/email
+        """
+        with self._lock:
+            entries = self._read()
+            if entries.pop(username, None) is not None:
+                self._write(entries)
+
+    def _read(self) -> Dict[str, Dict[str, Any]]:
+        """Read all entries from disk."""
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                entries = json.load(file)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Ignoring unreadable token cache {self.path}: {e}")
+            return {}
+
+        return entries if isinstance(entries, dict) else {}
+
+    def _write(self, entries: Dict[str, Dict[str, Any]]) -> None:
+        """Atomically write all entries to disk with owner-only permissions."""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".zwift_tokens_")
+        try:
+            os.chmod(temp_path, self.FILE_MODE)
+            with os.fdopen(fd, "w", encoding="utf-8") as file:
+                json.dump(entries, file)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temp_path, self.path)
+        except OSError:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
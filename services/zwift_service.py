@@ -2,41 +2,87 @@
 
 import os
 import tempfile
+import threading
 import requests
 import logging
-from typing import Optional, Dict, Any
-from services.zwift import ZwiftClient
+from collections import deque
+from datetime import datetime
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Optional, Deque, Dict, Any, Callable, Iterable, Iterator, List, NamedTuple, Tuple
+from services.fit_cache import FitFileCache
+from services.rate_limit import RateLimiter
+from services.zwift import (DownloadProgress, RetryPolicy, StreamingDownloader, ZwiftClient, ZwiftDownloadError,
+                            ZwiftResponseCache, ZwiftTokenCache, create_session)
+
+
+class ActivityDownload(NamedTuple):
+    """Outcome of one download from ZwiftService.download_activities."""
+
+    activity: Dict[str, Any]
+    data: Optional[bytes]
+    error: Optional[Exception]
 
 
 class ZwiftService:
     """Service for interacting with Zwift API."""
 
-    def __init__(self, username: str, password: str):
+    def __init__(self, username: str, password: str, session: Optional[requests.Session] = None,
+                 token_cache: Optional[ZwiftTokenCache] = None,
+                 response_cache: Optional[ZwiftResponseCache] = None,
+                 retry: Optional[RetryPolicy] = None,
+                 rate_limiter: Optional[RateLimiter] = None,
+                 fit_cache: Optional[FitFileCache] = None):
         """Initialize ZwiftService with credentials.
 
         Args:
             username: Zwift username
             password: Zwift password
+            session: HTTP session shared by the API client and the S3 downloads
+                (a pooled one is created by default)
+            token_cache: On-disk cache to persist Zwift tokens across runs
+            response_cache: Response cache making unchanged API polls cheap
+            retry: Retry policy shared by the API client and the S3 downloads
+                (a default one is created)
+            rate_limiter: Rate limiter shared by the API client and the S3 downloads
+            fit_cache: Local FIT file cache checked before downloading from S3
         """
         self.username = username
         self.password = password
+        self.session = session or create_session()
+        self.token_cache = token_cache
+        self.response_cache = response_cache
+        self.retry = retry or RetryPolicy()
+        self.rate_limiter = rate_limiter
+        self.fit_cache = fit_cache
+        self.downloader = StreamingDownloader(self.session, self.retry, self.rate_limiter)
         self.client: Optional[ZwiftClient] = None
         self.logger = logging.getLogger(__name__)
 
     def authenticate(self) -> None:
         """Authenticate with Zwift."""
         self.logger.info("Authenticating with Zwift...")
-        self.client = ZwiftClient(self.username, self.password)
+        self.client = ZwiftClient(self.username, self.password, session=self.session,
+                                  token_cache=self.token_cache, response_cache=self.response_cache,
+                                  retry=self.retry, rate_limiter=self.rate_limiter)
         self.logger.info("Successfully authenticated with Zwift")
 
-    def download_last_activity(self) -> Optional[str]:
-        """Downloads the last activity's .fit file from Zwift.
+    def ensure_authenticated(self) -> None:
+        """Authenticate unless already authenticated.
+
+        The client refreshes its tokens on its own, so long-running processes
+        keep one client (and its connection pool) instead of logging in again.
+        """
+        if self.client is None:
+            self.authenticate()
+
+    def get_last_activity(self) -> Optional[Dict[str, Any]]:
+        """Fetch the most recent activity from Zwift.
 
         Returns:
-            Path to downloaded .fit file, or None if no activities found
+            The latest activity dictionary, or None if no activities found
 
         Raises:
-            RuntimeError: If not authenticated or download fails
+            RuntimeError: If not authenticated
         """
         if not self.client:
             raise RuntimeError("Must authenticate before downloading activities")
@@ -48,25 +94,282 @@ class ZwiftService:
             self.logger.info("No activities found on Zwift")
             return None
 
-        last_activity = activities[0]  # The most recent activity
-        activity_id = last_activity['id']
-        self.logger.info(f"Downloading activity {activity_id}...")
+        return activities[0]  # The most recent activity
+
+    def get_new_activities(self, is_synced: Callable[[Dict[str, Any]], bool],
+                           max_activities: int = 10, page_size: int = 10,
+                           max_scanned: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Fetch the oldest activities newer than the last synced one.
+
+        Streams the activity list (most recent first) up to the first already
+        synced activity, or the first max_scanned activities, keeping only the
+        max_activities oldest new ones. Transferring those first moves the
+        watermark forward without skipping past the newer ones, which the
+        next calls pick up.
+
+        Args:
+            is_synced: Callable telling whether an activity was already synced
+            max_activities: Maximum number of new activities to return
+            page_size: Number of activities requested on the first page
+            max_scanned: Maximum number of activities to look at (no limit by default)
+
+        Returns:
+            The oldest new activities, most recent first
+
+        Raises:
+            RuntimeError: If not authenticated
+        """
+        if not self.client:
+            raise RuntimeError("Must authenticate before downloading activities")
+
+        if max_scanned is not None:
+            page_size = max(1, min(page_size, max_scanned))
+        profile = self.client.get_profile()
+        activities = profile.iter_activities(page_size=page_size, stop=is_synced)
+        oldest: Deque[Dict[str, Any]] = deque(maxlen=max_activities)
+        found = 0
+        try:
+            for activity in activities:
+                if found == max_scanned:
+                    self.logger.info(f"Stopped looking for new activities after the {max_scanned} most recent ones")
+                    break
+                oldest.append(activity)
+                found += 1
+        finally:
+            activities.close()
+
+        if found > max_activities:
+            self.logger.info(f"Found {found} new activities on Zwift, transferring the {max_activities} oldest")
+        else:
+            self.logger.info(f"Found {found} new activities on Zwift")
+        return list(oldest)
+
+    def iter_activities(self, skip: Optional[Callable[[Dict[str, Any]], bool]] = None,
+                        page_size: int = 100) -> Iterator[Dict[str, Any]]:
+        """Iterate over the whole activity history.
+
+        Pages are requested lazily as the iteration goes, so a long history
+        is never held in memory at once.
+
+        Args:
+            skip: Callable telling whether to leave out an activity, e.g. an
+                already synced one
+            page_size: Number of activities requested per page
+
+        Yields:
+            Activity dictionaries, most recent first
+
+        Raises:
+            RuntimeError: If not authenticated
+        """
+        if not self.client:
+            raise RuntimeError("Must authenticate before downloading activities")
+
+        activities = self.client.get_profile().iter_activities(page_size=page_size, max_page_size=page_size)
+        try:
+            for activity in activities:
+                if skip is None or not skip(activity):
+                    yield activity
+        finally:
+            activities.close()
+
+    @staticmethod
+    def activity_file_name(activity: Dict[str, Any]) -> str:
+        """Build the .fit file name used for an activity.
+
+        Args:
+            activity: Activity dictionary from the Zwift API
+
+        Returns:
+            File name for the activity's FIT file
+        """
+        return f"zwift_activity_{activity['id']}.fit"
+
+    @staticmethod
+    def activity_start_time(activity: Dict[str, Any]) -> Optional[datetime]:
+        """Get when an activity started.
+
+        Args:
+            activity: Activity dictionary from the Zwift API
+
+        Returns:
+            Timezone-aware start time, or None if the activity has none
+        """
+        try:
+            return datetime.strptime(activity["startDate"], "%Y-%m-%dT%H:%M:%S.%f%z")
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def activity_download_url(activity: Dict[str, Any]) -> str:
+        """Build the S3 URL of an activity's .fit file.
+
+        Args:
+            activity: Activity dictionary with fitFileBucket and fitFileKey
+
+        Returns:
+            Download URL of the FIT file
+        """
+        return f"https://{activity['fitFileBucket']}.s3.amazonaws.com/{activity['fitFileKey']}"
+
+    def download_activity_bytes(self, activity: Dict[str, Any],
+                                progress: Optional[Callable[[DownloadProgress], None]] = None) -> bytes:
+        """Downloads an activity's .fit file from Zwift into memory.
+
+        Args:
+            activity: Activity dictionary with fitFileBucket and fitFileKey
+            progress: Callback receiving the download progress after every chunk
+
+        Returns:
+            Raw contents of the .fit file
+
+        Raises:
+            RuntimeError: If download fails
+        """
+        cached = self._get_cached_activity(activity)
+        if cached is not None:
+            return cached
 
-        link = f"https://{last_activity['fitFileBucket']}.s3.amazonaws.com/{last_activity['fitFileKey']}"
+        link = self.activity_download_url(activity)
+        self.logger.info(f"Downloading activity {activity['id']}...")
         self.logger.info(f"Download link: {link}")
 
         try:
-            response = requests.get(link, timeout=10)
-            response.raise_for_status()
-        except requests.RequestException as e:
+            data = self.downloader.download_bytes(link, progress)
+        except ZwiftDownloadError as e:
             raise RuntimeError(f"Failed to download activity: {e}") from e
 
+        if self.fit_cache:
+            self.fit_cache.put(FitFileCache.download_key(activity), data)
+        return data
+
+    def download_activity_file(self, activity: Dict[str, Any], path: str,
+                               progress: Optional[Callable[[DownloadProgress], None]] = None) -> str:
+        """Streams an activity's .fit file from Zwift to disk.
+
+        Memory use does not depend on the file size, and a download interrupted
+        in a previous call is resumed from its partial file.
+
+        Args:
+            activity: Activity dictionary with fitFileBucket and fitFileKey
+            path: Destination path of the .fit file
+            progress: Callback receiving the download progress after every chunk
+
+        Returns:
+            The destination path
+
+        Raises:
+            RuntimeError: If download fails
+        """
+        cached = self._get_cached_activity(activity)
+        if cached is not None:
+            with open(path, "wb") as file:
+                file.write(cached)
+            return path
+
+        link = self.activity_download_url(activity)
+        self.logger.info(f"Downloading activity {activity['id']}...")
+        self.logger.info(f"Download link: {link}")
+
+        try:
+            self.downloader.download_to_file(link, path, progress)
+        except ZwiftDownloadError as e:
+            raise RuntimeError(f"Failed to download activity: {e}") from e
+
+        if self.fit_cache:
+            self.fit_cache.put_file(FitFileCache.download_key(activity), path)
+        return path
+
+    def _get_cached_activity(self, activity: Dict[str, Any]) -> Optional[bytes]:
+        """Get an activity's .fit file from the local cache, if configured."""
+        if not self.fit_cache:
+            return None
+
+        data = self.fit_cache.get(FitFileCache.download_key(activity))
+        if data is not None:
+            self.logger.info(f"Using cached FIT file for activity {activity['id']}")
+        return data
+
+    def download_activities(self, activities: Iterable[Dict[str, Any]], max_workers: int = 4,
+                            max_in_flight_bytes: int = 64 * 1024 * 1024) -> Iterator[ActivityDownload]:
+        """Download several activities' .fit files concurrently.
+
+        Downloads share the service's pooled session. Results are yielded as
+        downloads complete, not in input order, and a failed download is
+        reported in its result's error instead of stopping the others. New
+        downloads only start while the bytes received but not yet handed to
+        the caller stay below max_in_flight_bytes, so a slow consumer bounds
+        memory use.
+
+        Args:
+            activities: Activity dictionaries with fitFileBucket and fitFileKey
+            max_workers: Maximum number of concurrent downloads
+            max_in_flight_bytes: Byte budget above which no new download starts
+
+        Yields:
+            An ActivityDownload per activity, in completion order
+        """
+        pending = enumerate(activities)
+        futures: Dict[Future, Tuple[int, Dict[str, Any]]] = {}
+        # Bytes received so far by each download that was not handed out yet
+        received: Dict[int, int] = {}
+        received_lock = threading.Lock()
+
+        def download(index: int, activity: Dict[str, Any]) -> bytes:
+            def track(progress: DownloadProgress) -> None:
+                with received_lock:
+                    received[index] = progress.received
+            return self.download_activity_bytes(activity, progress=track)
+
+        def in_flight_bytes() -> int:
+            with received_lock:
+                return sum(received.values())
+
+        def fill() -> None:
+            while len(futures) < max_workers and (not futures or in_flight_bytes() < max_in_flight_bytes):
+                item = next(pending, None)
+                if item is None:
+                    return
+                futures[executor.submit(download, *item)] = item
+
+        executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="zwift-download")
+        try:
+            fill()
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index, activity = futures.pop(future)
+                    try:
+                        result = ActivityDownload(activity, future.result(), None)
+                    except Exception as e:
+                        # Also covers malformed activities and cache or rate limiter database errors
+                        self.logger.error(f"Failed to download activity {activity.get('id')}: {e}")
+                        result = ActivityDownload(activity, None, e)
+
+                    yield result
+                    with received_lock:
+                        received.pop(index, None)
+                fill()
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def download_last_activity(self) -> Optional[str]:
+        """Downloads the last activity's .fit file from Zwift.
+
+        Returns:
+            Path to downloaded .fit file, or None if no activities found
+
+        Raises:
+            RuntimeError: If not authenticated or download fails
+        """
+        last_activity = self.get_last_activity()
+        if not last_activity:
+            return None
+
         # Save the .fit file to a temporary location
         temp_dir = tempfile.gettempdir()
-        fit_file_path = os.path.join(temp_dir, f"zwift_activity_{activity_id}.fit")
-
-        with open(fit_file_path, "wb") as file:
-            file.write(response.content)
+        fit_file_path = os.path.join(temp_dir, self.activity_file_name(last_activity))
+        self.download_activity_file(last_activity, fit_file_path)
 
-        self.logger.info(f"Activity {activity_id} downloaded to {fit_file_path}")
+        self.logger.info(f"Activity {last_activity['id']} downloaded to {fit_file_path}")
         return fit_file_path
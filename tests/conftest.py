@@ -0,0 +1,76 @@
+"""Shared pytest fixtures."""
+
+import pytest
+from fit_tool.fit_file_builder import FitFileBuilder
+from fit_tool.profile.messages.device_info_message import DeviceInfoMessage
+from fit_tool.profile.messages.file_id_message import FileIdMessage
+from fit_tool.profile.messages.record_message import RecordMessage
+from fit_tool.profile.messages.session_message import SessionMessage
+from fit_tool.profile.profile_type import FileType, Manufacturer
+
+
+def build_fit_bytes(record_count: int = 5, with_session: bool = False, with_file_id_device: bool = True,
+                    with_device_info_device: bool = True) -> bytes:
+    """Build a small Zwift-like activity FIT file, optionally ending with a session.
+
+    Without with_file_id_device (with_device_info_device) the FileId
+    (DeviceInfo) message has no device fields, so it cannot be patched in place.
+    """
+    builder = FitFileBuilder(auto_define=True)
+
+    file_id = FileIdMessage()
+    file_id.type = FileType.ACTIVITY
+    if with_file_id_device:
+        file_id.manufacturer = Manufacturer.ZWIFT.value
+        file_id.product = 1
+    file_id.time_created = 1600000000000
+    builder.add(file_id)
+
+    device_info = DeviceInfoMessage()
+    device_info.timestamp = 1600000000000
+    if with_device_info_device:
+        device_info.manufacturer = Manufacturer.ZWIFT.value
+        device_info.product = 2
+        device_info.software_version = 1.5
+    builder.add(device_info)
+
+    for i in range(record_count):
+        record = RecordMessage()
+        record.timestamp = 1600000000000 + i * 1000
+        record.heart_rate = 100 + i
+        record.power = 200 + i
+        builder.add(record)
+
+    if with_session:
+        session = SessionMessage()
+        session.timestamp = 1600000000000 + record_count * 1000
+        session.start_time = 1600000000000
+        session.total_elapsed_time = 3600.0
+        session.total_distance = 30000.0
+        builder.add(session)
+
+    return builder.build().to_bytes()
+
+
+@pytest.fixture
+def fit_bytes():
+    """Raw bytes of a valid activity FIT file."""
+    return build_fit_bytes()
+
+
+@pytest.fixture
+def fit_bytes_without_file_id_device():
+    """Raw bytes of a valid activity FIT file whose FileId has no device fields."""
+    return build_fit_bytes(with_file_id_device=False)
+
+
+@pytest.fixture
+def fit_bytes_without_device_info_device():
+    """Raw bytes of a valid activity FIT file whose DeviceInfo has no device fields."""
+    return build_fit_bytes(with_device_info_device=False)
+
+
+@pytest.fixture
+def fit_bytes_with_session():
+    """Raw bytes of a valid activity FIT file with a session message."""
+    return build_fit_bytes(with_session=True)
@@ -1,11 +1,17 @@
 """Tests for ActivityProcessor."""
 
 import pytest
-from unittest.mock import Mock
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from unittest.mock import Mock, patch
 from services.activity_processor import ActivityProcessor
-from services.zwift_service import ZwiftService
+from services.zwift_service import ActivityDownload, ZwiftService
 from services.fit_file_service import FitFileService
-from services.garmin_service import GarminService
+from services.garmin_service import GarminDuplicateActivityError, GarminService, UploadResult
+from services.sync_state import SyncStateStore
+from services.garmin_index import GarminActivityIndex
+from services.fit import ActivitySummary
 
 
 class TestActivityProcessor:
@@ -85,9 +91,8 @@ class TestActivityProcessor:
         zwift_service.authenticate.assert_called_once()
         zwift_service.download_last_activity.assert_called_once()
 
-        # Verify other services are not called
+        # Verify other services are not called (the Garmin login overlaps the Zwift steps)
         fit_file_service.modify_device_info.assert_not_called()
-        garmin_service.authenticate.assert_not_called()
         garmin_service.upload_activity.assert_not_called()
 
     def test_process_latest_activity_zwift_auth_failure(self, activity_processor, mock_services):
@@ -208,3 +213,702 @@ class TestActivityProcessor:
         assert fit_file_service.cleanup_file.call_count == 2
         fit_file_service.cleanup_file.assert_any_call(original_file_path)
         fit_file_service.cleanup_file.assert_any_call(modified_file_path)
+
+    def test_process_latest_activity_in_memory_success(self, activity_processor, mock_services):
+        """Test successful in-memory activity processing."""
+        # Given
+        zwift_service, fit_file_service, garmin_service = mock_services
+
+        activity = {"id": "12345"}
+        zwift_service.get_last_activity.return_value = activity
+        zwift_service.download_activity_bytes.return_value = b"original"
+        zwift_service.activity_file_name.return_value = "zwift_activity_12345.fit"
+        fit_file_service.modify_device_info_bytes.return_value = b"modified"
+        garmin_service.upload_activity_bytes.return_value = {"status": "success"}
+
+        # When
+        result = activity_processor.process_latest_activity(in_memory=True)
+
+        # Then
+        assert result is True
+        zwift_service.download_activity_bytes.assert_called_once_with(activity)
+        fit_file_service.modify_device_info_bytes.assert_called_once_with(b"original")
+        garmin_service.authenticate.assert_called_once()
+        garmin_service.upload_activity_bytes.assert_called_once_with(b"modified", "zwift_activity_12345.fit")
+
+        # Verify no temporary files are involved
+        zwift_service.download_last_activity.assert_not_called()
+        fit_file_service.cleanup_file.assert_not_called()
+
+    def test_process_latest_activity_in_memory_no_activities(self, activity_processor, mock_services):
+        """Test in-memory processing when no activities are found."""
+        # Given
+        zwift_service, fit_file_service, garmin_service = mock_services
+        zwift_service.get_last_activity.return_value = None
+
+        # When
+        result = activity_processor.process_latest_activity(in_memory=True)
+
+        # Then
+        assert result is False
+        zwift_service.download_activity_bytes.assert_not_called()
+        garmin_service.upload_activity_bytes.assert_not_called()
+
+    def test_process_latest_activity_in_memory_upload_failure(self, activity_processor, mock_services):
+        """Test in-memory processing failure during upload."""
+        # Given
+        zwift_service, fit_file_service, garmin_service = mock_services
+        zwift_service.get_last_activity.return_value = {"id": "12345"}
+        garmin_service.upload_activity_bytes.side_effect = Exception("Upload failed")
+
+        # When
+        result = activity_processor.process_latest_activity(in_memory=True)
+
+        # Then
+        assert result is False
+
+    @pytest.fixture
+    def state_store(self):
+        """Create an in-memory SyncStateStore."""
+        store = SyncStateStore(":memory:")
+        yield store
+        store.close()
+
+    @pytest.fixture
+    def sync_processor(self, mock_services, state_store):
+        """Create an ActivityProcessor with a state store."""
+        zwift_service, fit_file_service, garmin_service = mock_services
+        zwift_service.activity_file_name.side_effect = lambda a: f"zwift_activity_{a['id']}.fit"
+        return ActivityProcessor(zwift_service, fit_file_service, garmin_service, state_store)
+
+    def test_process_new_activities_requires_state_store(self, activity_processor):
+        """Test that the sync mode needs a state store."""
+        with pytest.raises(RuntimeError, match="state store is required"):
+            activity_processor.process_new_activities()
+
+    def test_process_new_activities_oldest_first(self, sync_processor, mock_services, state_store):
+        """Test that new activities are transferred oldest first and recorded."""
+        # Given
+        zwift_service, fit_file_service, garmin_service = mock_services
+        zwift_service.get_new_activities.return_value = [{"id": 2}, {"id": 1}]
+        zwift_service.download_activity_bytes.side_effect = lambda a: f"data{a['id']}".encode()
+        fit_file_service.modify_device_info_bytes.side_effect = lambda data: data + b"!"
+        garmin_service.upload_activity_bytes.return_value = {
+            "detailedImportResult": {"successes": [{"internalId": 555}]}
+        }
+
+        # When
+        result = sync_processor.process_new_activities()
+
+        # Then
+        assert result is True
+        garmin_service.authenticate.assert_called_once()
+        uploads = [call.args for call in garmin_service.upload_activity_bytes.call_args_list]
+        assert uploads == [(b"data1!", "zwift_activity_1.fit"), (b"data2!", "zwift_activity_2.fit")]
+        assert state_store.is_synced(1) and state_store.is_synced(2)
+        assert state_store.get(2)["garmin_activity_id"] == "555"
+
+    def test_process_new_activities_uses_watermark(self, sync_processor, mock_services, state_store):
+        """Test that already synced activities are reported to the paging logic."""
+        # Given
+        zwift_service, _, _ = mock_services
+        state_store.mark_uploaded({"id": 1})
+        zwift_service.get_new_activities.return_value = []
+
+        # When
+        result = sync_processor.process_new_activities(max_activities=5)
+
+        # Then
+        assert result is True
+        is_synced = zwift_service.get_new_activities.call_args.args[0]
+        assert is_synced({"id": 1}) is True
+        assert is_synced({"id": 2}) is False
+        assert zwift_service.get_new_activities.call_args.kwargs == {"max_activities": 5, "max_scanned": 500}
+
+    def test_process_new_activities_nothing_new(self, sync_processor, mock_services):
+        """Test that nothing is uploaded when there are no new activities."""
+        # Given
+        zwift_service, _, garmin_service = mock_services
+        zwift_service.get_new_activities.return_value = []
+
+        # When
+        result = sync_processor.process_new_activities()
+
+        # Then
+        assert result is True
+        garmin_service.authenticate.assert_not_called()
+        garmin_service.upload_activity_bytes.assert_not_called()
+
+    def test_process_new_activities_catches_up_beyond_max(self, mock_services, state_store):
+        """Test that a backlog larger than max_activities is transferred over several runs without gaps."""
+        # Given
+        _, fit_file_service, garmin_service = mock_services
+        history = [{"id": i} for i in range(100, 0, -1)]
+        for activity in history[12:]:
+            state_store.mark_uploaded(activity)
+
+        def iter_activities(page_size, stop):
+            for activity in history:
+                if stop(activity):
+                    return
+                yield activity
+
+        zwift_service = ZwiftService("zwift_user", "zwift_pass")
+        zwift_service.client = Mock()
+        zwift_service.client.get_profile.return_value.iter_activities.side_effect = iter_activities
+        zwift_service.authenticate = Mock()
+        zwift_service.download_activity_bytes = Mock(side_effect=lambda a: f"data{a['id']}".encode())
+        fit_file_service.modify_device_info_bytes.side_effect = lambda data: data
+        garmin_service.upload_activity_bytes.return_value = {}
+        processor = ActivityProcessor(zwift_service, fit_file_service, garmin_service, state_store)
+
+        # When
+        processor.process_new_activities(max_activities=10)
+        first_run = [call.args[1] for call in garmin_service.upload_activity_bytes.call_args_list]
+        processor.process_new_activities(max_activities=10)
+
+        # Then
+        assert first_run == [f"zwift_activity_{i}.fit" for i in range(89, 99)]
+        assert processor.last_new_activities == 2
+        assert all(state_store.is_synced(activity["id"]) for activity in history)
+
+    def test_process_new_activities_starts_from_latest_when_nothing_synced(self, mock_services, state_store):
+        """Test that the first run transfers the latest activities instead of paging the whole history."""
+        # Given
+        _, fit_file_service, garmin_service = mock_services
+        history = [{"id": i} for i in range(100, 0, -1)]
+        scanned = []
+
+        def iter_activities(page_size, stop):
+            for activity in history:
+                if stop(activity):
+                    return
+                scanned.append(activity)
+                yield activity
+
+        zwift_service = ZwiftService("zwift_user", "zwift_pass")
+        zwift_service.client = Mock()
+        zwift_service.client.get_profile.return_value.iter_activities.side_effect = iter_activities
+        zwift_service.authenticate = Mock()
+        zwift_service.download_activity_bytes = Mock(side_effect=lambda a: f"data{a['id']}".encode())
+        fit_file_service.modify_device_info_bytes.side_effect = lambda data: data
+        garmin_service.upload_activity_bytes.return_value = {}
+        processor = ActivityProcessor(zwift_service, fit_file_service, garmin_service, state_store,
+                                      initial_activities=2)
+
+        # When
+        processor.process_new_activities()
+        first_run = [call.args[1] for call in garmin_service.upload_activity_bytes.call_args_list]
+        history.insert(0, {"id": 101})
+        processor.process_new_activities()
+
+        # Then
+        assert first_run == ["zwift_activity_99.fit", "zwift_activity_100.fit"]
+        assert len(scanned) <= 4
+        garmin_service.upload_activity_bytes.assert_called_with(b"data101", "zwift_activity_101.fit")
+        assert not state_store.is_synced(98)
+
+    def test_process_new_activities_records_garmin_duplicates(self, sync_processor, mock_services, state_store):
+        """Test that an upload rejected as a duplicate counts as synced and the run goes on."""
+        # Given
+        zwift_service, _, garmin_service = mock_services
+        zwift_service.get_new_activities.return_value = [{"id": 2}, {"id": 1}]
+        garmin_service.upload_activity_bytes.side_effect = [GarminDuplicateActivityError("API Error 409"), {}]
+
+        # When
+        result = sync_processor.process_new_activities()
+
+        # Then
+        assert result is True
+        assert state_store.is_synced(1)
+        assert state_store.is_synced(2)
+
+    def test_process_new_activities_stops_on_failure(self, sync_processor, mock_services, state_store):
+        """Test that a failure stops the run and is recorded."""
+        # Given
+        zwift_service, _, garmin_service = mock_services
+        zwift_service.get_new_activities.return_value = [{"id": 2}, {"id": 1}]
+        garmin_service.upload_activity_bytes.side_effect = Exception("Upload failed")
+
+        # When
+        result = sync_processor.process_new_activities()
+
+        # Then
+        assert result is False
+        assert garmin_service.upload_activity_bytes.call_count == 1
+        assert state_store.get(1)["status"] == SyncStateStore.STATUS_FAILED
+        assert state_store.get(2) is None
+
+    def test_process_new_activities_zwift_failure(self, sync_processor, mock_services):
+        """Test that a Zwift failure is reported as unsuccessful."""
+        # Given
+        zwift_service, _, _ = mock_services
+        zwift_service.authenticate.side_effect = Exception("Zwift auth failed")
+
+        # When & Then
+        assert sync_processor.process_new_activities() is False
+
+    @pytest.fixture
+    def garmin_index(self):
+        """Create an in-memory GarminActivityIndex."""
+        index = GarminActivityIndex()
+        yield index
+        index.close()
+
+    @pytest.fixture
+    def indexed_processor(self, mock_services, state_store, garmin_index):
+        """Create an ActivityProcessor with a state store and a Garmin activity index."""
+        zwift_service, fit_file_service, garmin_service = mock_services
+        zwift_service.activity_file_name.side_effect = lambda a: f"zwift_activity_{a['id']}.fit"
+        zwift_service.download_activity_bytes.side_effect = lambda a: f"data{a['id']}".encode()
+        fit_file_service.modify_device_info_bytes.side_effect = lambda data: data
+        fit_file_service.read_activity_summary.side_effect = lambda data: ActivitySummary(
+            datetime(2024, 1, int(data[-1:]), 10, 0, tzinfo=timezone.utc), 3600.0, 30000.0
+        )
+        return ActivityProcessor(zwift_service, fit_file_service, garmin_service, state_store, garmin_index)
+
+    def test_process_new_activities_skips_garmin_duplicates(self, indexed_processor, mock_services, state_store):
+        """Test that activities already on Garmin Connect are recorded without uploading."""
+        # Given
+        zwift_service, _, garmin_service = mock_services
+        zwift_service.get_new_activities.return_value = [{"id": 2}, {"id": 1}]
+        garmin_service.list_activities.return_value = [
+            {"activityId": 777, "startTimeGMT": "2024-01-01 10:00:05", "duration": 3601.0, "distance": 30010.0}
+        ]
+        garmin_service.upload_activity_bytes.return_value = {
+            "detailedImportResult": {"successes": [{"internalId": 555}]}
+        }
+
+        # When
+        result = indexed_processor.process_new_activities()
+
+        # Then
+        assert result is True
+        garmin_service.list_activities.assert_called_once()
+        garmin_service.upload_activity_bytes.assert_called_once_with(b"data2", "zwift_activity_2.fit")
+        assert state_store.get(1)["garmin_activity_id"] == "777"
+        assert state_store.get(2)["garmin_activity_id"] == "555"
+
+    def test_uploads_are_added_to_garmin_index(self, indexed_processor, mock_services, garmin_index):
+        """Test that an uploaded activity is indexed under its Garmin activity ID."""
+        # Given
+        zwift_service, _, garmin_service = mock_services
+        zwift_service.get_new_activities.return_value = [{"id": 3}]
+        garmin_service.list_activities.return_value = []
+        garmin_service.upload_activity_bytes.return_value = {
+            "detailedImportResult": {"successes": [{"internalId": 555}]}
+        }
+
+        # When
+        indexed_processor.process_new_activities()
+
+        # Then
+        summary = ActivitySummary(datetime(2024, 1, 3, 10, 0, tzinfo=timezone.utc), 3600.0, 30000.0)
+        assert garmin_index.find_duplicate(summary) == "555"
+
+    def test_garmin_listing_reaches_oldest_activity(self, indexed_processor, mock_services, state_store):
+        """Test that a duplicate older than the first page of the Garmin listing is still found."""
+        # Given
+        zwift_service, _, _ = mock_services
+        zwift_service.get_new_activities.return_value = [
+            {"id": 2, "startDate": "2024-01-02T10:00:00.000+0000"},
+            {"id": 1, "startDate": "2024-01-01T10:00:00.000+0000"},
+        ]
+        state_store.mark_uploaded({"id": 0})
+        newer = [{"activityId": 1000 + i, "startTimeGMT": f"2024-06-{i // 24 + 1:02d} {23 - i % 24:02d}:00:00"}
+                 for i in range(149)]
+        history = newer + [{"activityId": 777, "startTimeGMT": "2024-01-01 10:00:00"}]
+        garmin_service = GarminService("garmin_user", "garmin_pass")
+        garmin_service._authenticated = True
+        garmin_service.client = Mock()
+        garmin_service.client.get_activities.side_effect = lambda start, limit: history[start:start + limit]
+        garmin_service.client.client.post.return_value = {}
+        indexed_processor.garmin_service = garmin_service
+
+        # When
+        result = indexed_processor.process_new_activities()
+
+        # Then
+        assert result is True
+        assert garmin_service.client.get_activities.call_count == 2
+        assert state_store.get(1)["garmin_activity_id"] == "777"
+        garmin_service.client.client.post.assert_called_once()
+
+    def test_failed_garmin_listing_disables_duplicate_check(self, indexed_processor, mock_services, state_store):
+        """Test that activities are still uploaded when the Garmin listing fails."""
+        # Given
+        zwift_service, fit_file_service, garmin_service = mock_services
+        zwift_service.get_new_activities.return_value = [{"id": 1}]
+        garmin_service.list_activities.side_effect = RuntimeError("Listing activities failed")
+
+        # When
+        result = indexed_processor.process_new_activities()
+
+        # Then
+        assert result is True
+        garmin_service.upload_activity_bytes.assert_called_once()
+        fit_file_service.read_activity_summary.assert_not_called()
+        assert state_store.is_synced(1)
+
+    def test_watching_processor_refreshes_garmin_index(self, indexed_processor, mock_services, state_store):
+        """Test that each watch poll with new activities lists Garmin Connect again."""
+        # Given
+        zwift_service, _, garmin_service = mock_services
+        indexed_processor.keep_sessions = True
+        indexed_processor.lazy_garmin_auth = True
+        garmin_service.upload_activity_bytes.return_value = {
+            "detailedImportResult": {"successes": [{"internalId": 555}]}
+        }
+        garmin_service.list_activities.return_value = []
+        zwift_service.get_new_activities.return_value = [{"id": 1}]
+        indexed_processor.process_new_activities()
+        # Activity 2 is uploaded to Garmin Connect by hand between two polls
+        garmin_service.list_activities.return_value = [
+            {"activityId": 777, "startTimeGMT": "2024-01-02 10:00:00", "duration": 3600.0, "distance": 30000.0}
+        ]
+
+        # When
+        zwift_service.get_new_activities.return_value = [{"id": 2}]
+        indexed_processor.process_new_activities()
+        zwift_service.get_new_activities.return_value = []
+        indexed_processor.process_new_activities()
+
+        # Then
+        assert garmin_service.list_activities.call_count == 2
+        garmin_service.upload_activity_bytes.assert_called_once_with(b"data1", "zwift_activity_1.fit")
+        assert state_store.get(2)["garmin_activity_id"] == "777"
+
+    def test_process_latest_activity_in_memory_skips_garmin_duplicate(self, mock_services, garmin_index):
+        """Test that the latest activity is not uploaded again when already on Garmin Connect."""
+        # Given
+        zwift_service, fit_file_service, garmin_service = mock_services
+        zwift_service.get_last_activity.return_value = {"id": 1}
+        zwift_service.download_activity_bytes.return_value = b"data1"
+        fit_file_service.modify_device_info_bytes.return_value = b"data1"
+        fit_file_service.read_activity_summary.return_value = ActivitySummary(
+            datetime(2024, 1, 1, 10, 0, tzinfo=timezone.utc), None, None
+        )
+        garmin_service.list_activities.return_value = [
+            {"activityId": 777, "startTimeGMT": "2024-01-01 10:00:00", "duration": 3600.0, "distance": 30000.0}
+        ]
+        processor = ActivityProcessor(zwift_service, fit_file_service, garmin_service, garmin_index=garmin_index)
+
+        # When
+        result = processor.process_latest_activity(in_memory=True)
+
+        # Then
+        assert result is True
+        garmin_service.upload_activity_bytes.assert_not_called()
+
+    @pytest.fixture
+    def fit_executor(self):
+        """Create a thread pool standing in for the FIT process pool."""
+        executor = ThreadPoolExecutor(max_workers=2)
+        yield executor
+        executor.shutdown()
+
+    @pytest.fixture
+    def pipelined_processor(self, mock_services, state_store, fit_executor):
+        """Create an ActivityProcessor whose pipelined mode uses the thread pool for FIT work."""
+        zwift_service, fit_file_service, garmin_service = mock_services
+        zwift_service.activity_file_name.side_effect = lambda a: f"zwift_activity_{a['id']}.fit"
+        zwift_service.download_activity_bytes.side_effect = lambda a: f"data{a['id']}".encode()
+        fit_file_service.submit_modify_device_info_bytes.side_effect = (
+            lambda executor, data: executor.submit(lambda: data + b"!")
+        )
+        garmin_service.upload_activity_bytes.return_value = {}
+        return ActivityProcessor(zwift_service, fit_file_service, garmin_service, state_store,
+                                 fit_executor=fit_executor, pipeline_depth=2)
+
+    def test_process_new_activities_pipelined(self, pipelined_processor, mock_services, state_store):
+        """Test that the pipelined mode uploads every activity oldest first."""
+        # Given
+        zwift_service, _, garmin_service = mock_services
+        zwift_service.get_new_activities.return_value = [{"id": i} for i in range(5, 0, -1)]
+
+        # When
+        result = pipelined_processor.process_new_activities(pipeline=True)
+
+        # Then
+        assert result is True
+        uploads = [call.args for call in garmin_service.upload_activity_bytes.call_args_list]
+        assert uploads == [(f"data{i}!".encode(), f"zwift_activity_{i}.fit") for i in range(1, 6)]
+        assert all(state_store.is_synced(i) for i in range(1, 6))
+
+    def test_process_new_activities_pipelined_overlaps_stages(self, pipelined_processor, mock_services):
+        """Test that the next activity is downloaded while the current one uploads."""
+        # Given
+        zwift_service, _, garmin_service = mock_services
+        zwift_service.get_new_activities.return_value = [{"id": 2}, {"id": 1}]
+        second_downloaded = threading.Event()
+
+        def download(activity):
+            if activity["id"] == 2:
+                second_downloaded.set()
+            return b"data"
+
+        def upload(data, file_name):
+            if file_name == "zwift_activity_1.fit":
+                assert second_downloaded.wait(timeout=5)
+            return {}
+
+        zwift_service.download_activity_bytes.side_effect = download
+        garmin_service.upload_activity_bytes.side_effect = upload
+
+        # When & Then
+        assert pipelined_processor.process_new_activities(pipeline=True) is True
+
+    def test_process_new_activities_pipelined_stops_on_failure(self, pipelined_processor, mock_services,
+                                                               state_store):
+        """Test that a failed download stops the pipeline before later uploads."""
+        # Given
+        zwift_service, _, garmin_service = mock_services
+        zwift_service.get_new_activities.return_value = [{"id": 3}, {"id": 2}, {"id": 1}]
+
+        def download(activity):
+            if activity["id"] == 2:
+                raise RuntimeError("Failed to download activity")
+            return b"data"
+
+        zwift_service.download_activity_bytes.side_effect = download
+
+        # When
+        result = pipelined_processor.process_new_activities(pipeline=True)
+
+        # Then
+        assert result is False
+        assert garmin_service.upload_activity_bytes.call_count == 1
+        assert state_store.is_synced(1)
+        assert state_store.get(2)["status"] == SyncStateStore.STATUS_FAILED
+        assert state_store.get(3) is None
+
+    @patch('services.activity_processor.create_process_pool')
+    def test_process_new_activities_pipelined_creates_pool_before_threads(self, mock_create_process_pool,
+                                                                         pipelined_processor, mock_services,
+                                                                         fit_executor):
+        """Test that the default FIT process pool exists before the Garmin login thread starts."""
+        # Given
+        zwift_service, _, garmin_service = mock_services
+        zwift_service.get_new_activities.return_value = [{"id": 1}]
+        pool = Mock(wraps=fit_executor)
+        mock_create_process_pool.return_value = pool
+        garmin_service.authenticate.side_effect = lambda: mock_create_process_pool.assert_called_once()
+        pipelined_processor.fit_executor = None
+
+        # When
+        result = pipelined_processor.process_new_activities(pipeline=True)
+
+        # Then
+        assert result is True
+        garmin_service.authenticate.assert_called_once()
+        pool.shutdown.assert_called_once_with(wait=False, cancel_futures=True)
+
+    def test_process_latest_activity_overlaps_garmin_login(self, activity_processor, mock_services):
+        """Test that the Garmin login runs while the activity is fetched from Zwift."""
+        # Given
+        zwift_service, fit_file_service, garmin_service = mock_services
+        garmin_login_started = threading.Event()
+        garmin_service.authenticate.side_effect = lambda: garmin_login_started.set()
+
+        def get_last_activity():
+            assert garmin_login_started.wait(timeout=5)
+            return {"id": 1}
+
+        zwift_service.get_last_activity.side_effect = get_last_activity
+        zwift_service.download_activity_bytes.return_value = b"data"
+        fit_file_service.modify_device_info_bytes.return_value = b"modified"
+
+        # When
+        result = activity_processor.process_latest_activity(in_memory=True)
+
+        # Then
+        assert result is True
+        garmin_service.authenticate.assert_called_once()
+        garmin_service.upload_activity_bytes.assert_called_once()
+
+    def test_process_latest_activity_lazy_garmin_login(self, mock_services):
+        """Test that the lazy mode only logs in to Garmin when uploading."""
+        # Given
+        zwift_service, fit_file_service, garmin_service = mock_services
+        processor = ActivityProcessor(zwift_service, fit_file_service, garmin_service, lazy_garmin_auth=True)
+        zwift_service.get_last_activity.return_value = None
+
+        # When
+        result = processor.process_latest_activity(in_memory=True)
+
+        # Then
+        assert result is False
+        garmin_service.authenticate.assert_not_called()
+        garmin_service.ensure_authenticated.assert_not_called()
+
+    def test_process_new_activities_lazy_garmin_login(self, mock_services, state_store):
+        """Test that the lazy mode logs in to Garmin once before the first upload."""
+        # Given
+        zwift_service, fit_file_service, garmin_service = mock_services
+        processor = ActivityProcessor(zwift_service, fit_file_service, garmin_service, state_store,
+                                      lazy_garmin_auth=True)
+        zwift_service.get_new_activities.return_value = [{"id": 2}, {"id": 1}]
+        garmin_service.upload_activity_bytes.return_value = {}
+
+        # When
+        result = processor.process_new_activities()
+
+        # Then
+        assert result is True
+        garmin_service.authenticate.assert_not_called()
+        assert garmin_service.ensure_authenticated.call_count == 2
+        assert garmin_service.upload_activity_bytes.call_count == 2
+
+    def test_process_new_activities_garmin_login_failure(self, sync_processor, mock_services, state_store):
+        """Test that a failed Garmin login fails the run without recording the activity."""
+        # Given
+        zwift_service, _, garmin_service = mock_services
+        zwift_service.get_new_activities.return_value = [{"id": 1}]
+        garmin_service.authenticate.side_effect = RuntimeError("Authentication failed")
+
+        # When
+        result = sync_processor.process_new_activities()
+
+        # Then
+        assert result is False
+        garmin_service.upload_activity_bytes.assert_not_called()
+        assert state_store.get(1) is None
+
+    def test_process_new_activities_keeps_sessions(self, mock_services, state_store):
+        """Test that a processor keeping its sessions does not log in again on every run."""
+        # Given
+        zwift_service, fit_file_service, garmin_service = mock_services
+        processor = ActivityProcessor(zwift_service, fit_file_service, garmin_service, state_store,
+                                      keep_sessions=True)
+        zwift_service.get_new_activities.side_effect = [[{"id": 1}], []]
+        garmin_service.upload_activity_bytes.return_value = {}
+
+        # When
+        processor.process_new_activities()
+        first_run_new = processor.last_new_activities
+        processor.process_new_activities()
+
+        # Then
+        assert (first_run_new, processor.last_new_activities) == (1, 0)
+        zwift_service.authenticate.assert_not_called()
+        assert zwift_service.ensure_authenticated.call_count == 2
+        garmin_service.authenticate.assert_not_called()
+        garmin_service.ensure_authenticated.assert_called_once()
+
+    @pytest.fixture
+    def backfill_processor(self, mock_services, state_store, fit_executor):
+        """Create an ActivityProcessor whose backfill downloads and uploads through fake batch APIs."""
+        zwift_service, fit_file_service, garmin_service = mock_services
+        zwift_service.activity_file_name.side_effect = lambda a: f"zwift_activity_{a['id']}.fit"
+
+        def iter_activities(skip=None):
+            return (a for a in [{"id": i} for i in range(5, 0, -1)] if not skip(a))
+
+        def download_activities(activities, max_workers):
+            for activity in activities:
+                if activity["id"] == 4:
+                    yield ActivityDownload(activity, None, RuntimeError("Failed to download activity"))
+                else:
+                    yield ActivityDownload(activity, f"data{activity['id']}".encode(), None)
+
+        def upload_many(uploads, max_workers):
+            for index, (data, file_name) in enumerate(uploads):
+                if file_name == "zwift_activity_2.fit":
+                    yield UploadResult(index, file_name, None, RuntimeError("Upload failed"), 1)
+                else:
+                    yield UploadResult(index, file_name, {"detailedImportResult": {"successes": [
+                        {"internalId": int(data[4:5]) * 100}
+                    ]}}, None, 1)
+
+        zwift_service.iter_activities.side_effect = iter_activities
+        zwift_service.download_activities.side_effect = download_activities
+        fit_file_service.submit_modify_device_info_bytes.side_effect = (
+            lambda executor, data: executor.submit(lambda: data + b"!")
+        )
+        garmin_service.upload_many.side_effect = upload_many
+        return ActivityProcessor(zwift_service, fit_file_service, garmin_service, state_store,
+                                 fit_executor=fit_executor)
+
+    def test_backfill_checkpoints_every_activity(self, backfill_processor, mock_services, state_store):
+        """Test that a backfill records each activity's outcome and keeps going after failures."""
+        # Given
+        _, _, garmin_service = mock_services
+        state_store.mark_uploaded({"id": 3}, 300)
+
+        # When
+        result = backfill_processor.backfill(workers=2)
+
+        # Then
+        assert result is False
+        assert state_store.get(5)["garmin_activity_id"] == "500"
+        assert state_store.get(1)["garmin_activity_id"] == "100"
+        assert state_store.get(4)["status"] == SyncStateStore.STATUS_FAILED
+        assert state_store.get(2)["status"] == SyncStateStore.STATUS_FAILED
+        assert garmin_service.upload_many.call_args.kwargs == {"max_workers": 2}
+        stats = backfill_processor.last_backfill
+        assert (stats.transferred, stats.failed, stats.skipped) == (2, 2, 1)
+        assert stats.bytes_downloaded == len(b"data5") * 3
+
+    def test_backfill_resumes_after_interruption(self, backfill_processor):
+        """Test that a rerun only transfers the activities left by the previous run."""
+        # Given
+        backfill_processor.backfill()
+
+        # When
+        backfill_processor.backfill()
+
+        # Then
+        stats = backfill_processor.last_backfill
+        assert (stats.transferred, stats.failed, stats.skipped) == (0, 2, 3)
+
+    def test_backfill_skips_garmin_duplicates(self, backfill_processor, mock_services, state_store, garmin_index):
+        """Test that a backfill records activities already on Garmin Connect without uploading them."""
+        # Given
+        _, fit_file_service, garmin_service = mock_services
+        backfill_processor.garmin_index = garmin_index
+        garmin_service.list_activities.return_value = [
+            {"activityId": 777, "startTimeGMT": "2024-01-05 10:00:00", "duration": 3600.0, "distance": 30000.0}
+        ]
+        fit_file_service.read_activity_summary.side_effect = lambda data: ActivitySummary(
+            datetime(2024, 1, int(data[4:5]), 10, 0, tzinfo=timezone.utc), 3600.0, 30000.0
+        )
+
+        # When
+        backfill_processor.backfill()
+
+        # Then
+        assert state_store.get(5)["garmin_activity_id"] == "777"
+        assert backfill_processor.last_backfill.duplicates == 1
+        assert backfill_processor.last_backfill.transferred == 3
+
+    def test_backfill_records_rejected_duplicates(self, backfill_processor, mock_services, state_store):
+        """Test that uploads Garmin Connect rejects as duplicates count as synced, not failed."""
+        # Given
+        _, _, garmin_service = mock_services
+        garmin_service.upload_many.side_effect = lambda uploads, max_workers: (
+            UploadResult(index, file_name, None, None, 1, duplicate=True)
+            for index, (data, file_name) in enumerate(uploads)
+        )
+
+        # When
+        result = backfill_processor.backfill()
+
+        # Then
+        assert result is False
+        assert all(state_store.is_synced(i) for i in (5, 3, 2, 1))
+        stats = backfill_processor.last_backfill
+        assert (stats.transferred, stats.duplicates, stats.failed) == (4, 4, 1)
+
+    def test_backfill_zwift_failure(self, backfill_processor, mock_services):
+        """Test that a backfill reports a failed Zwift login."""
+        # Given
+        zwift_service, _, _ = mock_services
+        zwift_service.authenticate.side_effect = Exception("Zwift auth failed")
+
+        # When & Then
+        assert backfill_processor.backfill() is False
+
+    def test_backfill_requires_state_store(self, activity_processor):
+        """Test that backfilling needs a state store."""
+        with pytest.raises(RuntimeError, match="state store is required"):
+            activity_processor.backfill()
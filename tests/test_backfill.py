@@ -0,0 +1,61 @@
+"""Tests for BackfillStats."""
+
+from services.backfill import BackfillStats
+
+
+class FakeClock:
+    """Clock advanced by hand."""
+
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestBackfillStats:
+    """Test cases for BackfillStats."""
+
+    def test_throughput(self):
+        """Test activities/min and MB/s over the elapsed time."""
+        # Given
+        clock = FakeClock()
+        stats = BackfillStats(clock)
+        stats.transferred = 8
+        stats.failed = 2
+        stats.bytes_downloaded = 30_000_000
+
+        # When
+        clock.now += 60
+
+        # Then
+        assert stats.processed == 10
+        assert stats.activities_per_minute == 10.0
+        assert stats.megabytes_per_second == 0.5
+
+    def test_report(self):
+        """Test the one-line progress report."""
+        # Given
+        clock = FakeClock()
+        stats = BackfillStats(clock)
+        stats.transferred = 3
+        stats.duplicates = 1
+        stats.skipped = 4
+        stats.bytes_downloaded = 1_500_000
+        clock.now += 30
+
+        # When
+        report = str(stats)
+
+        # Then
+        assert report == ("3 transferred (1 already on Garmin Connect), 0 failed, 4 already synced in 30s - "
+                          "6.0 activities/min, 0.05 MB/s")
+
+    def test_no_division_by_zero(self):
+        """Test that rates are zero right after the start."""
+        # Given
+        stats = BackfillStats(FakeClock())
+
+        # When & Then
+        assert stats.activities_per_minute == 0.0
+        assert stats.megabytes_per_second == 0.0
@@ -0,0 +1,209 @@
+"""Tests for the multi-account batch runner."""
+
+import json
+import os
+import tempfile
+import pytest
+from concurrent.futures import Future, ThreadPoolExecutor
+from unittest.mock import Mock, patch
+from services.batch import (
+    AccountConfig, AccountResult, BatchOptions, BatchRunner, account_dir, format_summary, load_accounts,
+    sync_account,
+)
+
+
+def account_entry(name, **overrides):
+    """Build an account entry of a config file."""
+    entry = {
+        "name": name,
+        "zwift_username": f"{name}@zwift",
+        "zwift_password": "zwift_pass",
+        "garmin_username": f"{name}@garmin",
+        "garmin_password": "garmin_pass",
+    }
+    entry.update(overrides)
+    return entry
+
+
+def write_config(tmp_path, config):
+    """Write an accounts config file and return its path."""
+    path = tmp_path / "accounts.json"
+    path.write_text(json.dumps(config))
+    return str(path)
+
+
+class TestLoadAccounts:
+    """Test cases for load_accounts."""
+
+    def test_load_accounts(self, tmp_path):
+        """Test loading a list of accounts."""
+        # Given
+        path = write_config(tmp_path, [account_entry("alice"), account_entry("bob")])
+
+        # When
+        accounts = load_accounts(path)
+
+        # Then
+        assert [account.name for account in accounts] == ["alice", "bob"]
+        assert accounts[0] == AccountConfig("alice", "alice@zwift", "zwift_pass", "alice@garmin", "garmin_pass")
+
+    @patch.dict(os.environ, {"BOB_GARMIN_PASSWORD": "secret"})
+    def test_load_accounts_from_environment(self, tmp_path):
+        """Test that a credential can be read from the environment variable it names."""
+        # Given
+        entry = account_entry("bob", garmin_password_env="BOB_GARMIN_PASSWORD")
+        del entry["garmin_password"]
+        path = write_config(tmp_path, {"accounts": [entry]})
+
+        # When
+        accounts = load_accounts(path)
+
+        # Then
+        assert accounts[0].garmin_password == "secret"
+
+    def test_load_accounts_missing_credential(self, tmp_path):
+        """Test that an account without a credential is rejected."""
+        # Given
+        entry = account_entry("alice")
+        del entry["zwift_password"]
+        path = write_config(tmp_path, [entry])
+
+        # When & Then
+        with pytest.raises(ValueError, match="'alice' is missing zwift_password"):
+            load_accounts(path)
+
+    def test_load_accounts_duplicate_name(self, tmp_path):
+        """Test that account names must be unique."""
+        # Given
+        path = write_config(tmp_path, [account_entry("alice"), account_entry("alice")])
+
+        # When & Then
+        with pytest.raises(ValueError, match="used more than once"):
+            load_accounts(path)
+
+    def test_load_accounts_invalid_file(self, tmp_path):
+        """Test that unreadable and empty configs are rejected."""
+        with pytest.raises(ValueError, match="Cannot read accounts config"):
+            load_accounts(str(tmp_path / "missing.json"))
+        with pytest.raises(ValueError, match="has no accounts"):
+            load_accounts(write_config(tmp_path, []))
+
+
+class TestSyncAccount:
+    """Test cases for sync_account."""
+
+    @pytest.fixture
+    def account(self):
+        """Create an account."""
+        return AccountConfig("alice/main", "alice@zwift", "zwift_pass", "alice@garmin", "garmin_pass")
+
+    @patch('services.batch.ActivityProcessor')
+    @patch('services.batch.GarminService')
+    @patch('services.batch.FitFileService')
+    @patch('services.batch.ZwiftService')
+    def test_sync_account_isolates_files(self, mock_zwift_service, mock_fit_service, mock_garmin_service,
+                                         mock_processor, account, tmp_path):
+        """Test that tokens, state and temp files are kept in the account's directory."""
+        # Given
+        mock_garmin_service.TOKEN_FILE_NAME = "garmin_tokens.json"
+        mock_processor.return_value.process_new_activities.return_value = True
+        mock_processor.return_value.last_new_activities = 3
+        options = BatchOptions(work_dir=str(tmp_path), max_activities=5, pipeline=True)
+        seen_tempdirs = []
+        mock_processor.return_value.process_new_activities.side_effect = \
+            lambda *args, **kwargs: seen_tempdirs.append(tempfile.gettempdir()) or True
+        previous_tempdir = tempfile.tempdir
+
+        # When
+        result = sync_account(account, options)
+
+        # Then
+        directory = account_dir(str(tmp_path), account.name)
+        assert directory == str(tmp_path / "alice_main")
+        assert result.success is True
+        assert result.new_activities == 3
+        assert result.error is None
+        assert seen_tempdirs == [os.path.join(directory, "tmp")]
+        assert tempfile.tempdir == previous_tempdir
+        assert mock_zwift_service.call_args.kwargs["token_cache"].path == os.path.join(directory, "zwift_tokens.json")
+        assert mock_garmin_service.call_args.kwargs["token_store"] == os.path.join(directory, "garmin_tokens.json")
+        assert os.path.exists(os.path.join(directory, "sync_state.db"))
+        mock_processor.return_value.process_new_activities.assert_called_once_with(5, pipeline=True)
+
+    @patch('services.batch.ActivityProcessor')
+    @patch('services.batch.GarminService')
+    @patch('services.batch.FitFileService')
+    @patch('services.batch.ZwiftService')
+    def test_sync_account_returns_errors(self, mock_zwift_service, mock_fit_service, mock_garmin_service,
+                                         mock_processor, account, tmp_path):
+        """Test that a failure is reported in the result instead of raised."""
+        # Given
+        mock_garmin_service.TOKEN_FILE_NAME = "garmin_tokens.json"
+        mock_processor.return_value.process_new_activities.side_effect = RuntimeError("Zwift is down")
+
+        # When
+        result = sync_account(account, BatchOptions(work_dir=str(tmp_path)))
+
+        # Then
+        assert result.success is False
+        assert result.error == "Zwift is down"
+
+
+class TestBatchRunner:
+    """Test cases for BatchRunner."""
+
+    @patch('services.batch.sync_account')
+    def test_run_keeps_account_order(self, mock_sync_account):
+        """Test that results come back in the configured order."""
+        # Given
+        accounts = [AccountConfig(name, "z", "zp", "g", "gp") for name in ("alice", "bob", "carol")]
+        mock_sync_account.side_effect = lambda account, options: AccountResult(account.name, True, 1, 0.1, None)
+        options = BatchOptions(work_dir="work")
+
+        # When
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            results = BatchRunner(accounts, options, executor=executor).run()
+
+        # Then
+        assert [result.name for result in results] == ["alice", "bob", "carol"]
+        assert mock_sync_account.call_count == 3
+
+    def test_run_reports_dead_workers(self):
+        """Test that an account whose worker died is reported as failed."""
+        # Given
+        future = Future()
+        future.set_exception(RuntimeError("A process in the process pool was terminated abruptly"))
+        executor = Mock()
+        executor.submit.return_value = future
+
+        # When
+        results = BatchRunner([AccountConfig("alice", "z", "zp", "g", "gp")], BatchOptions(work_dir="work"),
+                              executor=executor).run()
+
+        # Then
+        assert results[0].success is False
+        assert "terminated abruptly" in results[0].error
+        executor.shutdown.assert_not_called()
+
+
+class TestFormatSummary:
+    """Test cases for format_summary."""
+
+    def test_format_summary(self):
+        """Test the summary table."""
+        # Given
+        results = [
+            AccountResult("alice", True, 2, 12.34, None),
+            AccountResult("bob-the-cyclist", False, 0, 3.0, "Login failed"),
+        ]
+
+        # When
+        summary = format_summary(results)
+
+        # Then
+        assert summary.splitlines() == [
+            "Account          Status  New  Time   Error",
+            "alice            ok      2    12.3s",
+            "bob-the-cyclist  FAILED  0    3.0s   Login failed",
+            "1 of 2 accounts synced",
+        ]
@@ -0,0 +1,146 @@
+"""Tests for the local FIT file cache."""
+
+import os
+
+import pytest
+
+from services.fit_cache import FitFileCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    """Create a FitFileCache in a temporary directory."""
+    fit_cache = FitFileCache(str(tmp_path / "cache"), max_bytes=1000)
+    yield fit_cache
+    fit_cache.close()
+
+
+class TestFitFileCache:
+    """Tests for FitFileCache."""
+
+    def test_put_and_get(self, cache):
+        """Test that stored contents are returned by key."""
+        # When
+        digest = cache.put("download:key.fit", b"fit data")
+
+        # Then
+        assert digest == FitFileCache.content_hash(b"fit data")
+        assert cache.get("download:key.fit") == b"fit data"
+        assert cache.get("download:other.fit") is None
+
+    def test_put_file_reads_in_chunks(self, cache, tmp_path):
+        """Test that a file is stored chunk by chunk under the digest of its contents."""
+        # Given
+        cache.CHUNK_SIZE = 16
+        source = tmp_path / "activity.fit"
+        source.write_bytes(bytes(range(100)))
+        reads = []
+        read_chunks = cache._read_chunks
+        cache._read_chunks = lambda path: (reads.append(len(c)) or c for c in read_chunks(path))
+
+        # When
+        digest = cache.put_file("download:key.fit", str(source))
+
+        # Then
+        assert digest == FitFileCache.content_hash(bytes(range(100)))
+        assert cache.get("download:key.fit") == bytes(range(100))
+        assert cache.size == 100
+        assert max(reads) == 16
+
+    def test_put_file_shares_contents_with_put(self, cache, tmp_path):
+        """Test that a file with the same contents as stored bytes is stored once."""
+        # Given
+        source = tmp_path / "activity.fit"
+        source.write_bytes(b"x" * 100)
+        cache.put("download:a.fit", b"x" * 100)
+
+        # When
+        cache.put_file("download:b.fit", str(source))
+
+        # Then
+        assert cache.size == 100
+        assert cache.get("download:b.fit") == b"x" * 100
+
+    def test_oversized_file_is_not_cached(self, cache, tmp_path):
+        """Test that a file larger than the cap is not stored."""
+        # Given
+        source = tmp_path / "activity.fit"
+        source.write_bytes(b"x" * 1001)
+
+        # When
+        cache.put_file("download:big.fit", str(source))
+
+        # Then
+        assert cache.get("download:big.fit") is None
+        assert cache.size == 0
+
+    def test_identical_contents_are_stored_once(self, cache):
+        """Test that keys with the same contents share one file."""
+        # When
+        cache.put("download:a.fit", b"x" * 100)
+        cache.put("download:b.fit", b"x" * 100)
+
+        # Then
+        assert cache.size == 100
+        assert cache.get("download:a.fit") == cache.get("download:b.fit") == b"x" * 100
+
+    def test_evicts_least_recently_used(self, cache):
+        """Test that exceeding the size cap evicts the least recently used contents."""
+        # Given
+        cache.put("first", b"1" * 400)
+        cache.put("second", b"2" * 400)
+        cache.get("first")
+
+        # When
+        cache.put("third", b"3" * 400)
+
+        # Then
+        assert cache.get("second") is None
+        assert cache.get("first") == b"1" * 400
+        assert cache.get("third") == b"3" * 400
+        assert cache.size == 800
+
+    def test_oversized_contents_are_not_cached(self, cache):
+        """Test that contents larger than the cache are skipped."""
+        # When
+        cache.put("huge", b"x" * 1001)
+
+        # Then
+        assert cache.get("huge") is None
+        assert cache.size == 0
+
+    def test_corrupt_file_is_dropped(self, cache):
+        """Test that contents not matching their digest are discarded."""
+        # Given
+        digest = cache.put("download:key.fit", b"fit data")
+        with open(cache._path(digest), "wb") as file:
+            file.write(b"tampered")
+
+        # When / Then
+        assert cache.get("download:key.fit") is None
+        assert not os.path.exists(cache._path(digest))
+
+    def test_persists_across_instances(self, tmp_path):
+        """Test that a new cache on the same directory sees earlier entries."""
+        # Given
+        directory = str(tmp_path / "cache")
+        first = FitFileCache(directory)
+        first.put("download:key.fit", b"fit data")
+        first.close()
+
+        # When
+        second = FitFileCache(directory)
+
+        # Then
+        assert second.get("download:key.fit") == b"fit data"
+        second.close()
+
+    def test_spoof_key_covers_device_parameters(self):
+        """Test that spoofed outputs are keyed by the input and every device field."""
+        keys = {
+            FitFileCache.spoof_key("abc", 1, 3122, 9.75),
+            FitFileCache.spoof_key("abc", 1, 3122, 9.76),
+            FitFileCache.spoof_key("abc", 1, 3121, 9.75),
+            FitFileCache.spoof_key("abd", 1, 3122, 9.75),
+        }
+        assert len(keys) == 4
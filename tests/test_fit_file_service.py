@@ -3,7 +3,14 @@
 import pytest
 import tempfile
 import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timezone
 from unittest.mock import Mock, patch, MagicMock
+from fit_tool.fit_file import FitFile
+from fit_tool.profile.messages.device_info_message import DeviceInfoMessage
+from fit_tool.profile.messages.file_id_message import FileIdMessage
+from fit_tool.profile.profile_type import Manufacturer, GarminProduct
+from services.fit_cache import FitFileCache
 from services.fit_file_service import FitFileService
 
 
@@ -32,83 +39,266 @@ class TestFitFileService:
         with pytest.raises(FileNotFoundError, match="FIT file not found"):
             fit_file_service.modify_device_info("/non/existent/file.fit")
 
-    @patch('services.fit_file_service.FitFile')
-    @patch('services.fit_file_service.FitFileBuilder')
-    def test_modify_device_info_success(self, mock_builder_class, mock_fit_file_class,
-                                       fit_file_service, temp_fit_file):
-        """Test successful device info modification."""
+    def test_modify_device_info_success(self, fit_file_service, fit_bytes_without_file_id_device, tmp_path):
+        """Test that a file that cannot be patched in place is rewritten as a stream."""
         # Given
-        mock_content = Mock()
-        mock_file_id_message = Mock()
-        mock_file_id_message.__class__.__name__ = 'FileIdMessage'
-        mock_device_info_message = Mock()
-        mock_device_info_message.__class__.__name__ = 'DeviceInfoMessage'
+        fit_file_path = tmp_path / "activity.fit"
+        fit_file_path.write_bytes(fit_bytes_without_file_id_device)
 
-        mock_record1 = Mock()
-        mock_record1.message = mock_file_id_message
-        mock_record2 = Mock()
-        mock_record2.message = mock_device_info_message
+        # When
+        result = fit_file_service.modify_device_info(str(fit_file_path))
 
-        mock_content.records = [mock_record1, mock_record2]
-        mock_fit_file_class.from_file.return_value = mock_content
+        # Then
+        assert 'modified_' in result
+        file_id = FitFile.from_file(result).records[1].message
+        assert isinstance(file_id, FileIdMessage)
+        assert file_id.manufacturer == Manufacturer.GARMIN.value
+        assert file_id.product == GarminProduct.EDGE_530.value
+        os.remove(result)
 
-        mock_builder = Mock()
-        mock_builder_class.return_value = mock_builder
+    def test_modify_device_info_failure(self, fit_file_service, temp_fit_file):
+        """Test modify_device_info failure."""
+        # When & Then
+        with pytest.raises(RuntimeError, match="Failed to modify FIT file"):
+            fit_file_service.modify_device_info(temp_fit_file)
 
-        mock_built_file = Mock()
-        mock_builder.build.return_value = mock_built_file
+    def test_modify_device_info_with_custom_params(self, fit_file_service, fit_bytes_without_file_id_device,
+                                                   tmp_path):
+        """Test modify_device_info with custom parameters."""
+        # Given
+        fit_file_path = tmp_path / "activity.fit"
+        fit_file_path.write_bytes(fit_bytes_without_file_id_device)
 
         # When
-        result = fit_file_service.modify_device_info(temp_fit_file)
+        result = fit_file_service.modify_device_info(
+            str(fit_file_path),
+            manufacturer=123,
+            product=456,
+            software_version=1.23
+        )
 
         # Then
-        assert result is not None
-        assert 'modified_' in result
-        mock_fit_file_class.from_file.assert_called_once_with(temp_fit_file)
-        mock_builder.add.assert_called()
-        mock_builder.build.assert_called_once()
-        mock_built_file.to_file.assert_called_once()
+        device_info = FitFile.from_file(result).records[3].message
+        assert isinstance(device_info, DeviceInfoMessage)
+        assert (device_info.manufacturer, device_info.product) == (123, 456)
+        assert device_info.software_version == pytest.approx(1.23)
+        os.remove(result)
 
-    @patch('services.fit_file_service.FitFile')
-    def test_modify_device_info_failure(self, mock_fit_file_class, fit_file_service, temp_fit_file):
-        """Test modify_device_info failure."""
+    @patch('services.fit_file_service.rewrite_device_info')
+    def test_modify_device_info_patches_in_place(self, mock_rewrite, fit_file_service, fit_bytes):
+        """Test that a valid FIT file is patched without rewriting it."""
+        # Given
+        with tempfile.NamedTemporaryFile(suffix='.fit', delete=False) as temp_file:
+            temp_file.write(fit_bytes)
+
+        try:
+            # When
+            result = fit_file_service.modify_device_info(temp_file.name)
+
+            # Then
+            mock_rewrite.assert_not_called()
+            content = FitFile.from_file(result)
+            file_id = content.records[1].message
+            assert isinstance(file_id, FileIdMessage)
+            assert file_id.manufacturer == Manufacturer.GARMIN.value
+            assert file_id.product == GarminProduct.EDGE_530.value
+            os.remove(result)
+        finally:
+            os.remove(temp_file.name)
+
+    @patch('services.fit_file_service.FitDevicePatcher')
+    def test_modify_device_info_binary_patch_disabled(self, mock_patcher_class, fit_bytes, tmp_path):
+        """Test that the file is rewritten directly when binary patching is disabled."""
         # Given
-        mock_fit_file_class.from_file.side_effect = Exception("Processing error")
+        service = FitFileService(binary_patch=False)
+        fit_file_path = tmp_path / "activity.fit"
+        fit_file_path.write_bytes(fit_bytes)
+
+        # When
+        result = service.modify_device_info(str(fit_file_path))
+
+        # Then
+        mock_patcher_class.assert_not_called()
+        assert FitFile.from_file(result).records[1].message.manufacturer == Manufacturer.GARMIN.value
+        os.remove(result)
+
+    def test_modify_device_info_bytes_patches_in_place(self, fit_file_service, fit_bytes):
+        """Test that in-memory FIT data is patched without touching disk."""
+        # When
+        result = fit_file_service.modify_device_info_bytes(fit_bytes)
+
+        # Then
+        assert len(result) == len(fit_bytes)
+        file_id = FitFile.from_bytes(result).records[1].message
+        assert file_id.manufacturer == Manufacturer.GARMIN.value
+        assert file_id.product == GarminProduct.EDGE_530.value
 
+    def test_modify_device_info_bytes_fallback(self, fit_file_service, fit_bytes_without_file_id_device):
+        """Test that FIT data that cannot be patched in place is rewritten with the device fields added."""
+        # When
+        result = fit_file_service.modify_device_info_bytes(fit_bytes_without_file_id_device)
+
+        # Then
+        assert len(result) > len(fit_bytes_without_file_id_device)
+        records = FitFile.from_bytes(result).records
+        assert records[1].message.manufacturer == Manufacturer.GARMIN.value
+        assert records[1].message.product == GarminProduct.EDGE_530.value
+        assert len(records) == len(FitFile.from_bytes(fit_bytes_without_file_id_device).records)
+
+    def test_modify_device_info_bytes_adds_device_info_fields(self, fit_file_service,
+                                                               fit_bytes_without_device_info_device):
+        """Test that a DeviceInfo message without device fields gets them through the rewrite."""
+        # When
+        result = fit_file_service.modify_device_info_bytes(fit_bytes_without_device_info_device)
+
+        # Then
+        device_info = FitFile.from_bytes(result).records[3].message
+        assert isinstance(device_info, DeviceInfoMessage)
+        assert (device_info.manufacturer, device_info.product) == (Manufacturer.GARMIN.value,
+                                                                   GarminProduct.EDGE_530.value)
+        assert device_info.software_version == 9.75
+
+    def test_modify_device_info_bytes_failure(self, fit_file_service):
+        """Test modify_device_info_bytes failure."""
         # When & Then
         with pytest.raises(RuntimeError, match="Failed to modify FIT file"):
-            fit_file_service.modify_device_info(temp_fit_file)
+            fit_file_service.modify_device_info_bytes(b'fake fit file content')
 
-    def test_modify_device_info_with_custom_params(self, fit_file_service, temp_fit_file):
-        """Test modify_device_info with custom parameters."""
+    def test_read_activity_summary_from_session(self, fit_file_service, fit_bytes_with_session):
+        """Test that the summary comes from the session message."""
+        # When
+        summary = fit_file_service.read_activity_summary(fit_bytes_with_session)
+
+        # Then
+        assert summary.start_time == datetime(2020, 9, 13, 12, 26, 40, tzinfo=timezone.utc)
+        assert summary.duration == 3600.0
+        assert summary.distance == 30000.0
+
+    def test_read_activity_summary_without_session(self, fit_file_service, fit_bytes):
+        """Test that files without a session fall back to their creation time."""
+        # When
+        summary = fit_file_service.read_activity_summary(fit_bytes)
+
+        # Then
+        assert summary.start_time == datetime(2020, 9, 13, 12, 26, 40, tzinfo=timezone.utc)
+        assert summary.duration is None
+        assert summary.distance is None
+
+    def test_read_activity_summary_invalid_data(self, fit_file_service):
+        """Test that unreadable FIT data has no summary."""
+        assert fit_file_service.read_activity_summary(b'fake fit file content') is None
+
+    def test_submit_modify_device_info_bytes_in_process_pool(self, fit_file_service, fit_bytes):
+        """Test that modifications can run in another process."""
+        # When
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            result = fit_file_service.submit_modify_device_info_bytes(executor, fit_bytes).result()
+
+        # Then
+        assert result == fit_file_service.modify_device_info_bytes(fit_bytes)
+
+    def test_submit_modify_device_info_bytes_failure(self, fit_file_service):
+        """Test that a failed modification fails the future with RuntimeError."""
+        # When
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            future = fit_file_service.submit_modify_device_info_bytes(executor, b'fake fit file content')
+
+            # Then
+            with pytest.raises(RuntimeError, match="Failed to modify FIT file"):
+                future.result()
+
+    def test_modify_many_in_process_pool(self, fit_file_service, fit_bytes, fit_bytes_without_file_id_device):
+        """Test that in-memory items are modified in worker processes and come back in order."""
         # Given
-        custom_manufacturer = 123
-        custom_product = 456
-        custom_version = 1.23
+        items = [fit_bytes, b'fake fit file content', fit_bytes_without_file_id_device]
 
-        with patch('services.fit_file_service.FitFile') as mock_fit_file_class, \
-             patch('services.fit_file_service.FitFileBuilder') as mock_builder_class:
+        # When
+        results = list(fit_file_service.modify_many(items, workers=2))
 
-            mock_content = Mock()
-            mock_content.records = []
-            mock_fit_file_class.from_file.return_value = mock_content
+        # Then
+        assert [result.index for result in results] == [0, 1, 2]
+        assert results[0].output == fit_file_service.modify_device_info_bytes(fit_bytes)
+        assert isinstance(results[1].error, RuntimeError)
+        assert results[1].output is None
+        assert results[2].output == fit_file_service.modify_device_info_bytes(fit_bytes_without_file_id_device)
 
-            mock_builder = Mock()
-            mock_builder_class.return_value = mock_builder
-            mock_built_file = Mock()
-            mock_builder.build.return_value = mock_built_file
+    def test_modify_many_paths(self, fit_file_service, fit_bytes, tmp_path):
+        """Test that path items are modified to files by the workers."""
+        # Given
+        paths = []
+        for name in ("first.fit", "second.fit"):
+            path = tmp_path / name
+            path.write_bytes(fit_bytes)
+            paths.append(path)
+        paths.insert(1, str(tmp_path / "missing.fit"))
 
-            # When
-            result = fit_file_service.modify_device_info(
-                temp_fit_file,
-                manufacturer=custom_manufacturer,
-                product=custom_product,
-                software_version=custom_version
-            )
+        output_dir = tmp_path / "out"
+        output_dir.mkdir()
+
+        # When
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            results = list(fit_file_service.modify_many(paths, executor=executor, product=456,
+                                                        output_dir=str(output_dir)))
+
+        # Then
+        assert os.path.dirname(results[0].output) == str(output_dir)
+        assert os.path.basename(results[0].output).startswith("modified_")
+        assert results[0].output.endswith("_first.fit")
+        assert isinstance(results[1].error, FileNotFoundError)
+        assert results[2].output.endswith("_second.fit")
+        assert len(os.listdir(output_dir)) == 2
+        for result in (results[0], results[2]):
+            assert FitFile.from_file(result.output).records[1].message.product == 456
+
+    def test_modify_many_paths_with_same_name(self, fit_file_service, fit_bytes, fit_bytes_without_file_id_device,
+                                              tmp_path):
+        """Test that inputs sharing a file name from different directories get their own outputs."""
+        # Given
+        paths = []
+        for directory, data in (("a", fit_bytes), ("b", fit_bytes_without_file_id_device)):
+            (tmp_path / directory).mkdir()
+            path = tmp_path / directory / "ride.fit"
+            path.write_bytes(data)
+            paths.append(str(path))
+
+        # When
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            results = list(fit_file_service.modify_many(paths, executor=executor, output_dir=str(tmp_path)))
+
+        # Then
+        assert results[0].output != results[1].output
+        for result, data in zip(results, (fit_bytes, fit_bytes_without_file_id_device)):
+            with open(result.output, "rb") as file:
+                assert file.read() == fit_file_service.modify_device_info_bytes(data)
+
+    def test_modify_many_bounds_items_in_flight(self, fit_file_service, fit_bytes):
+        """Test that items are consumed lazily, a few workers ahead of the results."""
+        # Given
+        consumed = []
+
+        def items():
+            for i in range(10):
+                consumed.append(i)
+                yield fit_bytes
+
+        # When
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            results = fit_file_service.modify_many(items(), workers=1, executor=executor)
+            first = next(results)
 
             # Then
-            assert result is not None
-            mock_builder_class.assert_called_once_with(auto_define=True, min_string_size=50)
+            assert first.index == 0
+            assert len(consumed) == 2
+            assert len(list(results)) == 9
+
+    def test_modify_many_invalid_item(self, fit_file_service):
+        """Test that an item that is neither a path nor bytes is reported as failed."""
+        # When
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            results = list(fit_file_service.modify_many([42], executor=executor))
+
+        # Then
+        assert isinstance(results[0].error, TypeError)
 
     def test_cleanup_file_exists(self, fit_file_service, temp_fit_file):
         """Test cleanup of existing file."""
@@ -142,3 +332,70 @@ class TestFitFileService:
 
         # Then
         mock_remove.assert_called_once_with(temp_fit_file)
+
+
+class TestFitFileServiceCache:
+    """Test cases for FitFileService with a FIT file cache."""
+
+    def test_modified_output_is_reused(self, fit_bytes, tmp_path):
+        """Test that modifying the same input twice only modifies it once."""
+        # Given
+        cache = FitFileCache(str(tmp_path / "cache"))
+        service = FitFileService(cache=cache)
+        first = service.modify_device_info_bytes(fit_bytes)
+
+        # When
+        with patch.object(service, '_modify') as mock_modify:
+            second = service.modify_device_info_bytes(fit_bytes)
+
+        # Then
+        mock_modify.assert_not_called()
+        assert second == first
+        cache.close()
+
+    def test_different_device_is_not_reused(self, fit_bytes, tmp_path):
+        """Test that a different spoofed device produces a new output."""
+        # Given
+        cache = FitFileCache(str(tmp_path / "cache"))
+        service = FitFileService(cache=cache)
+        service.modify_device_info_bytes(fit_bytes)
+
+        # When
+        other = service.modify_device_info_bytes(fit_bytes, product=GarminProduct.EDGE_1030.value)
+
+        # Then
+        assert other != service.modify_device_info_bytes(fit_bytes)
+        cache.close()
+
+    def test_submitted_modification_is_cached(self, fit_bytes, tmp_path):
+        """Test that executor modifications fill and reuse the cache."""
+        # Given
+        cache = FitFileCache(str(tmp_path / "cache"))
+        service = FitFileService(cache=cache)
+        executor = Mock()
+
+        # When
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            first = service.submit_modify_device_info_bytes(pool, fit_bytes).result()
+        second = service.submit_modify_device_info_bytes(executor, fit_bytes)
+
+        # Then
+        executor.submit.assert_not_called()
+        assert second.result() == first
+        cache.close()
+
+    def test_modify_many_uses_cache(self, fit_bytes, tmp_path):
+        """Test that in-memory items already modified come from the cache."""
+        # Given
+        cache = FitFileCache(str(tmp_path / "cache"))
+        service = FitFileService(cache=cache)
+        expected = service.modify_device_info_bytes(fit_bytes)
+        executor = Mock()
+
+        # When
+        results = list(service.modify_many([fit_bytes], executor=executor))
+
+        # Then
+        executor.submit.assert_not_called()
+        assert results[0].output == expected
+        cache.close()
@@ -0,0 +1,140 @@
+"""Tests for the FIT binary patcher module."""
+
+import struct
+import pytest
+from fit_tool.fit_file import FitFile
+from fit_tool.profile.messages.device_info_message import DeviceInfoMessage
+from fit_tool.profile.messages.file_id_message import FileIdMessage
+from fit_tool.profile.messages.record_message import RecordMessage
+from fit_tool.profile.profile_type import Manufacturer, GarminProduct
+
+from services.fit import crc16, crc16_combine, FitDevicePatcher, FitPatchError
+from services.fit.crc import CRC_TABLE
+
+
+def _messages(data, message_class):
+    """Decode a FIT buffer and return the messages of the given class."""
+    content = FitFile.from_bytes(bytes(data))
+    return [record.message for record in content.records if isinstance(record.message, message_class)]
+
+
+class TestCrc16:
+    """Tests for the FIT CRC-16 implementation."""
+
+    def test_crc16_matches_sdk_nibble_algorithm(self, fit_bytes):
+        """Test that the table-driven CRC matches the FIT SDK reference."""
+        from fit_tool.utils.crc import crc16 as reference_crc16
+
+        assert crc16(fit_bytes) == reference_crc16(fit_bytes)
+
+    def test_crc16_can_be_chained(self, fit_bytes):
+        """Test that checksumming in chunks gives the same result."""
+        middle = len(fit_bytes) // 2
+        assert crc16(fit_bytes[middle:], crc=crc16(fit_bytes[:middle])) == crc16(fit_bytes)
+
+    def test_crc16_combine(self, fit_bytes):
+        """Test that the CRCs of two halves combine into the CRC of the whole."""
+        for middle in (0, 1, 14, len(fit_bytes) // 2, len(fit_bytes)):
+            head, tail = fit_bytes[:middle], fit_bytes[middle:]
+            assert crc16_combine(crc16(head), crc16(tail), len(tail)) == crc16(fit_bytes)
+
+    def test_crc_table_size(self):
+        """Test that the lookup table covers every byte value."""
+        assert len(CRC_TABLE) == 256
+
+
+class TestFitDevicePatcher:
+    """Tests for FitDevicePatcher class."""
+
+    @pytest.fixture
+    def patcher(self):
+        """Create a FitDevicePatcher spoofing a Garmin Edge 530."""
+        return FitDevicePatcher(Manufacturer.GARMIN.value, GarminProduct.EDGE_530.value, 9.75)
+
+    def test_patch_rewrites_device_fields(self, patcher, fit_bytes):
+        """Test that FileId and DeviceInfo fields are rewritten."""
+        # Given
+        data = bytearray(fit_bytes)
+
+        # When
+        count = patcher.patch(data)
+
+        # Then
+        assert count == 5
+        file_id = _messages(data, FileIdMessage)[0]
+        assert file_id.manufacturer == Manufacturer.GARMIN.value
+        assert file_id.product == GarminProduct.EDGE_530.value
+        device_info = _messages(data, DeviceInfoMessage)[0]
+        assert device_info.manufacturer == Manufacturer.GARMIN.value
+        assert device_info.product == GarminProduct.EDGE_530.value
+        assert device_info.software_version == pytest.approx(9.75)
+
+    def test_patch_keeps_size_and_other_records(self, patcher, fit_bytes):
+        """Test that the layout and unrelated records are left untouched."""
+        # Given
+        data = bytearray(fit_bytes)
+
+        # When
+        patcher.patch(data)
+
+        # Then
+        assert len(data) == len(fit_bytes)
+        records = _messages(data, RecordMessage)
+        assert [record.heart_rate for record in records] == [100, 101, 102, 103, 104]
+
+    def test_patch_updates_file_crc(self, patcher, fit_bytes):
+        """Test that the trailing CRC matches the patched contents."""
+        # Given
+        data = bytearray(fit_bytes)
+
+        # When
+        patcher.patch(data)
+
+        # Then
+        stored_crc, = struct.unpack("<H", data[-2:])
+        assert stored_crc == crc16(data[:-2])
+        assert data[-2:] != fit_bytes[-2:]
+
+    def test_patch_chained_files(self, patcher, fit_bytes):
+        """Test that every segment of a chained FIT file is patched."""
+        # Given
+        data = bytearray(fit_bytes + fit_bytes)
+
+        # When
+        count = patcher.patch(data)
+
+        # Then
+        assert count == 10
+        segment = len(fit_bytes)
+        assert data[:segment] == data[segment:]
+        assert struct.unpack("<H", data[segment - 2:segment])[0] == crc16(data[:segment - 2])
+
+    def test_patch_invalid_header(self, patcher):
+        """Test that a non-FIT buffer is rejected."""
+        with pytest.raises(FitPatchError, match="Invalid FIT header"):
+            patcher.patch(bytearray(b"fake fit file content"))
+
+    def test_patch_truncated_file(self, patcher, fit_bytes):
+        """Test that a truncated file is rejected."""
+        with pytest.raises(FitPatchError, match="exceeds file length"):
+            patcher.patch(bytearray(fit_bytes[:-10]))
+
+    def test_patch_missing_file_id(self, patcher, fit_bytes):
+        """Test that a file without FileId device fields is rejected."""
+        # Given - only the header and an empty record section
+        header = bytearray(fit_bytes[:fit_bytes[0]])
+        struct.pack_into("<I", header, 4, 0)
+        data = header + struct.pack("<H", crc16(header))
+
+        # When & Then
+        with pytest.raises(FitPatchError, match="no manufacturer field"):
+            patcher.patch(data)
+
+    def test_patch_device_info_without_device_fields(self, patcher, fit_bytes_without_device_info_device):
+        """Test that a DeviceInfo message lacking device fields is rejected, so it gets rewritten instead."""
+        # Given
+        data = bytearray(fit_bytes_without_device_info_device)
+
+        # When & Then
+        with pytest.raises(FitPatchError, match="Message 23 has no manufacturer, product, software_version"):
+            patcher.patch(data)
@@ -0,0 +1,159 @@
+"""Tests for the FIT streaming module."""
+
+import io
+import pytest
+from fit_tool.fit_file import FitFile
+from fit_tool.profile.messages.device_info_message import DeviceInfoMessage
+from fit_tool.profile.messages.file_id_message import FileIdMessage
+from fit_tool.profile.profile_type import Manufacturer, GarminProduct
+
+from services.fit import (DataMessage, DeviceInfoTransform, FitHeader, FitStreamError, FitStreamWriter,
+                          MessageDefinition, read_fit_messages, rewrite_device_info, write_fit_messages)
+from services.fit.stream import DeveloperFieldDefinition, FieldDefinition
+
+
+def rewrite(data):
+    """Rewrite in-memory FIT data to spoof a Garmin Edge 530."""
+    output = io.BytesIO()
+    rewrite_device_info(io.BytesIO(data), output, Manufacturer.GARMIN.value, GarminProduct.EDGE_530.value, 9.75)
+    return output.getvalue()
+
+
+def messages_of(data, message_class):
+    """Decode FIT data and return the messages of the given class."""
+    return [record.message for record in FitFile.from_bytes(data).records if isinstance(record.message, message_class)]
+
+
+class CountingStream(io.BytesIO):
+    """BytesIO recording the largest single read."""
+
+    largest_read = 0
+
+    def read(self, size=-1):
+        self.largest_read = max(self.largest_read, size)
+        return super().read(size)
+
+
+class TestReadWrite:
+    """Tests for read_fit_messages and FitStreamWriter."""
+
+    def test_round_trip_is_identical(self, fit_bytes_with_session):
+        """Test that writing the messages read gives back the same file."""
+        # Given
+        output = io.BytesIO()
+
+        # When
+        write_fit_messages(read_fit_messages(io.BytesIO(fit_bytes_with_session)), output)
+
+        # Then
+        assert output.getvalue() == fit_bytes_with_session
+
+    def test_reads_one_message_at_a_time(self, fit_bytes):
+        """Test that the reader only reads as far as the message it yields."""
+        # Given
+        stream = CountingStream(fit_bytes)
+
+        # When
+        messages = read_fit_messages(stream)
+        header = next(messages)
+        definition = next(messages)
+
+        # Then
+        assert isinstance(header, FitHeader)
+        assert isinstance(definition, MessageDefinition)
+        assert stream.tell() < len(fit_bytes) // 2
+        list(messages)
+        assert stream.largest_read < 64
+
+    def test_chained_files(self, fit_bytes):
+        """Test that every segment of a chained file keeps its own header and CRC."""
+        # Given
+        output = io.BytesIO()
+
+        # When
+        write_fit_messages(read_fit_messages(io.BytesIO(fit_bytes + fit_bytes)), output)
+
+        # Then
+        assert output.getvalue() == fit_bytes + fit_bytes
+
+    def test_invalid_header(self):
+        """Test that data without a FIT header is rejected."""
+        with pytest.raises(FitStreamError, match="Invalid FIT header"):
+            list(read_fit_messages(io.BytesIO(b"fake fit file content")))
+
+    def test_truncated_file(self, fit_bytes):
+        """Test that a file cut short is rejected."""
+        with pytest.raises(FitStreamError, match="Truncated FIT file"):
+            list(read_fit_messages(io.BytesIO(fit_bytes[:-10])))
+
+    def test_record_before_header(self):
+        """Test that the writer needs a file header first."""
+        definition = MessageDefinition(0, "<", 0, (FieldDefinition(0, 1, 0),))
+        with pytest.raises(FitStreamError, match="before the file header"):
+            FitStreamWriter(io.BytesIO()).write(definition)
+
+
+class TestDeviceInfoTransform:
+    """Tests for DeviceInfoTransform and rewrite_device_info."""
+
+    def test_rewrites_device_fields(self, fit_bytes):
+        """Test that FileId and DeviceInfo carry the spoofed device."""
+        # When
+        result = rewrite(fit_bytes)
+
+        # Then
+        file_id = messages_of(result, FileIdMessage)[0]
+        assert (file_id.manufacturer, file_id.product) == (Manufacturer.GARMIN.value, GarminProduct.EDGE_530.value)
+        device_info = messages_of(result, DeviceInfoMessage)[0]
+        assert device_info.manufacturer == Manufacturer.GARMIN.value
+        assert device_info.software_version == 9.75
+        assert device_info.timestamp == messages_of(fit_bytes, DeviceInfoMessage)[0].timestamp
+
+    def test_adds_missing_device_fields(self, fit_bytes_without_file_id_device):
+        """Test that a FileId without device fields gets them."""
+        # When
+        result = rewrite(fit_bytes_without_file_id_device)
+
+        # Then
+        file_id = messages_of(result, FileIdMessage)[0]
+        assert (file_id.manufacturer, file_id.product) == (Manufacturer.GARMIN.value, GarminProduct.EDGE_530.value)
+        assert file_id.time_created == messages_of(fit_bytes_without_file_id_device, FileIdMessage)[0].time_created
+
+    def test_keeps_developer_data_and_compressed_timestamps(self):
+        """Test that developer fields and compressed timestamp headers survive the rewrite."""
+        # Given
+        definition = MessageDefinition(
+            0, ">", 23, (FieldDefinition(253, 4, 0x86), FieldDefinition(2, 2, 0x84)),
+            (DeveloperFieldDefinition(0, 1, 0),)
+        )
+        messages = [
+            FitHeader(14, 0x20, 2132),
+            definition,
+            DataMessage(0x80, definition, b"\x00\x00\x00\x01\x00\x59\x07"),
+        ]
+
+        # When
+        result = list(DeviceInfoTransform(1, 3122, 9.75)(messages))
+
+        # Then
+        rewritten = result[1]
+        assert [field.number for field in rewritten.fields] == [253, 2, 4, 5]
+        assert rewritten.developer_fields == definition.developer_fields
+        assert result[2].header == 0x80
+        assert result[2].payload == b"\x00\x00\x00\x01" + b"\x00\x01" + b"\x0c\x32" + b"\x03\xcf" + b"\x07"
+
+    def test_written_file_reads_back(self):
+        """Test that a rewritten file with developer fields parses with its new layout."""
+        # Given
+        definition = MessageDefinition(0, "<", 0, (FieldDefinition(0, 1, 0),), (DeveloperFieldDefinition(0, 1, 0),))
+        source = io.BytesIO()
+        write_fit_messages([FitHeader(14, 0x20, 2132), definition, DataMessage(0x00, definition, b"\x04\x07")],
+                           source)
+        output = io.BytesIO()
+
+        # When
+        rewrite_device_info(io.BytesIO(source.getvalue()), output, 1, 3122, 9.75)
+
+        # Then
+        messages = list(read_fit_messages(io.BytesIO(output.getvalue())))
+        assert messages[2].payload == b"\x04" + b"\x01\x00" + b"\x32\x0c" + b"\x07"
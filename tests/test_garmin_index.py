@@ -0,0 +1,94 @@
+"""Tests for GarminActivityIndex."""
+
+import pytest
+from datetime import datetime, timezone
+from services.fit import ActivitySummary
+from services.garmin_index import GarminActivityIndex
+
+
+def garmin_activity(activity_id, start, duration=3600.0, distance=30000.0):
+    """Build an activity as listed by Garmin Connect."""
+    return {"activityId": activity_id, "startTimeGMT": start, "duration": duration, "distance": distance}
+
+
+def summary(start, duration=3600.0, distance=30000.0):
+    """Build the summary of an activity starting at a UTC time string."""
+    start_time = datetime.strptime(start, "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc)
+    return ActivitySummary(start_time, duration, distance)
+
+
+class TestGarminActivityIndex:
+    """Test cases for GarminActivityIndex."""
+
+    @pytest.fixture
+    def index(self, tmp_path):
+        """Create a GarminActivityIndex backed by a temporary database."""
+        index = GarminActivityIndex(str(tmp_path / "garmin_index.db"))
+        yield index
+        index.close()
+
+    def test_load_and_find_duplicate(self, index):
+        """Test that a listed activity matches a summary starting within the tolerance."""
+        # Given
+        index.load([garmin_activity(1, "2024-01-01 10:00:00"), garmin_activity(2, "2024-01-02 10:00:00")])
+
+        # When / Then
+        assert len(index) == 2
+        assert index.find_duplicate(summary("2024-01-02 10:00:20")) == "2"
+        assert index.find_duplicate(summary("2024-01-03 10:00:00")) is None
+
+    def test_duration_and_distance_must_match(self, index):
+        """Test that a different ride starting at the same time is not a duplicate."""
+        # Given
+        index.load([garmin_activity(1, "2024-01-01 10:00:00")])
+
+        # When / Then
+        assert index.find_duplicate(summary("2024-01-01 10:00:00", duration=600.0)) is None
+        assert index.find_duplicate(summary("2024-01-01 10:00:00", distance=5000.0)) is None
+        assert index.find_duplicate(summary("2024-01-01 10:00:00", duration=None, distance=None)) == "1"
+
+    def test_add_after_upload(self, index):
+        """Test that uploaded activities are found without reloading the listing."""
+        # When
+        index.add(42, summary("2024-01-01 10:00:00"))
+
+        # Then
+        assert index.find_duplicate(summary("2024-01-01 10:00:00")) == "42"
+
+    def test_load_drops_activities_deleted_on_garmin(self, index):
+        """Test that a reload forgets activities missing from the period it covers."""
+        # Given
+        index.add(1, summary("2023-12-01 10:00:00"))
+        index.add(2, summary("2024-01-02 10:00:00"))
+
+        # When
+        index.load([garmin_activity(3, "2024-01-01 10:00:00")])
+
+        # Then
+        assert index.find_duplicate(summary("2023-12-01 10:00:00")) == "1"
+        assert index.find_duplicate(summary("2024-01-02 10:00:00")) is None
+        assert index.find_duplicate(summary("2024-01-01 10:00:00")) == "3"
+
+    def test_load_skips_activities_without_start_time(self, index):
+        """Test that malformed listing entries are ignored."""
+        # When
+        count = index.load([{"activityId": 1}, garmin_activity(2, "2024-01-01 10:00:00")])
+
+        # Then
+        assert count == 1
+        assert len(index) == 1
+
+    def test_index_persists(self, tmp_path):
+        """Test that the index survives reopening the database."""
+        # Given
+        db_path = str(tmp_path / "garmin_index.db")
+        index = GarminActivityIndex(db_path)
+        index.add(42, summary("2024-01-01 10:00:00"))
+        index.close()
+
+        # When
+        reopened = GarminActivityIndex(db_path)
+
+        # Then
+        assert reopened.find_duplicate(summary("2024-01-01 10:00:00")) == "42"
+        reopened.close()
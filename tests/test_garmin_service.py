@@ -1,13 +1,17 @@
 """Tests for GarminService."""
 
+import os
 import pytest
-from unittest.mock import Mock, patch
+import requests
+from datetime import datetime, timezone
+from unittest.mock import Mock, call, patch
 from garminconnect import (
     GarminConnectAuthenticationError,
     GarminConnectTooManyRequestsError,
     GarminConnectConnectionError
 )
-from services.garmin_service import GarminService
+from services.garmin_service import GarminDuplicateActivityError, GarminService
+from services.zwift.retry import RetryPolicy
 
 
 class TestGarminService:
@@ -121,6 +125,122 @@ class TestGarminService:
         with pytest.raises(RuntimeError, match="Upload failed"):
             garmin_service.upload_activity("/path/to/file.fit")
 
+    def test_upload_activity_bytes_not_authenticated(self, garmin_service):
+        """Test in-memory upload fails when not authenticated."""
+        # When & Then
+        with pytest.raises(RuntimeError, match="Must authenticate before uploading activities"):
+            garmin_service.upload_activity_bytes(b"data", "activity.fit")
+
+    def test_upload_activity_bytes_success(self, garmin_service):
+        """Test successful in-memory activity upload."""
+        # Given
+        garmin_service._authenticated = True
+        expected_response = {"upload_id": "12345", "status": "success"}
+        garmin_service.client.client.post.return_value = expected_response
+
+        # When
+        result = garmin_service.upload_activity_bytes(b"fit data", "activity.fit")
+
+        # Then
+        assert result == expected_response
+        args, kwargs = garmin_service.client.client.post.call_args
+        assert args == ("connectapi", garmin_service.client.garmin_connect_upload)
+        file_name, payload = kwargs["files"]["file"]
+        assert file_name == "activity.fit"
+        assert payload.read() == b"fit data"
+        assert kwargs["api"] is True
+
+    def test_upload_activity_bytes_failure(self, garmin_service):
+        """Test in-memory upload failure."""
+        # Given
+        garmin_service._authenticated = True
+        garmin_service.client.client.post.side_effect = Exception("Upload failed")
+
+        # When & Then
+        with pytest.raises(RuntimeError, match="Upload failed"):
+            garmin_service.upload_activity_bytes(b"fit data", "activity.fit")
+
+    def test_upload_activity_bytes_duplicate(self, garmin_service):
+        """Test that Garmin Connect rejecting an existing activity raises GarminDuplicateActivityError."""
+        # Given
+        garmin_service._authenticated = True
+        garmin_service.client.client.post.side_effect = GarminConnectConnectionError(
+            "API Error 409 - Duplicate Activity."
+        )
+
+        # When & Then
+        with pytest.raises(GarminDuplicateActivityError, match="409"):
+            garmin_service.upload_activity_bytes(b"fit data", "activity.fit")
+
+    def test_list_activities_not_authenticated(self, garmin_service):
+        """Test listing activities fails when not authenticated."""
+        # When & Then
+        with pytest.raises(RuntimeError, match="Must authenticate before listing activities"):
+            garmin_service.list_activities()
+
+    def test_list_activities_success(self, garmin_service):
+        """Test that activities are listed in a single request."""
+        # Given
+        garmin_service._authenticated = True
+        activities = [{"activityId": 1, "startTimeGMT": "2024-01-01 10:00:00"}]
+        garmin_service.client.get_activities.return_value = activities
+
+        # When
+        result = garmin_service.list_activities(limit=50)
+
+        # Then
+        assert result == activities
+        garmin_service.client.get_activities.assert_called_once_with(0, 50)
+
+    def test_list_activities_since_pages_back(self, garmin_service):
+        """Test that pages are listed until one reaches an activity older than since."""
+        # Given
+        garmin_service._authenticated = True
+        history = [{"activityId": i, "startTimeGMT": f"2024-01-{i:02d} 10:00:00"} for i in range(28, 0, -1)]
+        garmin_service.client.get_activities.side_effect = lambda start, limit: history[start:start + limit]
+
+        # When
+        result = garmin_service.list_activities(limit=5, since=datetime(2024, 1, 18, tzinfo=timezone.utc))
+
+        # Then
+        assert result == history[:15]
+        assert [call.args for call in garmin_service.client.get_activities.call_args_list] == [(0, 5), (5, 5), (10, 5)]
+
+    def test_list_activities_failure(self, garmin_service):
+        """Test listing activities failure."""
+        # Given
+        garmin_service._authenticated = True
+        garmin_service.client.get_activities.side_effect = Exception("Listing failed")
+
+        # When & Then
+        with pytest.raises(RuntimeError, match="Listing activities failed"):
+            garmin_service.list_activities()
+
+    def test_ensure_authenticated_logs_in_once(self, garmin_service):
+        """Test that ensure_authenticated only logs in when not authenticated yet."""
+        # When
+        garmin_service.ensure_authenticated()
+        garmin_service.ensure_authenticated()
+
+        # Then
+        garmin_service.client.login.assert_called_once()
+        assert garmin_service.is_authenticated() is True
+
+    def test_lazy_auth_logs_in_on_first_upload(self):
+        """Test that lazy mode authenticates on the first call needing it."""
+        # Given
+        with patch('services.garmin_service.Garmin'):
+            service = GarminService("test_user", "test_pass", lazy_auth=True)
+        service.client.client.post.return_value = {"status": "ok"}
+
+        # When
+        service.upload_activity_bytes(b"fit data", "activity.fit")
+        service.upload_activity_bytes(b"fit data", "activity.fit")
+
+        # Then
+        service.client.login.assert_called_once()
+        assert service.client.client.post.call_count == 2
+
     def test_is_authenticated_true(self, garmin_service):
         """Test is_authenticated returns True when authenticated."""
         # Given
@@ -136,3 +256,228 @@ class TestGarminService:
 
         # When & Then
         assert garmin_service.is_authenticated() is False
+
+
+class TestGarminServiceTokenStore:
+    """Test cases for resuming a saved Garmin Connect session."""
+
+    @pytest.fixture
+    def token_file(self, tmp_path):
+        """Path of the token file in a temporary token store."""
+        return str(tmp_path / "garmin" / "tokens.json")
+
+    def make_service(self, token_store):
+        with patch('services.garmin_service.Garmin') as mock_garmin_class:
+            service = GarminService("test_user", "test_pass", token_store=token_store)
+        service.client = mock_garmin_class.return_value
+        service.client.client.dumps.return_value = '{"di_token": "t"}'
+        return service
+
+    def test_first_login_saves_session(self, token_file):
+        """Test that a full login saves the session with owner-only permissions."""
+        # Given
+        service = self.make_service(token_file)
+
+        # When
+        service.authenticate()
+
+        # Then
+        service.client.login.assert_called_once_with()
+        with open(token_file) as file:
+            assert file.read() == '{"di_token": "t"}'
+        assert os.stat(token_file).st_mode & 0o777 == 0o600
+        assert os.stat(os.path.dirname(token_file)).st_mode & 0o777 == 0o700
+        assert os.listdir(os.path.dirname(token_file)) == ["tokens.json"]
+        assert service.is_authenticated()
+
+    def test_saved_session_replaces_readable_token_file(self, token_file):
+        """Test that a token file readable by others is replaced by an owner-only one."""
+        # Given
+        service = self.make_service(token_file)
+        os.makedirs(os.path.dirname(token_file))
+        with open(token_file, "w") as file:
+            file.write("{}")
+        os.chmod(token_file, 0o644)
+        service.client.login.side_effect = [GarminConnectAuthenticationError("expired"), None]
+
+        # When
+        service.authenticate()
+
+        # Then
+        assert os.stat(token_file).st_mode & 0o777 == 0o600
+        with open(token_file) as file:
+            assert file.read() == '{"di_token": "t"}'
+
+    def test_saved_session_is_resumed(self, token_file):
+        """Test that an existing session is resumed without a credential login."""
+        # Given
+        service = self.make_service(token_file)
+        os.makedirs(os.path.dirname(token_file))
+        open(token_file, "w").write("{}")
+
+        # When
+        service.authenticate()
+
+        # Then
+        service.client.login.assert_called_once_with(tokenstore=token_file)
+        assert service.is_authenticated()
+
+    def test_rejected_session_falls_back_to_login(self, token_file):
+        """Test that a rejected saved session triggers a full login."""
+        # Given
+        service = self.make_service(token_file)
+        os.makedirs(os.path.dirname(token_file))
+        open(token_file, "w").write("{}")
+        service.client.login.side_effect = [GarminConnectAuthenticationError("expired"), None]
+
+        # When
+        service.authenticate()
+
+        # Then
+        assert service.client.login.call_args_list == [call(tokenstore=token_file), call()]
+        assert service.is_authenticated()
+
+    def test_rate_limited_resume_does_not_retry_login(self, token_file):
+        """Test that throttling while resuming does not fall back to the password login."""
+        # Given
+        service = self.make_service(token_file)
+        os.makedirs(os.path.dirname(token_file))
+        open(token_file, "w").write("{}")
+        service.client.login.side_effect = GarminConnectTooManyRequestsError("slow down")
+
+        # When & Then
+        with pytest.raises(GarminConnectTooManyRequestsError):
+            service.authenticate()
+        service.client.login.assert_called_once_with(tokenstore=token_file)
+
+    def test_directory_token_store(self, tmp_path):
+        """Test that a directory token store uses garminconnect's token file name."""
+        # Given
+        service = self.make_service(str(tmp_path))
+
+        # When
+        service.authenticate()
+
+        # Then
+        assert os.path.exists(tmp_path / "garmin_tokens.json")
+
+
+class TestGarminServiceUploadMany:
+    """Test cases for concurrent uploads with retries."""
+
+    @pytest.fixture
+    def sleeps(self):
+        """Record the delays the retry policy waits for."""
+        return []
+
+    @pytest.fixture
+    def garmin_service(self, sleeps):
+        """Create an authenticated GarminService whose retries do not sleep."""
+        with patch('services.garmin_service.Garmin'):
+            retry = RetryPolicy(max_attempts=3, backoff_factor=1.0, failure_threshold=None, sleep=sleeps.append)
+            service = GarminService("test_user", "test_pass", retry=retry)
+        service._authenticated = True
+        return service
+
+    def test_upload_many_success(self, garmin_service):
+        """Test that every upload is posted and reported."""
+        # Given
+        garmin_service.client.client.post.side_effect = lambda *args, files, api: {"name": files["file"][0]}
+        uploads = [(f"data{i}".encode(), f"activity_{i}.fit") for i in range(5)]
+
+        # When
+        results = sorted(garmin_service.upload_many(uploads, max_workers=2))
+
+        # Then
+        assert [result.index for result in results] == [0, 1, 2, 3, 4]
+        assert all(result.error is None and result.attempts == 1 for result in results)
+        assert results[3].response == {"name": "activity_3.fit"}
+        assert garmin_service.client.client.post.call_count == 5
+
+    def test_upload_many_retries_transient_errors(self, garmin_service, sleeps):
+        """Test that connection errors and 5xx responses are retried with backoff."""
+        # Given
+        garmin_service.client.client.post.side_effect = [
+            requests.ConnectionError("reset"),
+            GarminConnectConnectionError("API Error 503 - unavailable"),
+            {"status": "ok"},
+        ]
+
+        # When
+        result, = garmin_service.upload_many([(b"data", "activity.fit")])
+
+        # Then
+        assert result.response == {"status": "ok"}
+        assert result.attempts == 3
+        assert len(sleeps) == 2
+
+    def test_upload_many_gives_up_after_max_attempts(self, garmin_service):
+        """Test that an upload failing every attempt is reported as failed."""
+        # Given
+        garmin_service.client.client.post.side_effect = requests.ConnectionError("reset")
+
+        # When
+        result, = garmin_service.upload_many([(b"data", "activity.fit")])
+
+        # Then
+        assert isinstance(result.error, requests.ConnectionError)
+        assert result.attempts == 3
+
+    def test_upload_many_does_not_retry_rejected_uploads(self, garmin_service):
+        """Test that client errors fail without retrying."""
+        # Given
+        garmin_service.client.client.post.side_effect = [
+            GarminConnectConnectionError("API Error 400 - Invalid file."),
+            {"status": "ok"},
+        ]
+
+        # When
+        results = sorted(garmin_service.upload_many([(b"bad", "bad.fit"), (b"new", "new.fit")], max_workers=1))
+
+        # Then
+        assert isinstance(results[0].error, GarminConnectConnectionError)
+        assert results[0].attempts == 1
+        assert results[1].response == {"status": "ok"}
+
+    def test_upload_many_reports_duplicates(self, garmin_service):
+        """Test that an upload Garmin Connect rejects as a duplicate is reported as such, not as failed."""
+        # Given
+        garmin_service.client.client.post.side_effect = GarminConnectConnectionError(
+            "API Error 409 - Duplicate Activity."
+        )
+
+        # When
+        results = list(garmin_service.upload_many([(b"dup", "dup.fit")], max_workers=1))
+
+        # Then
+        assert results[0].duplicate is True
+        assert results[0].error is None
+        assert results[0].attempts == 1
+
+    def test_upload_many_slows_down_when_rate_limited(self, garmin_service, sleeps):
+        """Test that 429s pause the queue with a growing delay instead of failing uploads."""
+        # Given
+        garmin_service.client.client.post.side_effect = [
+            GarminConnectTooManyRequestsError("slow down"),
+            GarminConnectConnectionError("API Error 429 - Too Many Requests"),
+            GarminConnectConnectionError("API Error 429 - Too Many Requests"),
+            {"status": "ok"},
+        ]
+
+        # When
+        result, = garmin_service.upload_many([(b"data", "activity.fit")])
+
+        # Then
+        assert result.response == {"status": "ok"}
+        assert result.attempts == 4
+        assert sleeps == pytest.approx([30.0, 60.0, 120.0], abs=1)
+        assert garmin_service._throttle_delay == 0
+
+    def test_upload_many_not_authenticated(self, garmin_service):
+        """Test that uploads require authentication."""
+        # Given
+        garmin_service._authenticated = False
+
+        # When & Then
+        with pytest.raises(RuntimeError, match="Must authenticate before uploading activities"):
+            list(garmin_service.upload_many([(b"data", "activity.fit")]))
@@ -3,7 +3,10 @@
 import pytest
 from unittest.mock import Mock, patch
 import os
-from main import main
+import signal
+from main import main, watch
+from services.watch import AdaptivePollInterval
+from services.batch import AccountResult
 
 
 class TestMain:
@@ -47,7 +50,7 @@ class TestMain:
         mock_processor.assert_called_once_with(
             mock_zwift_instance, mock_fit_instance, mock_garmin_instance
         )
-        mock_processor_instance.process_latest_activity.assert_called_once()
+        mock_processor_instance.process_latest_activity.assert_called_once_with(in_memory=True)
 
     @patch.dict(os.environ, {
         'ZWIFT_USERNAME': 'zwift_user',
@@ -74,6 +77,342 @@ class TestMain:
 
         assert exc_info.value.code == 1
 
+    @patch.dict(os.environ, {
+        'ZWIFT_USERNAME': 'zwift_user',
+        'ZWIFT_PASSWORD': 'zwift_pass',
+        'GARMIN_USERNAME': 'garmin_user',
+        'GARMIN_PASSWORD': 'garmin_pass',
+        'SYNC_STATE_DB': '/tmp/state.db'
+    })
+    @patch('main.SyncStateStore')
+    @patch('main.ActivityProcessor')
+    @patch('main.GarminService')
+    @patch('main.FitFileService')
+    @patch('main.ZwiftService')
+    @patch('main.load_dotenv')
+    def test_main_sync_new_activities(self, mock_load_dotenv, mock_zwift_service, mock_fit_service,
+                                      mock_garmin_service, mock_processor, mock_state_store):
+        """Test that a state database switches to syncing all new activities."""
+        # Given
+        mock_processor_instance = Mock()
+        mock_processor.return_value = mock_processor_instance
+        mock_processor_instance.process_new_activities.return_value = True
+
+        # When
+        main()
+
+        # Then
+        mock_state_store.assert_called_once_with('/tmp/state.db')
+        mock_processor.assert_called_once_with(
+            mock_zwift_service.return_value, mock_fit_service.return_value,
+            mock_garmin_service.return_value, mock_state_store.return_value
+        )
+        mock_processor_instance.process_new_activities.assert_called_once_with(pipeline=False)
+        mock_processor_instance.process_latest_activity.assert_not_called()
+        mock_state_store.return_value.close.assert_called_once()
+
+    @patch.dict(os.environ, {
+        'ZWIFT_USERNAME': 'zwift_user',
+        'ZWIFT_PASSWORD': 'zwift_pass',
+        'GARMIN_USERNAME': 'garmin_user',
+        'GARMIN_PASSWORD': 'garmin_pass',
+        'SYNC_STATE_DB': '/tmp/state.db',
+        'SYNC_PIPELINE': 'true'
+    })
+    @patch('main.SyncStateStore')
+    @patch('main.ActivityProcessor')
+    @patch('main.GarminService')
+    @patch('main.FitFileService')
+    @patch('main.ZwiftService')
+    @patch('main.load_dotenv')
+    def test_main_sync_pipeline(self, mock_load_dotenv, mock_zwift_service, mock_fit_service,
+                                mock_garmin_service, mock_processor, mock_state_store):
+        """Test that SYNC_PIPELINE switches to the pipelined sync."""
+        # Given
+        mock_processor.return_value.process_new_activities.return_value = True
+
+        # When
+        main()
+
+        # Then
+        mock_processor.return_value.process_new_activities.assert_called_once_with(pipeline=True)
+
+    @patch.dict(os.environ, {
+        'ZWIFT_USERNAME': 'zwift_user',
+        'ZWIFT_PASSWORD': 'zwift_pass',
+        'GARMIN_USERNAME': 'garmin_user',
+        'GARMIN_PASSWORD': 'garmin_pass',
+        'ZWIFT_TOKEN_CACHE': '/tmp/zwift_tokens.json'
+    })
+    @patch('main.ZwiftTokenCache')
+    @patch('main.ActivityProcessor')
+    @patch('main.GarminService')
+    @patch('main.FitFileService')
+    @patch('main.ZwiftService')
+    @patch('main.load_dotenv')
+    def test_main_zwift_token_cache(self, mock_load_dotenv, mock_zwift_service, mock_fit_service,
+                                    mock_garmin_service, mock_processor, mock_token_cache):
+        """Test that a token cache path is passed to the Zwift service."""
+        # Given
+        mock_processor.return_value.process_latest_activity.return_value = True
+
+        # When
+        main()
+
+        # Then
+        mock_token_cache.assert_called_once_with('/tmp/zwift_tokens.json')
+        mock_zwift_service.assert_called_once_with(
+            'zwift_user', 'zwift_pass', token_cache=mock_token_cache.return_value
+        )
+
+    @patch.dict(os.environ, {
+        'ZWIFT_USERNAME': 'zwift_user',
+        'ZWIFT_PASSWORD': 'zwift_pass',
+        'GARMIN_USERNAME': 'garmin_user',
+        'GARMIN_PASSWORD': 'garmin_pass',
+        'RATE_LIMIT_DB': '/tmp/rate_limits.db'
+    })
+    @patch('main.SqliteRateLimiter')
+    @patch('main.ActivityProcessor')
+    @patch('main.GarminService')
+    @patch('main.FitFileService')
+    @patch('main.ZwiftService')
+    @patch('main.load_dotenv')
+    def test_main_shared_rate_limiter(self, mock_load_dotenv, mock_zwift_service, mock_fit_service,
+                                      mock_garmin_service, mock_processor, mock_rate_limiter):
+        """Test that one rate limiter is shared by the Zwift and Garmin services."""
+        # Given
+        mock_processor.return_value.process_latest_activity.return_value = True
+
+        # When
+        main()
+
+        # Then
+        mock_rate_limiter.assert_called_once_with('/tmp/rate_limits.db')
+        limiter = mock_rate_limiter.return_value
+        mock_zwift_service.assert_called_once_with('zwift_user', 'zwift_pass', rate_limiter=limiter)
+        mock_garmin_service.assert_called_once_with('garmin_user', 'garmin_pass', rate_limiter=limiter)
+
+    @patch.dict(os.environ, {
+        'ZWIFT_USERNAME': 'zwift_user',
+        'ZWIFT_PASSWORD': 'zwift_pass',
+        'GARMIN_USERNAME': 'garmin_user',
+        'GARMIN_PASSWORD': 'garmin_pass',
+        'FIT_CACHE_DIR': '/tmp/fit_cache'
+    })
+    @patch('main.FitFileCache')
+    @patch('main.ActivityProcessor')
+    @patch('main.GarminService')
+    @patch('main.FitFileService')
+    @patch('main.ZwiftService')
+    @patch('main.load_dotenv')
+    def test_main_fit_cache(self, mock_load_dotenv, mock_zwift_service, mock_fit_service,
+                            mock_garmin_service, mock_processor, mock_fit_cache):
+        """Test that one FIT cache is shared by the download and the modification."""
+        # Given
+        mock_processor.return_value.process_latest_activity.return_value = True
+
+        # When
+        main()
+
+        # Then
+        mock_fit_cache.assert_called_once_with('/tmp/fit_cache')
+        mock_zwift_service.assert_called_once_with('zwift_user', 'zwift_pass', fit_cache=mock_fit_cache.return_value)
+        mock_fit_service.assert_called_once_with(cache=mock_fit_cache.return_value)
+
+    @patch.dict(os.environ, {
+        'ZWIFT_USERNAME': 'zwift_user',
+        'ZWIFT_PASSWORD': 'zwift_pass',
+        'GARMIN_USERNAME': 'garmin_user',
+        'GARMIN_PASSWORD': 'garmin_pass',
+        'GARMIN_TOKEN_STORE': '~/.garminconnect'
+    })
+    @patch('main.ActivityProcessor')
+    @patch('main.GarminService')
+    @patch('main.FitFileService')
+    @patch('main.ZwiftService')
+    @patch('main.load_dotenv')
+    def test_main_garmin_token_store(self, mock_load_dotenv, mock_zwift_service, mock_fit_service,
+                                     mock_garmin_service, mock_processor):
+        """Test that the Garmin token store path is passed to the Garmin service."""
+        # Given
+        mock_processor.return_value.process_latest_activity.return_value = True
+
+        # When
+        main()
+
+        # Then
+        mock_garmin_service.assert_called_once_with('garmin_user', 'garmin_pass', token_store='~/.garminconnect')
+
+    @patch.dict(os.environ, {
+        'ZWIFT_USERNAME': 'zwift_user',
+        'ZWIFT_PASSWORD': 'zwift_pass',
+        'GARMIN_USERNAME': 'garmin_user',
+        'GARMIN_PASSWORD': 'garmin_pass',
+        'GARMIN_INDEX_DB': '/tmp/garmin_index.db'
+    })
+    @patch('main.GarminActivityIndex')
+    @patch('main.ActivityProcessor')
+    @patch('main.GarminService')
+    @patch('main.FitFileService')
+    @patch('main.ZwiftService')
+    @patch('main.load_dotenv')
+    def test_main_garmin_index(self, mock_load_dotenv, mock_zwift_service, mock_fit_service,
+                               mock_garmin_service, mock_processor, mock_garmin_index):
+        """Test that the Garmin activity index is passed to the processor and closed."""
+        # Given
+        mock_processor.return_value.process_latest_activity.return_value = True
+
+        # When
+        main()
+
+        # Then
+        mock_garmin_index.assert_called_once_with('/tmp/garmin_index.db')
+        mock_processor.assert_called_once_with(
+            mock_zwift_service.return_value, mock_fit_service.return_value,
+            mock_garmin_service.return_value, garmin_index=mock_garmin_index.return_value
+        )
+        mock_garmin_index.return_value.close.assert_called_once()
+
+    @patch.dict(os.environ, {
+        'ZWIFT_USERNAME': 'zwift_user',
+        'ZWIFT_PASSWORD': 'zwift_pass',
+        'GARMIN_USERNAME': 'garmin_user',
+        'GARMIN_PASSWORD': 'garmin_pass',
+        'SYNC_STATE_DB': '/tmp/state.db'
+    })
+    @patch('main.watch')
+    @patch('main.SyncStateStore')
+    @patch('main.ActivityProcessor')
+    @patch('main.GarminService')
+    @patch('main.FitFileService')
+    @patch('main.ZwiftService')
+    @patch('main.load_dotenv')
+    def test_main_watch(self, mock_load_dotenv, mock_zwift_service, mock_fit_service,
+                        mock_garmin_service, mock_processor, mock_state_store, mock_watch):
+        """Test that --watch polls with a processor keeping its sessions."""
+        # When
+        main(['--watch', '--min-interval', '30', '--max-interval', '600'])
+
+        # Then
+        mock_processor.assert_called_once_with(
+            mock_zwift_service.return_value, mock_fit_service.return_value,
+            mock_garmin_service.return_value, mock_state_store.return_value,
+            keep_sessions=True, lazy_garmin_auth=True
+        )
+        processor, interval, pipeline = mock_watch.call_args.args
+        assert processor == mock_processor.return_value
+        assert (interval.min_interval, interval.max_interval) == (30, 600)
+        assert pipeline is False
+        mock_processor.return_value.process_new_activities.assert_not_called()
+        mock_state_store.return_value.close.assert_called_once()
+
+    @patch.dict(os.environ, {
+        'ZWIFT_USERNAME': 'zwift_user',
+        'ZWIFT_PASSWORD': 'zwift_pass',
+        'GARMIN_USERNAME': 'garmin_user',
+        'GARMIN_PASSWORD': 'garmin_pass'
+    })
+    @patch('main.load_dotenv')
+    def test_main_watch_requires_state_db(self, mock_load_dotenv):
+        """Test that --watch refuses to run without a state database."""
+        with pytest.raises(ValueError, match="Watch mode requires SYNC_STATE_DB"):
+            main(['--watch'])
+
+    @patch.dict(os.environ, {
+        'ZWIFT_USERNAME': 'zwift_user',
+        'ZWIFT_PASSWORD': 'zwift_pass',
+        'GARMIN_USERNAME': 'garmin_user',
+        'GARMIN_PASSWORD': 'garmin_pass',
+        'SYNC_STATE_DB': '/tmp/sync_state.db'
+    })
+    @patch('main.SyncStateStore')
+    @patch('main.ActivityProcessor')
+    @patch('main.GarminService')
+    @patch('main.FitFileService')
+    @patch('main.ZwiftService')
+    @patch('main.load_dotenv')
+    def test_main_backfill(self, mock_load_dotenv, mock_zwift_service, mock_fit_service,
+                           mock_garmin_service, mock_processor, mock_state_store, capsys):
+        """Test that --backfill transfers the whole history and prints the throughput."""
+        # Given
+        mock_processor.return_value.backfill.return_value = True
+        mock_processor.return_value.last_backfill = "3 transferred"
+
+        # When
+        main(['--backfill', '--workers', '8'])
+
+        # Then
+        mock_processor.return_value.backfill.assert_called_once_with(workers=8)
+        mock_processor.return_value.process_new_activities.assert_not_called()
+        assert "Backfill: 3 transferred" in capsys.readouterr().out
+        mock_state_store.return_value.close.assert_called_once()
+
+    @patch.dict(os.environ, {
+        'ZWIFT_USERNAME': 'zwift_user',
+        'ZWIFT_PASSWORD': 'zwift_pass',
+        'GARMIN_USERNAME': 'garmin_user',
+        'GARMIN_PASSWORD': 'garmin_pass'
+    })
+    @patch('main.load_dotenv')
+    def test_main_backfill_requires_state_db(self, mock_load_dotenv):
+        """Test that --backfill refuses to run without a state database to checkpoint to."""
+        with pytest.raises(ValueError, match="Backfill requires SYNC_STATE_DB"):
+            main(['--backfill'])
+
+    @patch.dict(os.environ, {'ZWIFT_USERNAME': '', 'RATE_LIMIT_DB': '/tmp/rate_limit.db'})
+    @patch('main.BatchRunner')
+    @patch('main.load_accounts')
+    @patch('main.load_dotenv')
+    def test_main_accounts(self, mock_load_dotenv, mock_load_accounts, mock_runner, capsys):
+        """Test that --accounts syncs the configured accounts without the .env credentials."""
+        # Given
+        mock_runner.return_value.run.return_value = [AccountResult("alice", True, 2, 1.5, None)]
+
+        # When
+        main(['--accounts', 'accounts.json', '--workers', '2', '--work-dir', '/tmp/work'])
+
+        # Then
+        mock_load_accounts.assert_called_once_with('accounts.json')
+        accounts, options = mock_runner.call_args.args
+        assert accounts == mock_load_accounts.return_value
+        assert options.work_dir == '/tmp/work'
+        assert options.rate_limit_db == '/tmp/rate_limit.db'
+        assert mock_runner.call_args.kwargs == {'max_workers': 2}
+        assert "1 of 1 accounts synced" in capsys.readouterr().out
+
+    @patch('main.BatchRunner')
+    @patch('main.load_accounts')
+    @patch('main.load_dotenv')
+    def test_main_accounts_failure(self, mock_load_dotenv, mock_load_accounts, mock_runner):
+        """Test that main exits with an error when an account fails."""
+        # Given
+        mock_runner.return_value.run.return_value = [
+            AccountResult("alice", True, 0, 1.0, None),
+            AccountResult("bob", False, 0, 1.0, "Login failed"),
+        ]
+
+        # When & Then
+        with pytest.raises(SystemExit) as exc_info:
+            main(['--accounts', 'accounts.json'])
+
+        assert exc_info.value.code == 1
+
+    def test_watch_stops_on_sigterm(self):
+        """Test that SIGTERM stops the watcher after the current run and restores the handler."""
+        # Given
+        processor = Mock()
+        processor.last_new_activities = 0
+        processor.process_new_activities.side_effect = lambda *args, **kwargs: os.kill(os.getpid(), signal.SIGTERM)
+        previous_handler = signal.getsignal(signal.SIGTERM)
+
+        # When
+        watch(processor, AdaptivePollInterval(min_interval=3600), pipeline=False)
+
+        # Then
+        processor.process_new_activities.assert_called_once()
+        assert signal.getsignal(signal.SIGTERM) == previous_handler
+
     @patch.dict(os.environ, {
         'ZWIFT_USERNAME': '',
         'ZWIFT_PASSWORD': 'zwift_pass',
@@ -0,0 +1,18 @@
+"""Tests for the process pool helper."""
+
+import os
+from services.process_pool import create_process_pool
+
+
+class TestCreateProcessPool:
+    """Test cases for create_process_pool."""
+
+    def test_create_process_pool_does_not_fork(self):
+        """Test that workers are not forked from the calling process."""
+        # When
+        with create_process_pool(1) as pool:
+            pid = pool.submit(os.getpid).result(timeout=30)
+
+        # Then
+        assert pool._mp_context.get_start_method() in ("forkserver", "spawn")
+        assert pid != os.getpid()
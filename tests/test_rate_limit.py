@@ -0,0 +1,112 @@
+"""Tests for the token bucket rate limiters."""
+
+from unittest.mock import Mock
+
+import responses
+
+from services.garmin_service import GarminService
+from services.rate_limit import RateLimiter, SqliteRateLimiter
+from services.zwift.request import ZwiftApiRequest
+
+
+class FakeClock:
+    """Clock advanced by the limiter's own sleeps."""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class TestRateLimiter:
+    """Tests for RateLimiter."""
+
+    def test_allows_burst_then_waits_for_refill(self):
+        """Test that a full bucket serves a burst and then paces calls at the rate."""
+        # Given
+        clock = FakeClock()
+        limiter = RateLimiter(rate=2.0, burst=3, sleep=clock.sleep, clock=clock.time)
+
+        # When
+        waits = [limiter.acquire("api.test") for _ in range(5)]
+
+        # Then
+        assert waits == [0.0, 0.0, 0.0, 0.5, 0.5]
+
+    def test_buckets_are_per_host_with_overrides(self):
+        """Test that hosts have independent buckets and per-host limits."""
+        # Given
+        clock = FakeClock()
+        limiter = RateLimiter(rate=1.0, burst=1, limits={"slow.test": (0.1, 1)},
+                              sleep=clock.sleep, clock=clock.time)
+        limiter.acquire("fast.test")
+        limiter.acquire("slow.test")
+
+        # When
+        fast_wait = limiter.acquire("fast.test")
+        slow_wait = limiter.acquire("slow.test")
+
+        # Then
+        assert fast_wait == 1.0
+        assert slow_wait == 9.0
+
+    def test_host_of_url(self):
+        """Test that URLs map to their host's bucket."""
+        assert RateLimiter.host("https://us-or-rly101.zwift.com/api/profiles/me") == "us-or-rly101.zwift.com"
+
+
+class TestSqliteRateLimiter:
+    """Tests for SqliteRateLimiter."""
+
+    def test_buckets_are_shared_between_instances(self, tmp_path):
+        """Test that limiters on the same database draw from the same bucket."""
+        # Given
+        clock = FakeClock()
+        db_path = str(tmp_path / "limits.db")
+        first = SqliteRateLimiter(db_path, rate=1.0, burst=2, sleep=clock.sleep, clock=clock.time)
+        second = SqliteRateLimiter(db_path, rate=1.0, burst=2, sleep=clock.sleep, clock=clock.time)
+
+        # When
+        waits = [first.acquire("api.test"), second.acquire("api.test"), first.acquire("api.test")]
+
+        # Then
+        assert waits == [0.0, 0.0, 1.0]
+        first.close()
+        second.close()
+
+
+class TestRateLimitedCalls:
+    """Tests that the HTTP callers acquire from the limiter."""
+
+    @responses.activate
+    def test_zwift_request_acquires_per_host(self):
+        """Test that ZwiftApiRequest acquires the API host's bucket before the call."""
+        # Given
+        responses.add(responses.GET, f"{ZwiftApiRequest.BASE_URL}/api/profiles/me", json={"id": 1})
+        limiter = Mock(spec=RateLimiter)
+
+        # When
+        ZwiftApiRequest(lambda: "token", rate_limiter=limiter).get_json("/api/profiles/me")
+
+        # Then
+        limiter.acquire.assert_called_once_with("us-or-rly101.zwift.com")
+
+    def test_garmin_upload_acquires(self):
+        """Test that Garmin uploads acquire the upload bucket."""
+        # Given
+        limiter = Mock(spec=RateLimiter)
+        service = GarminService("user", "pass", rate_limiter=limiter)
+        service.client = Mock()
+        service._authenticated = True
+
+        # When
+        service.upload_activity_bytes(b"data", "activity.fit")
+
+        # Then
+        limiter.acquire.assert_called_once_with(GarminService.UPLOAD_HOST)
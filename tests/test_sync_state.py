@@ -0,0 +1,71 @@
+"""Tests for SyncStateStore."""
+
+import pytest
+from services.sync_state import SyncStateStore
+
+
+class TestSyncStateStore:
+    """Test cases for SyncStateStore."""
+
+    @pytest.fixture
+    def store(self, tmp_path):
+        """Create a SyncStateStore backed by a temporary database."""
+        store = SyncStateStore(str(tmp_path / "state.db"))
+        yield store
+        store.close()
+
+    def test_unknown_activity(self, store):
+        """Test that unknown activities are not synced."""
+        assert store.get(123) is None
+        assert store.is_synced(123) is False
+
+    def test_mark_uploaded(self, store):
+        """Test recording a successful upload."""
+        # When
+        store.mark_uploaded({"id": 123, "fitFileKey": "key.fit"}, garmin_activity_id=987)
+
+        # Then
+        assert store.is_synced(123) is True
+        state = store.get("123")
+        assert state["status"] == SyncStateStore.STATUS_UPLOADED
+        assert state["fit_file_key"] == "key.fit"
+        assert state["garmin_activity_id"] == "987"
+
+    def test_mark_failed(self, store):
+        """Test that failed activities are not considered synced."""
+        # When
+        store.mark_failed({"id": 123}, "Upload failed")
+
+        # Then
+        assert store.is_synced(123) is False
+        assert store.get(123)["error"] == "Upload failed"
+
+    def test_retry_after_failure(self, store):
+        """Test that a later success overrides a failure."""
+        # Given
+        store.mark_failed({"id": 123}, "Upload failed")
+        created_at = store.get(123)["created_at"]
+
+        # When
+        store.mark_uploaded({"id": 123})
+
+        # Then
+        state = store.get(123)
+        assert state["status"] == SyncStateStore.STATUS_UPLOADED
+        assert state["error"] is None
+        assert state["created_at"] == created_at
+
+    def test_state_persists_across_instances(self, tmp_path):
+        """Test that the state is kept on disk between runs."""
+        # Given
+        db_path = str(tmp_path / "state.db")
+        first = SyncStateStore(db_path)
+        first.mark_uploaded({"id": 123})
+        first.close()
+
+        # When
+        second = SyncStateStore(db_path)
+
+        # Then
+        assert second.is_synced(123) is True
+        second.close()
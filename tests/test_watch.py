@@ -0,0 +1,80 @@
+"""Tests for the watch mode."""
+
+import pytest
+from unittest.mock import Mock
+from services.activity_processor import ActivityProcessor
+from services.watch import ActivityWatcher, AdaptivePollInterval
+
+
+class TestAdaptivePollInterval:
+    """Test cases for AdaptivePollInterval."""
+
+    def test_backs_off_while_idle(self):
+        """Test that idle polls double the interval up to the maximum."""
+        # Given
+        interval = AdaptivePollInterval(min_interval=60, max_interval=300)
+
+        # When
+        delays = [interval.next(False) for _ in range(5)]
+
+        # Then
+        assert delays == [60, 120, 240, 300, 300]
+
+    def test_new_activities_reset_to_minimum(self):
+        """Test that finding new activities brings polling back to the minimum interval."""
+        # Given
+        interval = AdaptivePollInterval(min_interval=60, max_interval=300)
+        interval.next(False)
+        interval.next(False)
+
+        # When & Then
+        assert interval.next(True) == 60
+        assert interval.next(False) == 120
+
+
+class TestActivityWatcher:
+    """Test cases for ActivityWatcher."""
+
+    @pytest.fixture
+    def processor(self):
+        """Create a mock processor."""
+        processor = Mock(spec=ActivityProcessor)
+        processor.last_new_activities = 0
+        return processor
+
+    def test_polls_until_stopped(self, processor):
+        """Test that the watcher keeps polling and stops after the current run."""
+        # Given
+        interval = Mock(spec=AdaptivePollInterval)
+        interval.next.return_value = 0
+        watcher = ActivityWatcher(processor, interval, max_activities=5, pipeline=True)
+        results = iter([True, False, True])
+
+        def process_new_activities(max_activities, pipeline):
+            processor.last_new_activities = 1 if processor.process_new_activities.call_count == 1 else 0
+            if processor.process_new_activities.call_count == 3:
+                watcher.stop()
+            return next(results)
+
+        processor.process_new_activities.side_effect = process_new_activities
+
+        # When
+        watcher.run()
+
+        # Then
+        assert processor.process_new_activities.call_count == 3
+        processor.process_new_activities.assert_called_with(5, pipeline=True)
+        assert [call.args for call in interval.next.call_args_list] == [(True,), (False,), (False,)]
+        assert watcher.stopped
+
+    def test_stopped_watcher_does_not_poll(self, processor):
+        """Test that a watcher stopped before running does nothing."""
+        # Given
+        watcher = ActivityWatcher(processor)
+        watcher.stop()
+
+        # When
+        watcher.run()
+
+        # Then
+        processor.process_new_activities.assert_not_called()
@@ -109,3 +109,71 @@ class TestZwiftActivities:
 
         # Then
         assert player_id == "99999"
+
+
+class TestZwiftActivitiesIterator:
+    """Tests for ZwiftActivities.iter_activities."""
+
+    ACTIVITIES_URL = f"{ZwiftApiRequest.BASE_URL}/api/profiles/99999/activities"
+
+    @pytest.fixture
+    def activities(self):
+        """Create a ZwiftActivities instance with an explicit player ID."""
+        return ZwiftActivities("99999", lambda: "test_token")
+
+    def _add_page(self, start, limit, ids):
+        """Register a mocked activities page."""
+        responses.add(
+            responses.GET,
+            f"{self.ACTIVITIES_URL}?start={start}&limit={limit}",
+            json=[{"id": activity_id} for activity_id in ids],
+            status=200,
+        )
+
+    @pytest.mark.parametrize("prefetch", [True, False])
+    @responses.activate
+    def test_iter_activities_across_pages(self, activities, prefetch):
+        """Test that pages are walked with a growing page size."""
+        # Given
+        self._add_page(0, 2, [10, 9])
+        self._add_page(2, 4, [8, 7, 6, 5])
+        self._add_page(6, 5, [4, 3])
+
+        # When
+        result = [a["id"] for a in activities.iter_activities(page_size=2, max_page_size=5, prefetch=prefetch)]
+
+        # Then
+        assert result == [10, 9, 8, 7, 6, 5, 4, 3]
+        assert len(responses.calls) == 3
+
+    @responses.activate
+    def test_iter_activities_stop_predicate(self, activities):
+        """Test that iteration ends at the first activity matching the predicate."""
+        # Given
+        self._add_page(0, 3, [10, 9, 8])
+        self._add_page(3, 6, [7, 6])
+
+        # When
+        result = [a["id"] for a in activities.iter_activities(page_size=3, stop=lambda a: a["id"] == 9)]
+
+        # Then
+        assert result == [10]
+
+    @responses.activate
+    def test_iter_activities_empty_history(self, activities):
+        """Test iterating over a player without activities."""
+        # Given
+        self._add_page(0, 10, [])
+
+        # When & Then
+        assert list(activities.iter_activities()) == []
+
+    @responses.activate
+    def test_iter_activities_is_lazy(self, activities):
+        """Test that no page is requested before iteration starts."""
+        # When
+        iterator = activities.iter_activities()
+
+        # Then
+        assert len(responses.calls) == 0
+        iterator.close()
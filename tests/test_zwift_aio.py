@@ -0,0 +1,318 @@
+"""Tests for the asyncio Zwift client against a local stub server."""
+
+import json
+import asyncio
+import threading
+import aiohttp
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from services.zwift import ZwiftApiError, ZwiftAuthError, ZwiftResponseCache, ZwiftTokenCache
+from services.zwift.aio import AsyncZwiftApiRequest, AsyncZwiftAuth, AsyncZwiftClient
+
+
+class ZwiftStub:
+    """Local stand-in for the Zwift auth server, API and S3."""
+
+    def __init__(self, activities=None, auth_status=200):
+        self.activities = activities if activities is not None else []
+        self.auth_status = auth_status
+        self.token_requests = []
+        self.api_requests = []
+        self.server = None
+
+    def app(self):
+        app = web.Application()
+        app.router.add_post("/auth", self.auth)
+        app.router.add_get("/api/profiles/me", self.me)
+        app.router.add_get("/api/profiles/{player_id}/activities", self.list_activities)
+        app.router.add_get("/s3/{bucket}/{key}", self.download)
+        return app
+
+    async def auth(self, request):
+        self.token_requests.append(dict(await request.post()))
+        if self.auth_status != 200:
+            return web.Response(status=self.auth_status, text="invalid_grant")
+        return web.json_response({"access_token": "token", "refresh_token": "refresh",
+                                  "expires_in": 3600, "refresh_expires_in": 86400})
+
+    async def me(self, request):
+        self.api_requests.append(request.path_qs)
+        if request.headers.get("If-None-Match") == '"me-v1"':
+            return web.Response(status=304)
+        return web.json_response({"id": 12345}, headers={"ETag": '"me-v1"'})
+
+    async def list_activities(self, request):
+        self.api_requests.append(request.path_qs)
+        start = int(request.query["start"])
+        limit = int(request.query["limit"])
+        return web.json_response(self.activities[start:start + limit])
+
+    async def download(self, request):
+        if request.match_info["key"] == "missing":
+            return web.Response(status=404)
+        if request.match_info["key"] in ("slow", "stalled"):
+            return await self.trickle(request, 0.1 if request.match_info["key"] == "slow" else 0.6)
+        return web.Response(body=f"fit:{request.match_info['key']}".encode())
+
+    async def trickle(self, request, delay):
+        """Send a body in small chunks, delay seconds apart."""
+        response = web.StreamResponse()
+        await response.prepare(request)
+        for _ in range(6):
+            await asyncio.sleep(delay)
+            await response.write(b"chunk")
+        await response.write_eof()
+        return response
+
+    async def __aenter__(self):
+        self.server = TestServer(self.app())
+        await self.server.start_server()
+        url = str(self.server.make_url(""))
+        self.patch.setattr(AsyncZwiftAuth, "AUTH_URL", f"{url}/auth")
+        self.patch.setattr(AsyncZwiftApiRequest, "BASE_URL", url)
+        self.patch.setattr(AsyncZwiftClient, "S3_URL", url + "/s3/{bucket}/{key}")
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.server.close()
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    """Stub server whose URLs replace the real Zwift and S3 endpoints."""
+    server = ZwiftStub()
+    server.patch = monkeypatch
+    return server
+
+
+def make_activities(count):
+    return [{"id": i, "fitFileBucket": "bucket", "fitFileKey": f"key{i}"} for i in range(count)]
+
+
+class TestAsyncZwiftAuth:
+    """Tests for AsyncZwiftAuth."""
+
+    def test_concurrent_callers_share_one_token_fetch(self, stub):
+        """Test that tasks asking for a token at once trigger a single fetch."""
+        async def scenario():
+            async with stub, AsyncZwiftClient("user@test.com", "password123") as client:
+                # When
+                tokens = await asyncio.gather(*(client._auth.get_access_token() for _ in range(10)))
+            return tokens
+
+        # Given / When
+        tokens = asyncio.run(scenario())
+
+        # Then
+        assert tokens == ["token"] * 10
+        assert len(stub.token_requests) == 1
+        assert stub.token_requests[0]["grant_type"] == "password"
+
+    def test_auth_failure_raises(self, stub):
+        """Test that a rejected password grant raises ZwiftAuthError."""
+        # Given
+        stub.auth_status = 401
+
+        async def scenario():
+            async with stub, AsyncZwiftClient("user@test.com", "wrong") as client:
+                await client._auth.get_access_token()
+
+        # When / Then
+        with pytest.raises(ZwiftAuthError, match="401"):
+            asyncio.run(scenario())
+
+    @pytest.mark.parametrize("status, grants", [
+        (400, ["refresh_token", "password"]),
+        (503, ["refresh_token"]),
+    ])
+    def test_only_rejected_refresh_falls_back_to_password_grant(self, stub, status, grants):
+        """Test that the password grant follows a rejected refresh token, not a server failure."""
+        # Given
+        stub.auth_status = status
+
+        async def scenario():
+            async with stub, AsyncZwiftClient("user@test.com", "password123") as client:
+                client._auth._refresh_token = "refresh"
+                client._auth._refresh_token_expiration = 4102444800
+                await client._auth.get_access_token()
+
+        # When
+        with pytest.raises(ZwiftAuthError, match=str(status)):
+            asyncio.run(scenario())
+
+        # Then
+        assert [request["grant_type"] for request in stub.token_requests] == grants
+
+    def test_uses_cached_tokens(self, stub, tmp_path):
+        """Test that a valid cached token skips the auth server."""
+        # Given
+        cache = ZwiftTokenCache(str(tmp_path / "tokens.json"))
+        cache.save("user@test.com", access_token="cached", refresh_token="refresh",
+                   access_token_expiration=4102444800, refresh_token_expiration=4102444800)
+
+        async def scenario():
+            async with stub, AsyncZwiftClient("user@test.com", "password123", token_cache=cache) as client:
+                return await client._auth.get_access_token()
+
+        # When
+        token = asyncio.run(scenario())
+
+        # Then
+        assert token == "cached"
+        assert stub.token_requests == []
+
+
+class TestAsyncZwiftClient:
+    """Tests for AsyncZwiftClient."""
+
+    def test_iter_activities_pages_adaptively(self, stub):
+        """Test that async pagination doubles the page size and reads all pages."""
+        # Given
+        stub.activities = make_activities(25)
+
+        async def scenario():
+            async with stub, AsyncZwiftClient("user@test.com", "password123") as client:
+                return [a["id"] async for a in client.get_profile().iter_activities(page_size=5)]
+
+        # When
+        ids = asyncio.run(scenario())
+
+        # Then
+        assert ids == list(range(25))
+        assert stub.api_requests == [
+            "/api/profiles/me",
+            "/api/profiles/12345/activities?start=0&limit=5",
+            "/api/profiles/12345/activities?start=5&limit=10",
+            "/api/profiles/12345/activities?start=15&limit=20",
+        ]
+
+    def test_iter_activities_stops_at_predicate(self, stub):
+        """Test that iteration ends before the first activity matching stop."""
+        # Given
+        stub.activities = make_activities(30)
+
+        async def scenario():
+            async with stub, AsyncZwiftClient("user@test.com", "password123") as client:
+                activities = client.get_profile("12345").iter_activities(
+                    page_size=10, stop=lambda a: a["id"] == 3)
+                return [a["id"] async for a in activities]
+
+        # When
+        ids = asyncio.run(scenario())
+
+        # Then
+        assert ids == [0, 1, 2]
+
+    def test_player_id_is_resolved_once_and_revalidated(self, stub):
+        """Test that "me" is resolved once per client and revalidated with the response cache."""
+        # Given
+        cache = ZwiftResponseCache()
+
+        async def scenario():
+            async with stub:
+                for _ in range(2):
+                    async with AsyncZwiftClient("user@test.com", "password123", response_cache=cache) as client:
+                        await client.get_player_id()
+                        await client.get_profile().get_activities()
+
+        # When
+        asyncio.run(scenario())
+
+        # Then
+        assert stub.api_requests.count("/api/profiles/me") == 2
+        assert json.loads(cache.get(f"{AsyncZwiftApiRequest.BASE_URL}/api/profiles/me").body) == {"id": 12345}
+
+    def test_cache_file_io_runs_off_the_event_loop(self, stub, tmp_path):
+        """Test that the token and response caches are only used from worker threads."""
+        # Given
+        threads = []
+
+        class RecordingTokenCache(ZwiftTokenCache):
+            def load(self, username):
+                threads.append(threading.get_ident())
+                return super().load(username)
+
+            def save(self, username, **fields):
+                threads.append(threading.get_ident())
+                super().save(username, **fields)
+
+        class RecordingResponseCache(ZwiftResponseCache):
+            def get(self, url):
+                threads.append(threading.get_ident())
+                return super().get(url)
+
+            def put(self, url, etag, last_modified, body):
+                threads.append(threading.get_ident())
+                super().put(url, etag, last_modified, body)
+
+        token_cache = RecordingTokenCache(str(tmp_path / "tokens.json"))
+        response_cache = RecordingResponseCache(directory=str(tmp_path / "responses"))
+
+        async def scenario():
+            async with stub, AsyncZwiftClient("user@test.com", "password123", token_cache=token_cache,
+                                              response_cache=response_cache) as client:
+                await client.get_player_id()
+                await client.invalidate_player_id()
+            return threading.get_ident()
+
+        # When
+        loop_thread = asyncio.run(scenario())
+
+        # Then
+        assert len(threads) >= 6
+        assert loop_thread not in threads
+
+    def test_download_activities_concurrently(self, stub):
+        """Test that several S3 downloads run on one session."""
+        # Given
+        activities = make_activities(5)
+
+        async def scenario():
+            async with stub, AsyncZwiftClient("user@test.com", "password123") as client:
+                return await asyncio.gather(*(client.download_activity_bytes(a) for a in activities))
+
+        # When
+        contents = asyncio.run(scenario())
+
+        # Then
+        assert contents == [f"fit:key{i}".encode() for i in range(5)]
+
+    def test_download_failure_raises(self, stub):
+        """Test that a failed S3 download raises ZwiftApiError."""
+        # Given
+        activity = {"id": 1, "fitFileBucket": "bucket", "fitFileKey": "missing"}
+
+        async def scenario():
+            async with stub, AsyncZwiftClient("user@test.com", "password123") as client:
+                await client.download_activity_bytes(activity)
+
+        # When / Then
+        with pytest.raises(ZwiftApiError, match="404"):
+            asyncio.run(scenario())
+
+    def test_download_timeout_only_bounds_reads(self, stub, monkeypatch):
+        """Test that a slow download outlasting the read timeout completes, while a stalled one fails."""
+        # Given
+        monkeypatch.setattr(AsyncZwiftClient, "DOWNLOAD_TIMEOUT", aiohttp.ClientTimeout(sock_connect=1, sock_read=0.3))
+
+        async def scenario(key):
+            async with stub, AsyncZwiftClient("user@test.com", "password123") as client:
+                return await client.download_activity_bytes({"id": 1, "fitFileBucket": "bucket", "fitFileKey": key})
+
+        # When / Then
+        assert asyncio.run(scenario("slow")) == b"chunk" * 6
+        with pytest.raises(ZwiftApiError, match="Failed to download activity"):
+            asyncio.run(scenario("stalled"))
+
+    def test_close_leaves_external_session_open(self, stub):
+        """Test that a caller-provided session is not closed by the client."""
+        async def scenario():
+            async with aiohttp.ClientSession() as session:
+                async with AsyncZwiftClient("user@test.com", "password123", session=session):
+                    pass
+                return session.closed
+
+        # When / Then
+        assert asyncio.run(scenario()) is False
@@ -1,11 +1,16 @@
 """Tests for Zwift authentication module."""
 
 import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import Mock
 import pytest
 import requests
 import responses
 
 from services.zwift.auth import ZwiftAuth, ZwiftAuthError
+from services.zwift.retry import CircuitOpenError, RetryPolicy
+from services.zwift.token_cache import ZwiftTokenCache
 
 
 class TestZwiftAuth:
@@ -167,3 +172,230 @@ class TestZwiftAuth:
         """Test _has_valid_access_token returns False when no token."""
         auth._access_token = None
         assert auth._has_valid_access_token() is False
+
+
+class TestZwiftAuthTokenCache:
+    """Tests for ZwiftAuth token persistence."""
+
+    TOKEN_RESPONSE = {
+        "access_token": "new_access_token",
+        "refresh_token": "new_refresh_token",
+        "expires_in": 3600,
+        "refresh_expires_in": 86400,
+    }
+
+    @pytest.fixture
+    def token_cache(self, tmp_path):
+        """Create a token cache in a temporary directory."""
+        return ZwiftTokenCache(str(tmp_path / "tokens.json"))
+
+    @responses.activate
+    def test_uses_cached_access_token(self, token_cache):
+        """Test that a valid cached access token skips the auth server."""
+        # Given
+        token_cache.save(
+            "test@example.com",
+            access_token="cached_token",
+            refresh_token="cached_refresh",
+            access_token_expiration=time.time() + 3600,
+            refresh_token_expiration=time.time() + 86400,
+        )
+        auth = ZwiftAuth("test@example.com", "testpassword", token_cache=token_cache)
+
+        # When
+        token = auth.get_access_token()
+
+        # Then
+        assert token == "cached_token"
+        assert len(responses.calls) == 0
+
+    @responses.activate
+    def test_uses_cached_refresh_token(self, token_cache):
+        """Test that an expired cached access token is renewed by refresh grant."""
+        # Given
+        token_cache.save(
+            "test@example.com",
+            access_token="expired_token",
+            refresh_token="cached_refresh",
+            access_token_expiration=time.time() - 100,
+            refresh_token_expiration=time.time() + 86400,
+        )
+        responses.add(responses.POST, ZwiftAuth.AUTH_URL, json=self.TOKEN_RESPONSE, status=200)
+        auth = ZwiftAuth("test@example.com", "testpassword", token_cache=token_cache)
+
+        # When
+        token = auth.get_access_token()
+
+        # Then
+        assert token == "new_access_token"
+        assert "grant_type=refresh_token" in responses.calls[0].request.body
+        assert token_cache.load("test@example.com")["access_token"] == "new_access_token"
+
+    @responses.activate
+    def test_saves_tokens_after_password_grant(self, token_cache):
+        """Test that fetched tokens are written to the cache."""
+        # Given
+        responses.add(responses.POST, ZwiftAuth.AUTH_URL, json=self.TOKEN_RESPONSE, status=200)
+        auth = ZwiftAuth("test@example.com", "testpassword", token_cache=token_cache)
+
+        # When
+        auth.get_access_token()
+
+        # Then
+        entry = token_cache.load("test@example.com")
+        assert entry["access_token"] == "new_access_token"
+        assert entry["refresh_token"] == "new_refresh_token"
+        assert entry["access_token_expiration"] > time.time()
+
+    @responses.activate
+    def test_refresh_failure_falls_back_to_password_grant(self):
+        """Test that a rejected refresh token triggers a password grant."""
+        # Given
+        auth = ZwiftAuth("test@example.com", "testpassword")
+        auth._refresh_token = "revoked_refresh"
+        auth._refresh_token_expiration = time.time() + 3600
+        responses.add(responses.POST, ZwiftAuth.AUTH_URL, json={"error": "invalid_grant"}, status=400)
+        responses.add(responses.POST, ZwiftAuth.AUTH_URL, json=self.TOKEN_RESPONSE, status=200)
+
+        # When
+        token = auth.get_access_token()
+
+        # Then
+        assert token == "new_access_token"
+        assert len(responses.calls) == 2
+        assert "grant_type=refresh_token" in responses.calls[0].request.body
+        assert "grant_type=password" in responses.calls[1].request.body
+
+
+    @pytest.mark.parametrize("failure", [
+        {"body": requests.exceptions.ConnectionError("Connection refused")},
+        {"status": 503, "body": "Service Unavailable"},
+        {"status": 500, "json": {"error": "server_error"}},
+    ])
+    @responses.activate
+    def test_refresh_outage_does_not_fall_back_to_password_grant(self, failure):
+        """Test that a refresh grant the server could not answer is not retried with the password."""
+        # Given
+        auth = ZwiftAuth("test@example.com", "testpassword")
+        auth._refresh_token = "valid_refresh"
+        auth._refresh_token_expiration = time.time() + 3600
+        responses.add(responses.POST, ZwiftAuth.AUTH_URL, **failure)
+        responses.add(responses.POST, ZwiftAuth.AUTH_URL, json=self.TOKEN_RESPONSE, status=200)
+
+        # When / Then
+        with pytest.raises(ZwiftAuthError):
+            auth.get_access_token()
+        assert len(responses.calls) == 1
+        assert auth._refresh_token == "valid_refresh"
+
+    def test_open_circuit_does_not_fall_back_to_password_grant(self):
+        """Test that an open circuit breaker fails the refresh without a password grant."""
+        # Given
+        retry = Mock(spec=RetryPolicy)
+        retry.call.side_effect = CircuitOpenError("secure.zwift.com")
+        auth = ZwiftAuth("test@example.com", "testpassword", retry=retry)
+        auth._refresh_token = "valid_refresh"
+        auth._refresh_token_expiration = time.time() + 3600
+
+        # When / Then
+        with pytest.raises(ZwiftAuthError, match="unavailable"):
+            auth.get_access_token()
+        assert retry.call.call_count == 1
+
+
+class TestZwiftAuthConcurrency:
+    """Tests for thread-safe token handling in ZwiftAuth."""
+
+    TOKEN_RESPONSE = {
+        "access_token": "new_access_token",
+        "refresh_token": "new_refresh_token",
+        "expires_in": 3600,
+        "refresh_expires_in": 86400,
+    }
+
+    def test_concurrent_callers_share_one_fetch(self):
+        """Test that simultaneous callers at expiry trigger a single fetch."""
+        # Given
+        auth = ZwiftAuth("test@example.com", "testpassword")
+        fetch_calls = []
+
+        def slow_fetch(use_refresh=False):
+            fetch_calls.append(use_refresh)
+            time.sleep(0.05)
+            return self.TOKEN_RESPONSE
+
+        auth._fetch_token = slow_fetch
+
+        # When
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            tokens = list(executor.map(lambda _: auth.get_access_token(), range(8)))
+
+        # Then
+        assert tokens == ["new_access_token"] * 8
+        assert len(fetch_calls) == 1
+
+    def test_background_refresh_renews_before_expiry(self):
+        """Test that the background refresher renews a token about to expire."""
+        # Given
+        auth = ZwiftAuth("test@example.com", "testpassword")
+        auth._access_token = "expiring_token"
+        auth._access_token_expiration = time.time() + ZwiftAuth.BACKGROUND_REFRESH_LEAD - 1
+        refreshed = threading.Event()
+
+        def fetch(use_refresh=False):
+            refreshed.set()
+            return self.TOKEN_RESPONSE
+
+        auth._fetch_token = fetch
+
+        # When
+        auth.start_background_refresh()
+        try:
+            assert refreshed.wait(2)
+        finally:
+            auth.stop_background_refresh(timeout=2)
+
+        # Then
+        assert auth._access_token == "new_access_token"
+        assert auth._refresh_thread is None
+
+    def test_background_refresh_keeps_valid_token(self):
+        """Test that the refresher waits while the token is far from expiry."""
+        # Given
+        auth = ZwiftAuth("test@example.com", "testpassword")
+        auth._access_token = "valid_token"
+        auth._access_token_expiration = time.time() + 3600
+        auth._fetch_token = Mock()
+
+        # When
+        auth.start_background_refresh()
+        time.sleep(0.05)
+        auth.stop_background_refresh(timeout=2)
+
+        # Then
+        auth._fetch_token.assert_not_called()
+        assert auth._access_token == "valid_token"
+
+    def test_background_refresh_failure_is_logged(self, caplog):
+        """Test that a failed background refresh does not kill the thread."""
+        # Given
+        auth = ZwiftAuth("test@example.com", "testpassword")
+        attempted = threading.Event()
+
+        def failing_fetch(use_refresh=False):
+            attempted.set()
+            raise ZwiftAuthError("Authentication failed")
+
+        auth._fetch_token = failing_fetch
+
+        # When
+        auth.start_background_refresh()
+        try:
+            assert attempted.wait(2)
+            time.sleep(0.05)
+            assert auth._refresh_thread.is_alive()
+        finally:
+            auth.stop_background_refresh(timeout=2)
+
+        # Then
+        assert "Background token refresh failed" in caplog.text
@@ -1,9 +1,11 @@
 """Integration tests for the ZwiftClient orchestrator."""
 
 import time
+import json
+import base64
 import pytest
 import responses
-from services.zwift import ZwiftClient, ZwiftAuth
+from services.zwift import ZwiftClient, ZwiftAuth, ZwiftTokenCache
 
 
 class TestZwiftClientIntegration:
@@ -200,3 +202,111 @@ class TestZwiftClientIntegration:
         # Then
         assert result1[0]["id"] == "act_111"
         assert result2[0]["id"] == "act_222"
+
+
+def _jwt(subject):
+    """Build an unsigned JWT-shaped token with the given subject."""
+    payload = base64.urlsafe_b64encode(json.dumps({"sub": subject}).encode()).decode().rstrip("=")
+    return f"header.{payload}.signature"
+
+
+class TestZwiftClientPlayerId:
+    """Tests for player ID resolution caching in ZwiftClient."""
+
+    ME_URL = "https://us-or-rly101.zwift.com/api/profiles/me"
+
+    def _add_token(self, access_token):
+        """Register a mocked token response."""
+        responses.add(
+            responses.POST,
+            ZwiftAuth.AUTH_URL,
+            json={
+                "access_token": access_token,
+                "refresh_token": "test_refresh",
+                "expires_in": 3600,
+                "refresh_expires_in": 86400,
+            },
+            status=200,
+        )
+
+    def _me_calls(self):
+        """Count the calls made to resolve "me"."""
+        return len([c for c in responses.calls if c.request.url == self.ME_URL])
+
+    @responses.activate
+    def test_resolution_shared_across_accessors(self):
+        """Test that "me" is resolved once per client, not per accessor."""
+        # Given
+        self._add_token(_jwt("subject-1"))
+        responses.add(responses.GET, self.ME_URL, json={"id": 12345}, status=200)
+        client = ZwiftClient("user@test.com", "password123")
+
+        # When
+        first = client.get_profile()._get_player_id()
+        second = client.get_profile()._get_player_id()
+
+        # Then
+        assert first == second == "12345"
+        assert self._me_calls() == 1
+
+    @responses.activate
+    def test_resolution_persisted_in_token_cache(self, tmp_path):
+        """Test that a new client reuses the persisted player ID."""
+        # Given
+        token_cache = ZwiftTokenCache(str(tmp_path / "tokens.json"))
+        self._add_token(_jwt("subject-1"))
+        responses.add(responses.GET, self.ME_URL, json={"id": 12345}, status=200)
+        ZwiftClient("user@test.com", "password123", token_cache=token_cache).get_player_id()
+
+        # When
+        player_id = ZwiftClient("user@test.com", "password123", token_cache=token_cache).get_player_id()
+
+        # Then
+        assert player_id == "12345"
+        assert self._me_calls() == 1
+        assert token_cache.load("user@test.com")["player_id_subject"] == "subject-1"
+
+    @responses.activate
+    def test_subject_change_invalidates_player_id(self, tmp_path):
+        """Test that tokens for another subject trigger a new resolution."""
+        # Given
+        token_cache = ZwiftTokenCache(str(tmp_path / "tokens.json"))
+        token_cache.save("user@test.com", player_id="12345", player_id_subject="old-subject")
+        self._add_token(_jwt("new-subject"))
+        responses.add(responses.GET, self.ME_URL, json={"id": 67890}, status=200)
+        client = ZwiftClient("user@test.com", "password123", token_cache=token_cache)
+
+        # When
+        player_id = client.get_player_id()
+
+        # Then
+        assert player_id == "67890"
+        assert self._me_calls() == 1
+        assert token_cache.load("user@test.com")["player_id"] == "67890"
+
+    @responses.activate
+    def test_invalidate_player_id(self, tmp_path):
+        """Test that invalidation forces a new resolution."""
+        # Given
+        token_cache = ZwiftTokenCache(str(tmp_path / "tokens.json"))
+        self._add_token(_jwt("subject-1"))
+        responses.add(responses.GET, self.ME_URL, json={"id": 12345}, status=200)
+        client = ZwiftClient("user@test.com", "password123", token_cache=token_cache)
+        client.get_player_id()
+
+        # When
+        client.invalidate_player_id()
+        client.get_player_id()
+
+        # Then
+        assert self._me_calls() == 2
+
+    def test_token_subject_of_opaque_token(self):
+        """Test that a non-JWT token has no subject."""
+        # Given
+        auth = ZwiftAuth("user@test.com", "password123")
+        auth._access_token = "opaque_token"
+        auth._access_token_expiration = time.time() + 3600
+
+        # When & Then
+        assert auth.get_token_subject() is None
@@ -0,0 +1,198 @@
+"""Tests for the streaming activity file downloader."""
+
+import os
+import hashlib
+
+import pytest
+import requests
+import responses
+
+from services.zwift import StreamingDownloader, ZwiftDownloadError
+
+URL = "https://bucket.s3.amazonaws.com/activity.fit"
+CONTENT = bytes(range(256)) * 800  # 200 KiB
+ETAG = f'"{hashlib.md5(CONTENT).hexdigest()}"'
+
+
+class FakeResponse:
+    """Streaming response whose body can be cut off after some chunks."""
+
+    def __init__(self, status_code, body, headers, fail_after=None):
+        self.status_code = status_code
+        self.reason = "OK"
+        self.headers = headers
+        self._body = body
+        self._fail_after = fail_after
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def iter_content(self, chunk_size):
+        for index, start in enumerate(range(0, len(self._body), chunk_size)):
+            if self._fail_after is not None and index == self._fail_after:
+                raise requests.exceptions.ChunkedEncodingError("connection reset")
+            yield self._body[start:start + chunk_size]
+
+
+class FakeSession:
+    """Session serving CONTENT with Range support, dropping the first transfer."""
+
+    def __init__(self, fail_after=None):
+        self.fail_after = fail_after
+        self.ranges = []
+
+    def get(self, url, headers, stream, timeout):
+        range_header = headers.get("Range")
+        self.ranges.append(range_header)
+        fail_after, self.fail_after = self.fail_after, None
+        if range_header:
+            start = int(range_header[len("bytes="):-1])
+            headers = {"ETag": ETAG, "Content-Range": f"bytes {start}-{len(CONTENT) - 1}/{len(CONTENT)}"}
+            return FakeResponse(206, CONTENT[start:], headers, fail_after)
+        return FakeResponse(200, CONTENT, {"ETag": ETAG, "Content-Length": str(len(CONTENT))}, fail_after)
+
+
+def serve_ranges(request):
+    """responses callback honouring Range requests."""
+    range_header = request.headers.get("Range")
+    if not range_header:
+        return 200, {"ETag": ETAG}, CONTENT
+    start = int(range_header[len("bytes="):-1])
+    headers = {"ETag": ETAG, "Content-Range": f"bytes {start}-{len(CONTENT) - 1}/{len(CONTENT)}"}
+    return 206, headers, CONTENT[start:]
+
+
+class TestStreamingDownloader:
+    """Tests for StreamingDownloader."""
+
+    @responses.activate
+    def test_download_bytes_in_chunks_with_progress(self):
+        """Test that the file is read in chunks and progress is reported for each."""
+        # Given
+        responses.add(responses.GET, URL, body=CONTENT,
+                      headers={"ETag": ETAG, "Content-Length": str(len(CONTENT))})
+        reports = []
+
+        # When
+        data = StreamingDownloader(chunk_size=64 * 1024).download_bytes(URL, progress=reports.append)
+
+        # Then
+        assert data == CONTENT
+        assert [report.received for report in reports] == [65536, 131072, 196608, 204800]
+        assert reports[-1].total == len(CONTENT)
+        assert reports[-1].transferred == len(CONTENT)
+
+    @responses.activate
+    def test_checksum_mismatch_raises(self, tmp_path):
+        """Test that content not matching the S3 ETag is rejected and discarded."""
+        # Given
+        responses.add(responses.GET, URL, body=CONTENT, headers={"ETag": '"' + "0" * 32 + '"'})
+        path = str(tmp_path / "activity.fit")
+
+        # When / Then
+        with pytest.raises(ZwiftDownloadError, match="Checksum mismatch"):
+            StreamingDownloader().download_to_file(URL, path)
+        assert not os.path.exists(path)
+        assert os.path.getsize(path + ".part") == 0
+
+    @responses.activate
+    def test_multipart_etag_is_not_verified(self):
+        """Test that multipart ETags, which are not content MD5s, are ignored."""
+        # Given
+        responses.add(responses.GET, URL, body=CONTENT, headers={"ETag": '"abc-2"'})
+
+        # When / Then
+        assert StreamingDownloader().download_bytes(URL) == CONTENT
+
+    @pytest.mark.parametrize("encryption_headers", [
+        {"x-amz-server-side-encryption": "aws:kms"},
+        {"x-amz-server-side-encryption": "aws:kms:dsse"},
+        {"x-amz-server-side-encryption-customer-algorithm": "AES256"},
+    ])
+    @responses.activate
+    def test_encrypted_object_etag_is_not_verified(self, encryption_headers):
+        """Test that the ETags of SSE-KMS and SSE-C objects, which are not content MD5s, are ignored."""
+        # Given
+        responses.add(responses.GET, URL, body=CONTENT, headers={"ETag": '"' + "0" * 32 + '"', **encryption_headers})
+
+        # When / Then
+        assert StreamingDownloader().download_bytes(URL) == CONTENT
+
+    @responses.activate
+    def test_resumes_partial_file(self, tmp_path):
+        """Test that an existing .part file is continued with a Range request."""
+        # Given
+        responses.add_callback(responses.GET, URL, callback=serve_ranges)
+        path = str(tmp_path / "activity.fit")
+        with open(path + ".part", "wb") as file:
+            file.write(CONTENT[:100000])
+
+        # When
+        StreamingDownloader().download_to_file(URL, path)
+
+        # Then
+        assert responses.calls[0].request.headers["Range"] == "bytes=100000-"
+        with open(path, "rb") as file:
+            assert file.read() == CONTENT
+        assert not os.path.exists(path + ".part")
+
+    @responses.activate
+    def test_restarts_when_range_is_ignored(self, tmp_path):
+        """Test that a full response to a Range request replaces the partial content."""
+        # Given
+        responses.add(responses.GET, URL, body=CONTENT, headers={"ETag": ETAG})
+        path = str(tmp_path / "activity.fit")
+        with open(path + ".part", "wb") as file:
+            file.write(b"stale")
+
+        # When
+        StreamingDownloader().download_to_file(URL, path)
+
+        # Then
+        with open(path, "rb") as file:
+            assert file.read() == CONTENT
+
+    @responses.activate
+    def test_restarts_when_range_not_satisfiable(self, tmp_path):
+        """Test that a 416 discards the partial file and downloads from scratch."""
+        # Given
+        responses.add(responses.GET, URL, status=416)
+        responses.add(responses.GET, URL, body=CONTENT, headers={"ETag": ETAG})
+        path = str(tmp_path / "activity.fit")
+        with open(path + ".part", "wb") as file:
+            file.write(b"x" * (len(CONTENT) + 10))
+
+        # When
+        StreamingDownloader().download_to_file(URL, path)
+
+        # Then
+        assert "Range" not in responses.calls[1].request.headers
+        with open(path, "rb") as file:
+            assert file.read() == CONTENT
+
+    def test_dropped_connection_fetches_only_missing_bytes(self):
+        """Test that a transfer cut mid-stream resumes from the last received byte."""
+        # Given
+        session = FakeSession(fail_after=2)
+        downloader = StreamingDownloader(session=session, chunk_size=64 * 1024)
+
+        # When
+        data = downloader.download_bytes(URL)
+
+        # Then
+        assert data == CONTENT
+        assert session.ranges == [None, "bytes=131072-"]
+
+    def test_gives_up_after_max_resumes(self):
+        """Test that a transfer failing repeatedly raises ZwiftDownloadError."""
+        # Given
+        session = FakeSession(fail_after=0)
+        session.get = lambda url, headers, stream, timeout: FakeResponse(200, CONTENT, {}, fail_after=0)
+        downloader = StreamingDownloader(session=session, max_resumes=2)
+
+        # When / Then
+        with pytest.raises(ZwiftDownloadError, match="interrupted"):
+            downloader.download_bytes(URL)
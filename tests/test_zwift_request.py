@@ -5,6 +5,7 @@ import requests
 import responses
 
 from services.zwift.request import ZwiftApiRequest, ZwiftApiError
+from services.zwift.response_cache import ZwiftResponseCache
 
 
 class TestZwiftApiRequest:
@@ -71,3 +72,52 @@ class TestZwiftApiRequest:
         assert headers["Authorization"] == "Bearer test_token"
         assert headers["Accept"] == "application/json"
         assert "User-Agent" in headers
+
+
+class TestZwiftApiRequestCache:
+    """Tests for conditional requests in ZwiftApiRequest."""
+
+    URL = f"{ZwiftApiRequest.BASE_URL}/api/profiles/1/activities?start=0&limit=10"
+
+    @pytest.fixture
+    def cache(self):
+        """Create an in-memory response cache."""
+        return ZwiftResponseCache()
+
+    @pytest.fixture
+    def api_request(self, cache):
+        """Create a ZwiftApiRequest using the response cache."""
+        return ZwiftApiRequest(lambda: "test_token", cache=cache)
+
+    @responses.activate
+    def test_not_modified_served_from_cache(self, api_request):
+        """Test that a 304 answer returns the cached body."""
+        # Given
+        responses.add(responses.GET, self.URL, json=[{"id": 1}], status=200, headers={"ETag": '"v1"'})
+        responses.add(responses.GET, self.URL, status=304)
+
+        # When
+        first = api_request.get_json("/api/profiles/1/activities?start=0&limit=10")
+        second = api_request.get_json("/api/profiles/1/activities?start=0&limit=10")
+
+        # Then
+        assert first == second == [{"id": 1}]
+        assert "If-None-Match" not in responses.calls[0].request.headers
+        assert responses.calls[1].request.headers["If-None-Match"] == '"v1"'
+
+    @responses.activate
+    def test_modified_response_replaces_cache(self, api_request, cache):
+        """Test that a new 200 answer updates the cached body and validators."""
+        # Given
+        responses.add(responses.GET, self.URL, json=[{"id": 1}], status=200,
+                      headers={"Last-Modified": "Wed, 21 Oct 2026 07:28:00 GMT"})
+        responses.add(responses.GET, self.URL, json=[{"id": 2}], status=200, headers={"ETag": '"v2"'})
+
+        # When
+        api_request.get_json("/api/profiles/1/activities?start=0&limit=10")
+        result = api_request.get_json("/api/profiles/1/activities?start=0&limit=10")
+
+        # Then
+        assert result == [{"id": 2}]
+        assert responses.calls[1].request.headers["If-Modified-Since"] == "Wed, 21 Oct 2026 07:28:00 GMT"
+        assert cache.get(self.URL).etag == '"v2"'
@@ -0,0 +1,110 @@
+"""Tests for the Zwift response cache module."""
+
+import os
+import pytest
+
+from services.zwift.response_cache import CachedResponse, ZwiftResponseCache
+
+
+class TestCachedResponse:
+    """Tests for CachedResponse class."""
+
+    def test_validator_headers(self):
+        """Test that both validators are turned into conditional headers."""
+        entry = CachedResponse('"abc"', "Wed, 21 Oct 2026 07:28:00 GMT", "[]")
+        assert entry.validator_headers() == {
+            "If-None-Match": '"abc"',
+            "If-Modified-Since": "Wed, 21 Oct 2026 07:28:00 GMT",
+        }
+
+    def test_validator_headers_etag_only(self):
+        """Test that missing validators are left out."""
+        assert CachedResponse('"abc"', None, "[]").validator_headers() == {"If-None-Match": '"abc"'}
+
+
+class TestZwiftResponseCache:
+    """Tests for ZwiftResponseCache class."""
+
+    def test_put_and_get(self):
+        """Test caching a response with validators."""
+        # Given
+        cache = ZwiftResponseCache()
+
+        # When
+        cache.put("https://api/a", '"v1"', None, '{"id": 1}')
+
+        # Then
+        assert cache.get("https://api/a") == CachedResponse('"v1"', None, '{"id": 1}')
+
+    def test_response_without_validators_is_not_cached(self):
+        """Test that responses that cannot be revalidated are skipped."""
+        # Given
+        cache = ZwiftResponseCache()
+
+        # When
+        cache.put("https://api/a", None, None, "[]")
+
+        # Then
+        assert cache.get("https://api/a") is None
+
+    def test_lru_eviction(self):
+        """Test that the least recently used entries are evicted first."""
+        # Given
+        cache = ZwiftResponseCache(max_bytes=10)
+        cache.put("https://api/a", '"a"', None, "aaaa")
+        cache.put("https://api/b", '"b"', None, "bbbb")
+        cache.get("https://api/a")
+
+        # When
+        cache.put("https://api/c", '"c"', None, "cccc")
+
+        # Then
+        assert cache.get("https://api/a") is not None
+        assert cache.get("https://api/b") is None
+        assert cache.get("https://api/c") is not None
+
+    def test_oversized_entry_is_skipped(self):
+        """Test that an entry larger than the cache is not stored."""
+        # Given
+        cache = ZwiftResponseCache(max_bytes=3)
+
+        # When
+        cache.put("https://api/a", '"a"', None, "aaaa")
+
+        # Then
+        assert cache.get("https://api/a") is None
+
+    def test_disk_store_survives_new_instance(self, tmp_path):
+        """Test that entries are shared with later processes through disk."""
+        # Given
+        ZwiftResponseCache(directory=str(tmp_path)).put("https://api/a", '"v1"', None, "[1]")
+
+        # When
+        cache = ZwiftResponseCache(directory=str(tmp_path))
+
+        # Then
+        assert cache.get("https://api/a") == CachedResponse('"v1"', None, "[1]")
+
+    def test_disk_store_is_bounded(self, tmp_path):
+        """Test that evicted entries are removed from disk as well."""
+        # Given
+        cache = ZwiftResponseCache(max_bytes=10, directory=str(tmp_path))
+
+        # When
+        cache.put("https://api/a", '"a"', None, "aaaaaa")
+        cache.put("https://api/b", '"b"', None, "bbbbbb")
+
+        # Then
+        assert len(os.listdir(tmp_path)) == 1
+        assert ZwiftResponseCache(max_bytes=10, directory=str(tmp_path)).get("https://api/a") is None
+
+    def test_corrupt_disk_entry_is_ignored(self, tmp_path):
+        """Test that unreadable files do not break the cache."""
+        # Given
+        (tmp_path / "broken.json").write_text("{not json")
+
+        # When
+        cache = ZwiftResponseCache(directory=str(tmp_path))
+
+        # Then
+        assert cache.get("https://api/a") is None
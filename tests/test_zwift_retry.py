@@ -0,0 +1,229 @@
+"""Tests for the Zwift retry policy and circuit breaker."""
+
+import sqlite3
+import pytest
+import requests
+import responses
+
+from services.zwift import CircuitBreaker, CircuitOpenError, RetryPolicy
+from services.zwift.request import ZwiftApiError, ZwiftApiRequest
+from services.zwift_service import ZwiftService
+
+URL = "https://api.test/resource"
+
+
+def make_policy(**kwargs):
+    """Create a policy recording its delays instead of sleeping."""
+    delays = []
+    return RetryPolicy(sleep=delays.append, **kwargs), delays
+
+
+class TestRetryPolicy:
+    """Tests for RetryPolicy."""
+
+    @responses.activate
+    def test_retries_transient_status_then_succeeds(self):
+        """Test that a 503 is retried with a bounded jittered backoff."""
+        # Given
+        responses.add(responses.GET, URL, status=503)
+        responses.add(responses.GET, URL, status=503)
+        responses.add(responses.GET, URL, json={"ok": True})
+        policy, delays = make_policy(backoff_factor=1.0)
+
+        # When
+        response = policy.call(lambda: requests.get(URL), "GET", URL)
+
+        # Then
+        assert response.status_code == 200
+        assert len(responses.calls) == 3
+        assert len(delays) == 2
+        assert 0 <= delays[0] <= 1.0
+        assert 0 <= delays[1] <= 2.0
+
+    @responses.activate
+    def test_honours_retry_after(self):
+        """Test that a 429's Retry-After header sets the delay, capped to max_retry_after."""
+        # Given
+        responses.add(responses.GET, URL, status=429, headers={"Retry-After": "7"})
+        responses.add(responses.GET, URL, status=429, headers={"Retry-After": "600"})
+        responses.add(responses.GET, URL, json={})
+        policy, delays = make_policy(max_retry_after=60)
+
+        # When
+        policy.call(lambda: requests.get(URL), "GET", URL)
+
+        # Then
+        assert delays == [7.0, 60]
+
+    @responses.activate
+    def test_returns_last_response_when_attempts_exhausted(self):
+        """Test that the last retryable response is handed back to the caller."""
+        # Given
+        responses.add(responses.GET, URL, status=502)
+        policy, delays = make_policy(max_attempts=3, failure_threshold=None)
+
+        # When
+        response = policy.call(lambda: requests.get(URL), "GET", URL)
+
+        # Then
+        assert response.status_code == 502
+        assert len(responses.calls) == 3
+        assert len(delays) == 2
+
+    @responses.activate
+    def test_does_not_retry_non_idempotent_calls(self):
+        """Test that a POST is sent once unless the endpoint is declared idempotent."""
+        # Given
+        responses.add(responses.POST, URL, status=503)
+        policy, _ = make_policy(failure_threshold=None)
+
+        # When
+        policy.call(lambda: requests.post(URL), "POST", URL)
+        calls_default = len(responses.calls)
+        policy.call(lambda: requests.post(URL), "POST", URL, idempotent=True)
+
+        # Then
+        assert calls_default == 1
+        assert len(responses.calls) == 1 + policy.max_attempts
+
+    @responses.activate
+    def test_retries_connection_errors(self):
+        """Test that connection errors are retried and re-raised after the last attempt."""
+        # Given
+        responses.add(responses.GET, URL, body=requests.ConnectionError("reset"))
+        policy, delays = make_policy(max_attempts=2, failure_threshold=None)
+
+        # When / Then
+        with pytest.raises(requests.ConnectionError):
+            policy.call(lambda: requests.get(URL), "GET", URL)
+        assert len(responses.calls) == 2
+        assert len(delays) == 1
+
+    @responses.activate
+    def test_circuit_opens_and_fails_fast(self):
+        """Test that repeated 5xx open the host's breaker and later calls fail without a request."""
+        # Given
+        responses.add(responses.GET, URL, status=500)
+        policy, _ = make_policy(max_attempts=1, failure_threshold=3)
+        for _ in range(3):
+            policy.call(lambda: requests.get(URL), "GET", URL)
+
+        # When / Then
+        with pytest.raises(CircuitOpenError):
+            policy.call(lambda: requests.get(URL), "GET", URL)
+        assert len(responses.calls) == 3
+        assert policy.breaker("https://other.test/").is_open is False
+
+
+    @pytest.mark.parametrize("error", [
+        sqlite3.OperationalError("database is locked"),
+        requests.exceptions.ChunkedEncodingError("broken body"),
+        requests.exceptions.InvalidURL("bad url"),
+    ])
+    @responses.activate
+    def test_other_errors_during_trial_do_not_wedge_breaker(self, error):
+        """Test that a trial call failing with any other exception lets a later trial through."""
+        # Given
+        responses.add(responses.GET, URL, status=500)
+        responses.add(responses.GET, URL, status=200)
+        policy, _ = make_policy(max_attempts=1, failure_threshold=1, reset_timeout=0)
+        policy.call(lambda: requests.get(URL), "GET", URL)
+        assert policy.breaker(URL).is_open
+
+        def fail():
+            raise error
+
+        # When
+        with pytest.raises(type(error)):
+            policy.call(fail, "GET", URL)
+
+        # Then
+        assert policy.call(lambda: requests.get(URL), "GET", URL).status_code == 200
+        assert policy.breaker(URL).is_open is False
+
+
+class TestCircuitBreaker:
+    """Tests for CircuitBreaker."""
+
+    def test_half_open_trial(self):
+        """Test that a single trial call is allowed after the reset timeout."""
+        # Given
+        now = [0.0]
+        breaker = CircuitBreaker("host", failure_threshold=1, reset_timeout=10, clock=lambda: now[0])
+        breaker.record_failure()
+
+        # When
+        now[0] = 11.0
+        breaker.before_call()
+
+        # Then - a second caller is refused while the trial runs
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+
+        breaker.record_success()
+        breaker.before_call()
+        assert breaker.is_open is False
+
+    def test_failed_trial_reopens(self):
+        """Test that a failed trial call opens the breaker for another timeout."""
+        # Given
+        now = [0.0]
+        breaker = CircuitBreaker("host", failure_threshold=1, reset_timeout=10, clock=lambda: now[0])
+        breaker.record_failure()
+        now[0] = 11.0
+        breaker.before_call()
+
+        # When
+        breaker.record_failure()
+
+        # Then
+        now[0] = 15.0
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+
+
+class TestRetryIntegration:
+    """Tests for the retry policy in the Zwift API and S3 calls."""
+
+    @responses.activate
+    def test_api_request_retries_throttling(self):
+        """Test that get_json retries a 429 before returning the data."""
+        # Given
+        endpoint_url = f"{ZwiftApiRequest.BASE_URL}/api/profiles/me"
+        responses.add(responses.GET, endpoint_url, status=429, headers={"Retry-After": "1"})
+        responses.add(responses.GET, endpoint_url, json={"id": 1})
+        policy, delays = make_policy()
+
+        # When
+        result = ZwiftApiRequest(lambda: "token", retry=policy).get_json("/api/profiles/me")
+
+        # Then
+        assert result == {"id": 1}
+        assert delays == [1.0]
+
+    def test_api_request_open_circuit_raises_api_error(self):
+        """Test that an open breaker surfaces as ZwiftApiError."""
+        # Given
+        policy, _ = make_policy(failure_threshold=1)
+        policy.breaker(ZwiftApiRequest.BASE_URL).record_failure()
+
+        # When / Then
+        with pytest.raises(ZwiftApiError, match="unavailable"):
+            ZwiftApiRequest(lambda: "token", retry=policy).get_json("/api/profiles/me")
+
+    @responses.activate
+    def test_s3_download_is_retried(self):
+        """Test that a transient S3 failure does not fail the download."""
+        # Given
+        link = "https://bucket.s3.amazonaws.com/key.fit"
+        responses.add(responses.GET, link, status=503)
+        responses.add(responses.GET, link, body=b"fit data")
+        policy, _ = make_policy()
+        service = ZwiftService("user", "pass", retry=policy)
+
+        # When
+        result = service.download_activity_bytes({"id": "1", "fitFileBucket": "bucket", "fitFileKey": "key.fit"})
+
+        # Then
+        assert result == b"fit data"
+        assert len(responses.calls) == 2
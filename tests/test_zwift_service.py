@@ -2,9 +2,15 @@
 
 import pytest
 import responses
-from unittest.mock import Mock, patch, MagicMock
+from concurrent.futures import Future
+from unittest.mock import ANY, Mock, patch, MagicMock
 import tempfile
+import threading
+import time
 import os
+import sqlite3
+from services.zwift import DownloadProgress
+from services.fit_cache import FitFileCache
 from services.zwift_service import ZwiftService
 
 
@@ -27,9 +33,23 @@ class TestZwiftService:
         zwift_service.authenticate()
 
         # Then
-        mock_client_class.assert_called_once_with("test_user", "test_pass")
+        mock_client_class.assert_called_once_with(
+            "test_user", "test_pass", session=zwift_service.session, token_cache=None, response_cache=None,
+            retry=zwift_service.retry, rate_limiter=None
+        )
         assert zwift_service.client == mock_client
 
+    @patch('services.zwift_service.ZwiftClient')
+    def test_ensure_authenticated_reuses_client(self, mock_client_class, zwift_service):
+        """Test that ensure_authenticated only creates the client once."""
+        # When
+        zwift_service.ensure_authenticated()
+        zwift_service.ensure_authenticated()
+
+        # Then
+        mock_client_class.assert_called_once()
+        assert zwift_service.client == mock_client_class.return_value
+
     def test_download_last_activity_not_authenticated(self, zwift_service):
         """Test download fails when not authenticated."""
         # When & Then
@@ -128,3 +148,347 @@ class TestZwiftService:
         # When & Then
         with pytest.raises(RuntimeError, match="Failed to download activity"):
             zwift_service.download_last_activity()
+
+    @responses.activate
+    def test_download_activity_bytes_success(self, zwift_service):
+        """Test downloading an activity's FIT file into memory."""
+        # Given
+        activity_data = {
+            'id': '12345',
+            'fitFileBucket': 'test-bucket',
+            'fitFileKey': 'test-key.fit'
+        }
+        responses.add(
+            responses.GET,
+            'https://test-bucket.s3.amazonaws.com/test-key.fit',
+            body=b'fake fit file content',
+            status=200
+        )
+
+        # When
+        result = zwift_service.download_activity_bytes(activity_data)
+
+        # Then
+        assert result == b'fake fit file content'
+
+    @patch('services.zwift_service.ZwiftClient')
+    def test_get_last_activity(self, mock_client_class, zwift_service):
+        """Test that the most recent activity is returned."""
+        # Given
+        mock_client = Mock()
+        mock_profile = Mock()
+        mock_profile.get_activities.return_value = [{'id': '2'}, {'id': '1'}]
+        mock_client.get_profile.return_value = mock_profile
+        mock_client_class.return_value = mock_client
+        zwift_service.authenticate()
+
+        # When
+        result = zwift_service.get_last_activity()
+
+        # Then
+        assert result == {'id': '2'}
+
+    def test_activity_file_name(self):
+        """Test the FIT file name built for an activity."""
+        assert ZwiftService.activity_file_name({'id': 12345}) == 'zwift_activity_12345.fit'
+
+    @patch('services.zwift_service.ZwiftClient')
+    def test_get_new_activities_stops_at_synced(self, mock_client_class, zwift_service):
+        """Test that new activities are streamed until the first synced one."""
+        # Given
+        mock_client = Mock()
+        mock_profile = Mock()
+        mock_profile.iter_activities.return_value = (a for a in [{'id': 5}, {'id': 4}])
+        mock_client.get_profile.return_value = mock_profile
+        mock_client_class.return_value = mock_client
+        zwift_service.authenticate()
+        is_synced = Mock()
+
+        # When
+        result = zwift_service.get_new_activities(is_synced, page_size=2)
+
+        # Then
+        assert [a['id'] for a in result] == [5, 4]
+        mock_profile.iter_activities.assert_called_once_with(page_size=2, stop=is_synced)
+
+    @patch('services.zwift_service.ZwiftClient')
+    def test_get_new_activities_respects_max(self, mock_client_class, zwift_service):
+        """Test that at most max_activities are returned, the oldest ones."""
+        # Given
+        mock_client = Mock()
+        mock_profile = Mock()
+        mock_profile.iter_activities.return_value = ({'id': i} for i in range(10, 0, -1))
+        mock_client.get_profile.return_value = mock_profile
+        mock_client_class.return_value = mock_client
+        zwift_service.authenticate()
+
+        # When
+        result = zwift_service.get_new_activities(lambda a: False, max_activities=3)
+
+        # Then
+        assert [a['id'] for a in result] == [3, 2, 1]
+
+    @patch('services.zwift_service.ZwiftClient')
+    def test_get_new_activities_caps_scan(self, mock_client_class, zwift_service):
+        """Test that no more than max_scanned activities are looked at."""
+        # Given
+        consumed = []
+
+        def activities():
+            for i in range(100, 0, -1):
+                consumed.append(i)
+                yield {'id': i}
+
+        mock_client = Mock()
+        mock_profile = Mock()
+        mock_profile.iter_activities.return_value = activities()
+        mock_client.get_profile.return_value = mock_profile
+        mock_client_class.return_value = mock_client
+        zwift_service.authenticate()
+
+        # When
+        result = zwift_service.get_new_activities(lambda a: False, max_activities=10, max_scanned=2)
+
+        # Then
+        assert [a['id'] for a in result] == [100, 99]
+        assert len(consumed) == 3
+        mock_profile.iter_activities.assert_called_once_with(page_size=2, stop=ANY)
+
+    @patch('services.zwift_service.ZwiftClient')
+    def test_iter_activities_walks_whole_history(self, mock_client_class, zwift_service):
+        """Test that the history is walked past synced activities, leaving them out."""
+        # Given
+        mock_client = Mock()
+        mock_profile = Mock()
+        mock_profile.iter_activities.return_value = ({'id': i} for i in range(5, 0, -1))
+        mock_client.get_profile.return_value = mock_profile
+        mock_client_class.return_value = mock_client
+        zwift_service.authenticate()
+
+        # When
+        result = list(zwift_service.iter_activities(skip=lambda a: a['id'] in (5, 3), page_size=50))
+
+        # Then
+        assert [a['id'] for a in result] == [4, 2, 1]
+        mock_profile.iter_activities.assert_called_once_with(page_size=50, max_page_size=50)
+
+    def test_iter_activities_not_authenticated(self, zwift_service):
+        """Test walking the history fails when not authenticated."""
+        with pytest.raises(RuntimeError, match="Must authenticate before downloading activities"):
+            next(zwift_service.iter_activities())
+
+    def test_get_new_activities_not_authenticated(self, zwift_service):
+        """Test listing new activities fails when not authenticated."""
+        with pytest.raises(RuntimeError, match="Must authenticate before downloading activities"):
+            zwift_service.get_new_activities(lambda a: False)
+
+    def test_download_activity_bytes_uses_session(self):
+        """Test that S3 downloads reuse the service's session."""
+        # Given
+        session = Mock()
+        response = MagicMock(status_code=200, headers={})
+        response.__enter__.return_value = response
+        response.iter_content.return_value = [b'fit ', b'data']
+        session.get.return_value = response
+        service = ZwiftService("test_user", "test_pass", session=session)
+
+        # When
+        result = service.download_activity_bytes(
+            {'id': '1', 'fitFileBucket': 'bucket', 'fitFileKey': 'key.fit'}
+        )
+
+        # Then
+        assert result == b'fit data'
+        session.get.assert_called_once_with(
+            'https://bucket.s3.amazonaws.com/key.fit', headers={}, stream=True, timeout=(10, 30)
+        )
+
+
+class ImmediateExecutor:
+    """Executor running submitted work synchronously, for deterministic scheduling."""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def submit(self, fn, *args):
+        future = Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        pass
+
+
+class TestZwiftServiceDownloadActivities:
+    """Test cases for ZwiftService.download_activities."""
+
+    @staticmethod
+    def activity(activity_id):
+        return {'id': activity_id, 'fitFileBucket': 'bucket', 'fitFileKey': f'{activity_id}.fit'}
+
+    @responses.activate
+    def test_download_activities_reports_errors_per_item(self):
+        """Test that every activity gets a result and failures do not stop the others."""
+        # Given
+        for activity_id in (1, 2, 4):
+            responses.add(responses.GET, f'https://bucket.s3.amazonaws.com/{activity_id}.fit',
+                          body=f'fit {activity_id}'.encode())
+        responses.add(responses.GET, 'https://bucket.s3.amazonaws.com/3.fit', status=404)
+        service = ZwiftService("test_user", "test_pass")
+
+        # When
+        results = list(service.download_activities([self.activity(i) for i in range(1, 5)], max_workers=3))
+
+        # Then
+        by_id = {result.activity['id']: result for result in results}
+        assert sorted(by_id) == [1, 2, 3, 4]
+        assert by_id[1].data == b'fit 1' and by_id[1].error is None
+        assert by_id[3].data is None
+        assert isinstance(by_id[3].error, RuntimeError)
+
+    @responses.activate
+    def test_download_activities_isolates_malformed_activity(self):
+        """Test that an activity without a FIT file location fails alone."""
+        # Given
+        responses.add(responses.GET, 'https://bucket.s3.amazonaws.com/1.fit', body=b'fit 1')
+        service = ZwiftService("test_user", "test_pass")
+
+        # When
+        results = list(service.download_activities([{'id': 2}, self.activity(1)], max_workers=1))
+
+        # Then
+        by_id = {result.activity['id']: result for result in results}
+        assert isinstance(by_id[2].error, KeyError)
+        assert by_id[1].data == b'fit 1'
+
+    def test_download_activities_isolates_cache_errors(self):
+        """Test that a failing FIT cache database only fails its own download."""
+        # Given
+        fit_cache = Mock()
+        fit_cache.get.side_effect = [sqlite3.OperationalError("database is locked"), b'cached']
+        service = ZwiftService("test_user", "test_pass", fit_cache=fit_cache)
+
+        # When
+        results = list(service.download_activities([self.activity(1), self.activity(2)], max_workers=1))
+
+        # Then
+        assert isinstance(results[0].error, sqlite3.OperationalError)
+        assert results[1].data == b'cached'
+
+    def test_download_activities_yields_in_completion_order(self):
+        """Test that a slow download does not hold back faster ones."""
+        # Given
+        service = ZwiftService("test_user", "test_pass")
+        slow_may_finish = threading.Event()
+
+        def download(activity, progress=None):
+            if activity['id'] == 1:
+                slow_may_finish.wait(5)
+            return b'data'
+
+        service.download_activity_bytes = download
+        results = service.download_activities([self.activity(1), self.activity(2)], max_workers=2)
+
+        # When
+        first = next(results)
+        slow_may_finish.set()
+        second = next(results)
+
+        # Then
+        assert first.activity['id'] == 2
+        assert second.activity['id'] == 1
+
+    def test_download_activities_bounds_concurrency(self):
+        """Test that no more than max_workers downloads run at once."""
+        # Given
+        service = ZwiftService("test_user", "test_pass")
+        lock = threading.Lock()
+        running = []
+        peak = []
+
+        def download(activity, progress=None):
+            with lock:
+                running.append(activity['id'])
+                peak.append(len(running))
+            time.sleep(0.01)
+            with lock:
+                running.remove(activity['id'])
+            return b'data'
+
+        service.download_activity_bytes = download
+
+        # When
+        results = list(service.download_activities([self.activity(i) for i in range(10)], max_workers=3))
+
+        # Then
+        assert len(results) == 10
+        assert max(peak) <= 3
+
+    @patch('services.zwift_service.ThreadPoolExecutor', ImmediateExecutor)
+    def test_download_activities_bounds_in_flight_bytes(self):
+        """Test that no download starts while unconsumed bytes exceed the budget."""
+        # Given
+        service = ZwiftService("test_user", "test_pass")
+        started = []
+
+        def download(activity, progress=None):
+            started.append(activity['id'])
+            progress(DownloadProgress('url', 100, 100, 0.1, 100))
+            return b'x' * 100
+
+        service.download_activity_bytes = download
+        results = service.download_activities([self.activity(i) for i in range(5)],
+                                              max_workers=4, max_in_flight_bytes=150)
+
+        # When
+        next(results)
+
+        # Then
+        assert started == [0, 1]
+        assert len(list(results)) == 4
+        assert started == [0, 1, 2, 3, 4]
+
+
+class TestZwiftServiceFitCache:
+    """Test cases for ZwiftService with a FIT file cache."""
+
+    @responses.activate
+    def test_cached_activity_is_not_downloaded_again(self, tmp_path):
+        """Test that a cached FIT file is served without network I/O."""
+        # Given
+        responses.add(responses.GET, 'https://bucket.s3.amazonaws.com/key.fit', body=b'fit data')
+        cache = FitFileCache(str(tmp_path / "cache"))
+        service = ZwiftService("test_user", "test_pass", fit_cache=cache)
+        activity = {'id': '1', 'fitFileBucket': 'bucket', 'fitFileKey': 'key.fit'}
+        service.download_activity_bytes(activity)
+
+        # When
+        data = service.download_activity_bytes(activity)
+        path = service.download_activity_file(activity, str(tmp_path / "activity.fit"))
+
+        # Then
+        assert data == b'fit data'
+        with open(path, 'rb') as file:
+            assert file.read() == b'fit data'
+        assert len(responses.calls) == 1
+        cache.close()
+
+    @responses.activate
+    def test_streamed_download_is_cached_from_its_file(self, tmp_path):
+        """Test that a downloaded file is cached without reading it back whole."""
+        # Given
+        responses.add(responses.GET, 'https://bucket.s3.amazonaws.com/key.fit', body=b'fit data')
+        cache = Mock(spec=FitFileCache)
+        cache.get.return_value = None
+        service = ZwiftService("test_user", "test_pass", fit_cache=cache)
+        activity = {'id': '1', 'fitFileBucket': 'bucket', 'fitFileKey': 'key.fit'}
+
+        # When
+        path = service.download_activity_file(activity, str(tmp_path / "activity.fit"))
+
+        # Then
+        cache.put_file.assert_called_once_with(FitFileCache.download_key(activity), path)
+        cache.put.assert_not_called()
@@ -0,0 +1,71 @@
+"""Tests for the Zwift HTTP session module."""
+
+from unittest.mock import Mock
+
+import requests
+
+from services.zwift import ZwiftClient, create_session
+from services.zwift.request import ZwiftApiRequest
+
+
+class TestCreateSession:
+    """Tests for create_session function."""
+
+    def test_create_session_configures_pool(self):
+        """Test that the adapters use the requested pool and retry settings."""
+        # When
+        session = create_session(pool_connections=3, pool_maxsize=7, max_retries=4)
+
+        # Then
+        for prefix in ("https://", "http://"):
+            adapter = session.get_adapter(prefix + "example.com")
+            assert adapter._pool_connections == 3
+            assert adapter._pool_maxsize == 7
+            assert adapter.max_retries.connect == 4
+            assert adapter.max_retries.read == 0
+            assert adapter.max_retries.status == 0
+
+    def test_create_session_defaults(self):
+        """Test that a default session is a requests session."""
+        assert isinstance(create_session(), requests.Session)
+
+
+class TestSessionSharing:
+    """Tests that the Zwift client shares one session across calls."""
+
+    def test_client_shares_session(self):
+        """Test that auth and activities use the client's session."""
+        # Given
+        session = Mock(spec=requests.Session)
+
+        # When
+        client = ZwiftClient("user@test.com", "password123", session=session)
+        activities = client.get_profile()
+
+        # Then
+        assert client._auth._session is session
+        assert activities._request._session is session
+
+    def test_client_creates_pooled_session(self):
+        """Test that a pooled session is created when none is given."""
+        # When
+        client = ZwiftClient("user@test.com", "password123")
+
+        # Then
+        assert isinstance(client._session, requests.Session)
+        assert client.get_profile()._request._session is client._session
+
+    def test_request_uses_injected_session(self):
+        """Test that API requests go through the injected session."""
+        # Given
+        session = Mock(spec=requests.Session)
+        session.get.return_value.json.return_value = {"id": 1}
+        api_request = ZwiftApiRequest(lambda: "test_token", session=session)
+
+        # When
+        result = api_request.get_json("/api/profiles/me")
+
+        # Then
+        assert result == {"id": 1}
+        session.get.assert_called_once()
+        assert session.get.call_args.args[0] == f"{ZwiftApiRequest.BASE_URL}/api/profiles/me"
@@ -0,0 +1,87 @@
+"""Tests for the Zwift token cache module."""
+
+import os
+import stat
+import pytest
+
+from services.zwift.token_cache import ZwiftTokenCache
+
+
+class TestZwiftTokenCache:
+    """Tests for ZwiftTokenCache class."""
+
+    @pytest.fixture
+    def cache_path(self, tmp_path):
+        """Path of a token cache file in a temporary directory."""
+        return str(tmp_path / "cache" / "zwift_tokens.json")
+
+    @pytest.fixture
+    def cache(self, cache_path):
+        """Create a ZwiftTokenCache instance for testing."""
+        return ZwiftTokenCache(cache_path)
+
+    def test_load_missing_file(self, cache):
+        """Test that a missing cache file yields no entry."""
+        assert cache.load("user@test.com") is None
+
+    def test_save_and_load(self, cache, cache_path):
+        """Test that saved fields are loaded by a new instance."""
+        # When
+        cache.save("user@test.com", access_token="token", access_token_expiration=123.0)
+
+        # Then
+        assert ZwiftTokenCache(cache_path).load("user@test.com") == {
+            "access_token": "token",
+            "access_token_expiration": 123.0,
+        }
+
+    def test_save_merges_fields(self, cache):
+        """Test that saving merges into the existing entry."""
+        # When
+        cache.save("user@test.com", access_token="token")
+        cache.save("user@test.com", refresh_token="refresh")
+
+        # Then
+        assert cache.load("user@test.com") == {"access_token": "token", "refresh_token": "refresh"}
+
+    def test_entries_are_per_user(self, cache):
+        """Test that entries of different users are kept apart."""
+        # When
+        cache.save("a@test.com", access_token="a")
+        cache.save("b@test.com", access_token="b")
+
+        # Then
+        assert cache.load("a@test.com")["access_token"] == "a"
+        assert cache.load("b@test.com")["access_token"] == "b"
+
+    def test_file_is_owner_only(self, cache, cache_path):
+        """Test that the cache file is only accessible by its owner."""
+        # When
+        cache.save("user@test.com", access_token="token")
+
+        # Then
+        assert stat.S_IMODE(os.stat(cache_path).st_mode) == 0o600
+        assert os.listdir(os.path.dirname(cache_path)) == ["zwift_tokens.json"]
+
+    def test_corrupt_file_is_ignored(self, cache, cache_path):
+        """Test that an unreadable cache file is treated as empty."""
+        # Given
+        os.makedirs(os.path.dirname(cache_path))
+        with open(cache_path, "w") as file:
+            file.write("{not json")
+
+        # When & Then
+        assert cache.load("user@test.com") is None
+        cache.save("user@test.com", access_token="token")
+        assert cache.load("user@test.com") == {"access_token": "token"}
+
+    def test_clear(self, cache):
+        """Test removing a user's entry."""
+        # Given
+        cache.save("user@test.com", access_token="token")
+
+        # When
+        cache.clear("user@test.com")
+
+        # Then
+        assert cache.load("user@test.com") is None